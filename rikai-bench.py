@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Script running the benchmark suite of rikai and comparing its results between runs."""
+import sys
+from argparse import ArgumentParser, Namespace
+from json import dumps, loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rikai.benchmark import BenchmarkSuite, GraphGenerator, RuleGenerator, compare
+
+
+def run(options: Namespace):
+    """Run the benchmark suite, printing or saving its results as json."""
+    rules = RuleGenerator(options.labels, options.calls, options.disjunctions, options.alternatives, seed=options.seed)
+    graph = GraphGenerator(options.labels, options.nodes, seed=options.seed)
+    with TemporaryDirectory() as directory:
+        suite = BenchmarkSuite(Path(directory), rules, graph, options.rules, options.samples, options.max_matches or None)
+        results = dumps(suite.run(options.stages, options.repeat), indent=2)
+    if options.output:
+        options.output.write_text(results)
+    else:
+        print(results)
+
+
+def check(options: Namespace) -> int:
+    """Compare two benchmark results, returning a non-zero exit code if any stage regressed."""
+    regressed = False
+    for comparison in compare(loads(options.baseline.read_text()), loads(options.current.read_text())):
+        flag = comparison.regressed(options.threshold)
+        regressed |= flag
+        baseline, current = (
+            f"{value:.{4 if comparison.unit == 's' else 0}f}{comparison.unit}" for value in (comparison.baseline, comparison.current)
+        )
+        change = f"{baseline} -> {current} ({comparison.ratio:.2f}x)"
+        print(f"{comparison.stage}: {change}{' REGRESSION' if flag else ''}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark rikai on synthetic rules and samples.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Time each stage of the analysis.")
+    run_parser.add_argument("--output", "-o", type=Path, help="File the json results are written to instead of stdout.")
+    run_parser.add_argument("--stages", nargs="+", choices=BenchmarkSuite.STAGES, help="Stages to be timed, all by default.")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Number of times each stage is timed.")
+    run_parser.add_argument("--rules", type=int, default=100, help="Number of synthetic rules.")
+    run_parser.add_argument("--calls", type=int, default=2, help="Number of calls per block.")
+    run_parser.add_argument("--disjunctions", type=int, default=1, help="Number of disjunctions per rule.")
+    run_parser.add_argument("--alternatives", type=int, default=2, help="Number of alternatives per disjunction.")
+    run_parser.add_argument("--labels", type=int, default=100, help="Number of distinct call labels.")
+    run_parser.add_argument("--samples", type=int, default=4, help="Number of synthetic samples.")
+    run_parser.add_argument("--nodes", type=int, default=2000, help="Number of calls per sample.")
+    run_parser.add_argument("--max-matches", type=int, default=100, help="Maximum number of matches per rule, 0 for all matches.")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data.")
+    compare_parser = commands.add_parser("compare", help="Flag stages which got slower between two runs.")
+    compare_parser.add_argument("baseline", type=Path, help="Results of the reference run.")
+    compare_parser.add_argument("current", type=Path, help="Results of the run to be checked.")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Tolerated slowdown as a fraction of the baseline.")
+    options = parser.parse_args()
+    if options.command == "run":
+        run(options)
+    else:
+        sys.exit(check(options))
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """Class implementing the command line interface of rikai."""
+import sys
 from argparse import ArgumentParser, Namespace
 from json import dumps
+from os.path import commonpath
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Optional
 
+from rikai.data.joernbridge import JoernError
 from rikai.frontend import SynchronousFrontend
+from rikai.service import ServiceClient, ServiceFrontend
 
 
 class CommandLineInterface:
@@ -13,20 +19,171 @@ class CommandLineInterface:
     def __init__(self, _options: Namespace, frontend=SynchronousFrontend):
         """Create a new interface using the given command line options."""
         self._options = _options
-        self._frontend = frontend(options.config)
+        self._staging: Optional[TemporaryDirectory] = None
+        self._frontend = frontend(_options.config)
+        if _options.max_matches is not None:
+            self._frontend.max_matches = _options.max_matches or None
+        if _options.query_timeout is not None:
+            self._frontend.query_timeout = _options.query_timeout or None
+        if _options.sample_timeout is not None:
+            self._frontend.sample_timeout = _options.sample_timeout or None
+        if _options.progress:
+            self._frontend.progress = self._print_progress
 
     def run(self):
-        """Run rikai with the passed options."""
-        if self._options.json:
-            print(dumps(self._frontend.report_dict(options.source), indent=2))
+        """Run rikai with the passed options, terminating the joern workers afterwards."""
+        try:
+            samples = self._collect_samples()
+            if self._options.plot:
+                self._run_plot(samples)
+            elif self._options.watch:
+                self._run_watch(samples)
+            elif len(samples) == 1 and (self._options.project or not any(source.is_dir() for source in self._options.source)):
+                self._run_single(samples[0])
+            else:
+                self._run_batch(samples)
+            if self._options.profile:
+                self._print_profile()
+        finally:
+            self._frontend.close()
+
+    def _run_single(self, sample: Path):
+        """Analyze a single sample."""
+        if self._options.explain:
+            for rule, plan in self._frontend.explain(sample):
+                print(f"{rule.name}:\n{plan}\n")
+        elif self._options.json:
+            print(dumps(self._frontend.report_dict(sample, self._options.timings), indent=2))
         else:
-            self._frontend.report_live(options.source)
+            self._frontend.report_live(sample)
+
+    def _run_batch(self, samples: List[Path]):
+        """Analyze all samples concurrently, printing the results of each sample as soon as it is finished and continuing on errors."""
+        for report in self._frontend.report_batch(samples, self._options.jobs, self._options.timings):
+            if self._options.json:
+                print(dumps(report), flush=True)
+            elif "error" in report:
+                print(f"Analysis of {report['sample']} failed: {report['error']}", file=sys.stderr, flush=True)
+            else:
+                self._print_results(Path(report["sample"]), report["results"])
+
+    def _run_plot(self, samples: List[Path]):
+        """Plot the neighbourhood of the matches of each rule on each sample, printing the paths of the plots."""
+        for sample in samples:
+            for path in self._frontend.plot(sample, self._options.plot, self._options.plot_format, self._options.hops):
+                print(path, flush=True)
+
+    def _run_watch(self, samples: List[Path]):
+        """Analyze all samples, then match the rules added or changed on each change of the rule directory on them again."""
+        if samples:
+            self._run_batch(samples)
+        try:
+            for changes in self._frontend.watch(self._options.interval):
+                summary = {
+                    "added": [rule.name for rule in changes.added],
+                    "changed": [rule.name for rule in changes.changed],
+                    "removed": list(changes.removed),
+                }
+                print(
+                    "Reloaded rules: " + "; ".join(f"{kind} {', '.join(names)}" for kind, names in summary.items() if names),
+                    file=sys.stderr,
+                )
+                for sample, results in self._frontend.rematch(samples, changes.modified):
+                    if self._options.json:
+                        report = {"sample": str(sample), "results": [rule.to_dict() | {"matches": matches} for rule, matches in results]}
+                        print(dumps(report), flush=True)
+                    else:
+                        for rule, matches in results:
+                            print(f"{sample}: {rule.name} matched at {matches}", flush=True)
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def _print_results(sample: Path, results: List[dict]):
+        """Print the matches with the alternatives matched and the timeouts of the given results of report_dict for the given sample."""
+        for result in results:
+            if result.get("status", None) == "timeout":
+                print(f"{sample}: {result['name']} timed out", flush=True)
+            else:
+                names = f" via {', '.join(result['alternatives'])}" if "alternatives" in result else ""
+                print(f"{sample}: {result['name']} matched at {result['matches']}{names}", flush=True)
+
+    @staticmethod
+    def _print_progress(sample: Path, records: int):
+        """Print the number of records of a batch imported for the given sample to stderr."""
+        print(f"{sample}: imported {records} records", file=sys.stderr, flush=True)
+
+    def _print_profile(self):
+        """Print the time spent per phase and on the slowest rules over all samples to stderr."""
+        data = self._frontend.metrics.to_dict()
+        print("Phases:", file=sys.stderr)
+        for name, timer in sorted(data["phases"].items(), key=lambda x: x[1]["total"], reverse=True):
+            print(f"  {name}: {timer['total']:.3f}s in {timer['count']} calls (max {timer['max']:.3f}s)", file=sys.stderr)
+        print("Slowest rules:", file=sys.stderr)
+        for name, total in self._frontend.metrics.slowest(self._options.profile):
+            print(f"  {name}: {total:.3f}s", file=sys.stderr)
+        print("Counters: " + ", ".join(f"{name}={value}" for name, value in sorted(data["counters"].items())), file=sys.stderr)
+
+    def _collect_samples(self) -> List[Path]:
+        """Return all sample files given, expanding directories based on the given glob pattern unless they are projects."""
+        if self._options.project:
+            return self._collect_projects()
+        samples = []
+        for source in self._options.source:
+            if source.is_dir():
+                samples.extend(sorted(path for path in source.rglob(self._options.pattern) if path.is_file()))
+            else:
+                samples.append(source)
+        return samples
+
+    def _collect_projects(self) -> List[Path]:
+        """Return each directory given as a project and all files given as one project, staged in a temporary directory."""
+        projects = [source for source in self._options.source if source.is_dir()]
+        if files := [source.absolute() for source in self._options.source if not source.is_dir()]:
+            self._staging = TemporaryDirectory(prefix="rikai-")
+            root = Path(commonpath([file.parent for file in files]))
+            for file in files:
+                target = Path(self._staging.name) / file.relative_to(root)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.symlink_to(file)
+            projects.append(Path(self._staging.name))
+        return projects
+
+
+class RemoteInterface(CommandLineInterface):
+    """Command line interface submitting the samples to a running service instead of analyzing them locally."""
+
+    def __init__(self, _options: Namespace):
+        """Create a new interface submitting to the service given by the command line options."""
+        self._options = _options
+        self._staging = None
+        self._client = ServiceClient(_options.server)
+
+    def run(self):
+        """Submit all samples, printing the results of each sample in the order the samples were given."""
+        samples = self._collect_samples()
+        jobs = [(sample, self._client.submit(sample, self._options.timings)) for sample in samples]
+        for sample, job in jobs:
+            try:
+                report = self._client.result(job)
+            except RuntimeError as e:
+                print(e, file=sys.stderr)
+                continue
+            if self._options.json:
+                print(dumps({"sample": str(sample)} | (report if isinstance(report, dict) else {"results": report})), flush=True)
+                continue
+            self._print_results(sample, report["results"] if isinstance(report, dict) else report)
 
 
 # Handles direct script execution utilizing argparse
 if __name__ == "__main__":
-    parser = ArgumentParser("rikai", description="Match behavior pattern in fuzzy C source files.")
-    parser.add_argument("source", type=Path, help="Path to the source file to be analyzed.")
+    parser = ArgumentParser(
+        "rikai",
+        description="Match behavior pattern in fuzzy C source files.",
+        fromfile_prefix_chars="@",
+        epilog="Use @<file> to pass a list of sources.",
+    )
+    parser.add_argument("source", type=Path, nargs="*", help="Path to the source files or directories to be analyzed.")
     parser.add_argument(
         "--config",
         "-d",
@@ -35,5 +192,42 @@ if __name__ == "__main__":
         help="The path to the config file to be used.",
     )
     parser.add_argument("--json", dest="json", action="store_true", help="Flag for generating json output.")
+    parser.add_argument("--explain", action="store_true", help="Print the query plans of all candidate rules instead of matching them.")
+    parser.add_argument("--timings", action="store_true", help="Add the time spent per phase and rule to the json output.")
+    parser.add_argument(
+        "--profile", type=int, nargs="?", const=10, default=0, help="Print the time spent per phase and on the N slowest rules to stderr."
+    )
+    parser.add_argument("--max-matches", type=int, help="The maximum number of matches reported per rule, 0 reports all matches.")
+    parser.add_argument("--query-timeout", type=float, help="The seconds after which a query is cancelled, 0 disables the timeout.")
+    parser.add_argument(
+        "--sample-timeout", type=float, help="The seconds all rules of a sample may take before the remaining ones time out, 0 disables it."
+    )
+    parser.add_argument("--progress", action="store_true", help="Print the number of records of each batch imported into TypeDB to stderr.")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="The number of samples to be analyzed concurrently.")
+    parser.add_argument("--plot", type=Path, help="Plot the neighbourhood of the matches of each rule to the given directory.")
+    parser.add_argument("--plot-format", choices=("dot", "json", "graphml"), default="dot", help="The format of the plots.")
+    parser.add_argument("--hops", type=int, default=1, help="The number of parameter relations spanned by the plotted neighbourhood.")
+    parser.add_argument(
+        "--watch", action="store_true", help="Keep watching the rule directory, matching added or changed rules on the sources again."
+    )
+    parser.add_argument("--interval", type=float, default=1.0, help="The number of seconds between two polls of the rule directory.")
+    parser.add_argument(
+        "--project",
+        action="store_true",
+        help="Analyze each directory, or all files given, as a single project with one database, reporting matches as (file, line).",
+    )
+    parser.add_argument("--serve", action="store_true", help="Run as a service analyzing samples submitted over HTTP.")
+    parser.add_argument("--server", type=str, help="The url of a running service the sources are submitted to, e.g. http://127.0.0.1:8730.")
+    parser.add_argument("--pattern", type=str, default="*.c", help="Glob pattern selecting the files analyzed in directories.")
     options = parser.parse_args()
-    CommandLineInterface(options).run()
+    if not options.source and not options.watch and not options.serve:
+        parser.error("the following arguments are required: source")
+    if options.serve:
+        ServiceFrontend(options.config).serve()
+    elif options.server:
+        RemoteInterface(options).run()
+    else:
+        try:
+            CommandLineInterface(options).run()
+        except JoernError as e:
+            sys.exit(str(e))
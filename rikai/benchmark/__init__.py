@@ -0,0 +1,3 @@
+"""Module implementing benchmarks on synthetic rules and sample graphs."""
+from .suite import BenchmarkSuite, compare
+from .synthetic import GraphGenerator, RuleGenerator
@@ -0,0 +1,193 @@
+"""Module timing the stages of rikai on synthetic rules and samples."""
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from platform import python_version
+from statistics import median
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple
+
+from rikai.benchmark.synthetic import GraphGenerator, RuleGenerator
+from rikai.data.memory import MemoryDatabase
+from rikai.data.query import QueryGenerator
+from rikai.frontend import SynchronousFrontend
+from rikai.matcher import PatternMatcher
+from rikai.pattern import Block, CompiledRuleSet, Rule, RuleParser
+
+
+@dataclass(frozen=True)
+class Comparison:
+    """Class comparing the median time of a stage between two benchmark runs."""
+
+    stage: str
+    baseline: float
+    current: float
+    unit: str = "s"
+
+    @property
+    def ratio(self) -> float:
+        """Return the time of the current run relative to the baseline."""
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    def regressed(self, threshold: float) -> bool:
+        """Check whether the current run is slower than the baseline by more than the given fraction."""
+        return self.ratio > 1 + threshold
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> Generator[Comparison, Any, None]:
+    """
+    Compare the stages timed in both of the given benchmark results.
+
+    :param baseline: The results of the reference run, as returned by BenchmarkSuite.run.
+    :param current: The results of the run to be checked.
+    :return: Yield a comparison of the median times for each stage and of each memory measurement present in both runs.
+    """
+    for stage, timing in current["stages"].items():
+        if stage in baseline["stages"]:
+            yield Comparison(stage, baseline["stages"][stage]["median"], timing["median"])
+    for name, size in current.get("memory", {}).items():
+        if name in baseline.get("memory", {}):
+            yield Comparison(f"memory.{name}", baseline["memory"][name], size, "B")
+
+
+class BenchmarkSuite:
+    """
+    Class timing each stage of the analysis separately on synthetic rules and samples.
+
+    Samples are matched with the memory backend, so no TypeDB server or joern installation is required.
+    """
+
+    STAGES = ("load", "expand", "generate", "match", "analyze")
+
+    def __init__(
+        self,
+        path: Path,
+        rules: RuleGenerator = RuleGenerator(),
+        graph: GraphGenerator = GraphGenerator(),
+        count: int = 100,
+        samples: int = 4,
+        max_matches: Optional[int] = 100,
+    ):
+        """
+        Create a new benchmark suite.
+
+        :param path: The directory the synthetic rules, samples and config are written to.
+        :param rules: The generator of the synthetic rules.
+        :param graph: The generator of the synthetic samples, each sample is generated with a different seed.
+        :param count: The number of rules generated.
+        :param samples: The number of samples generated.
+        :param max_matches: The maximum number of matches per rule, since matches of common calls grow combinatorially.
+        """
+        self._path = path
+        self._rules = rules
+        self._graph = graph
+        self._count = count
+        self._samples = samples
+        self._max_matches = max_matches
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        """Return the parameters the synthetic data is generated with."""
+        return {
+            "rules": asdict(self._rules),
+            "graph": asdict(self._graph),
+            "count": self._count,
+            "samples": self._samples,
+            "max_matches": self._max_matches,
+        }
+
+    def run(self, stages: Optional[Iterable[str]] = None, repeat: int = 5) -> Dict[str, Any]:
+        """
+        Time the given stages on freshly generated data.
+
+        :param stages: The names of the stages to be timed, see STAGES, all stages if None.
+        :param repeat: The number of times each stage is timed.
+        :return: A json serializable dict with the parameters, the timings in seconds of each stage and the memory in bytes.
+        """
+        self.prepare()
+        rules = list(RuleParser().iterate(self._path / "rules"))
+        blocks = [block for rule in rules for block in rule.pattern.expand()]
+        samples = sorted((self._path / "samples").iterdir())
+        frontend = SynchronousFrontend(self._path / "config.ini")
+        frontend.load_rules()
+        frontend.max_matches = self._max_matches
+        functions: Dict[str, Callable[[], Any]] = {
+            "load": lambda: list(RuleParser().iterate(self._path / "rules")),
+            "expand": lambda: self._expand(rules),
+            "generate": lambda: self._generate(blocks),
+            "match": lambda: self._match(rules, samples, self._max_matches),
+            "analyze": lambda: self._analyze(frontend, samples),
+        }
+        results = {}
+        for stage in stages or self.STAGES:
+            runs = self._time(functions[stage], repeat)
+            results[stage] = {"median": median(runs), "min": min(runs), "runs": runs}
+        return {"python": python_version(), "parameters": self.parameters, "stages": results, "memory": self.measure_memory()}
+
+    def measure_memory(self) -> Dict[str, int]:
+        """
+        Measure the memory retained by the parsed rules and by all of their expanded blocks.
+
+        :return: A dict with the number of bytes allocated for the 'rules' and the 'expanded' blocks.
+        """
+        start()
+        try:
+            rules = list(RuleParser().iterate(self._path / "rules"))
+            parsed, _ = get_traced_memory()
+            blocks = [list(rule.pattern.expand()) for rule in rules]
+            expanded, _ = get_traced_memory()
+            del rules, blocks
+        finally:
+            stop()
+        return {"rules": parsed, "expanded": expanded - parsed}
+
+    def prepare(self):
+        """Write the synthetic rules, samples and a config using the memory backend to the directory of the suite."""
+        self._rules.save(self._count, self._path / "rules")
+        (self._path / "samples").mkdir(parents=True, exist_ok=True)
+        for i in range(self._samples):
+            GraphGenerator(self._graph.labels, self._graph.calls, self._graph.parameters, self._graph.seed + i).save(
+                self._path / "samples" / f"sample{i}.jsonl"
+            )
+        (self._path / "config.ini").write_text(f"[backend]\nType = memory\n\n[rules]\nPath = {self._path / 'rules'}\n")
+
+    @staticmethod
+    def _time(function: Callable[[], Any], repeat: int) -> List[float]:
+        """Time the given function the given number of times."""
+        runs = []
+        for _ in range(repeat):
+            start = perf_counter()
+            function()
+            runs.append(perf_counter() - start)
+        return runs
+
+    @staticmethod
+    def _expand(rules: List[Rule]):
+        """Expand the behavior of all given rules into blocks."""
+        for rule in rules:
+            for _ in rule.pattern.expand():
+                pass
+
+    @staticmethod
+    def _generate(blocks: List[Block]):
+        """Generate the queries of all given blocks."""
+        for block in blocks:
+            QueryGenerator.generate(block)
+
+    @staticmethod
+    def _match(rules: List[Rule], samples: List[Path], max_matches: Optional[int]) -> List[Tuple[Rule, Any]]:
+        """Match all given rules on the given samples, including loading their graphs and collecting their statistics."""
+        results: List[Tuple[Rule, Any]] = []
+        compiled = CompiledRuleSet(rules)
+        for sample in samples:
+            database = MemoryDatabase.load(sample)
+            matcher = PatternMatcher(database, database.get_labels(), max_matches, rules=compiled)
+            results.extend((rule, matcher.match(rule.pattern)) for rule in rules)
+        return results
+
+    @staticmethod
+    def _analyze(frontend: SynchronousFrontend, samples: List[Path]):
+        """Analyze all given samples end-to-end, with the rules loaded in advance."""
+        for sample in samples:
+            for _ in frontend.analyze(sample):
+                pass
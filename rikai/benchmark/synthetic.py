@@ -0,0 +1,94 @@
+"""Module generating synthetic rule corpora and sample graphs."""
+from dataclasses import dataclass
+from pathlib import Path
+from random import Random
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from rikai.data.graph import CALL, INTEGER_LITERAL, PARAMETER, STRING_LITERAL, write_records
+from yaml import safe_dump  # type: ignore
+
+
+def labels(count: int) -> Tuple[str, ...]:
+    """Return the given number of synthetic call labels shared by rules and graphs."""
+    return tuple(f"Api{i}" for i in range(count))
+
+
+def weights(count: int) -> Tuple[float, ...]:
+    """Return the relative frequencies of the synthetic labels, following Zipf's law like the APIs used in real code."""
+    return tuple(1 / (i + 1) for i in range(count))
+
+
+@dataclass(frozen=True)
+class RuleGenerator:
+    """Class generating rule definitions with configurable size and number of disjunctions."""
+
+    labels: int = 100
+    calls: int = 2
+    disjunctions: int = 1
+    alternatives: int = 2
+    literals: float = 0.3
+    seed: int = 0
+
+    def generate(self, count: int) -> Generator[Dict[str, Any], Any, None]:
+        """Yield the given number of rule definitions, as they would be loaded from yaml files."""
+        random = Random(self.seed)
+        for i in range(count):
+            pattern: List[Any] = list(self._block(random, "v"))
+            last = f"v{self.calls - 1}" if self.calls else None
+            for j in range(self.disjunctions):
+                alternatives = {f"alternative{k}": list(self._block(random, f"d{j}a{k}v", last)) for k in range(self.alternatives)}
+                pattern.append({"or": alternatives})
+            yield {"name": f"rule{i}", "meta": {"author": "synthetic"}, "pattern": pattern}
+
+    def save(self, count: int, path: Path):
+        """Write the given number of rules as yaml files to the given directory."""
+        path.mkdir(parents=True, exist_ok=True)
+        for rule in self.generate(count):
+            with (path / f"{rule['name']}.yaml").open("w") as output:
+                safe_dump(rule, output)
+
+    def _block(self, random: Random, prefix: str, previous: Optional[str] = None) -> Generator[str, Any, None]:
+        """Yield the statements of a block, passing the result of each call to the next one."""
+        names, frequencies = labels(self.labels), weights(self.labels)
+        for i in range(self.calls):
+            parameters = []
+            if previous:
+                parameters.append(previous)
+            previous = f"{prefix}{i}"
+            if random.random() < self.literals:
+                parameters.append(str(random.randrange(16)))
+            yield f"{previous} = {random.choices(names, frequencies)[0]}({', '.join(parameters)})"
+
+
+@dataclass(frozen=True)
+class GraphGenerator:
+    """Class generating sample graphs in the graph file format, with a skewed distribution of labels."""
+
+    labels: int = 100
+    calls: int = 2000
+    parameters: int = 2
+    seed: int = 0
+
+    def generate(self) -> Generator[Dict[str, Any], Any, None]:
+        """Yield the records of a synthetic sample graph."""
+        random = Random(self.seed)
+        names = labels(self.labels)
+        calls: List[str] = []
+        for i in range(self.calls):
+            call = f"c{i}"
+            yield {"type": CALL, "id": call, "label": random.choices(names, weights(self.labels))[0], "line": i + 1}
+            for index in range(1, random.randrange(self.parameters + 1) + 1):
+                if calls and random.random() < 0.5:
+                    source = random.choice(calls[-20:])
+                elif random.random() < 0.5:
+                    source = f"{call}i{index}"
+                    yield {"type": INTEGER_LITERAL, "id": source, "value": random.randrange(16)}
+                else:
+                    source = f"{call}s{index}"
+                    yield {"type": STRING_LITERAL, "id": source, "value": f"string{random.randrange(64)}"}
+                yield {"type": PARAMETER, "source": source, "sink": call, "index": index}
+            calls.append(call)
+
+    def save(self, path: Path):
+        """Write the graph to a graph file at the given path."""
+        write_records(self.generate(), path)
@@ -0,0 +1,110 @@
+"""Module implementing an on-disk cache of analysis results."""
+import sqlite3
+from json import dumps, loads
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Any, Dict, Optional, Tuple
+
+from rikai.data.graph import Location
+from rikai.pattern import CachedRuleParser, Rule
+from rikai.util.hashing import content_digest, text_digest
+
+
+class ResultCache:
+    """Class persisting the matches of rules in a SQLite database, keyed by the content hashes of samples and rules."""
+
+    # Version of the matching engine and the stored results, to be increased whenever matching changes the results of rules.
+    VERSION = 1
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS samples (sample TEXT PRIMARY KEY, accessed REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS results (sample TEXT NOT NULL, rule TEXT NOT NULL, matches TEXT NOT NULL, PRIMARY KEY (sample, rule))",
+    )
+
+    def __init__(self, path: Path, capacity: int = 10000, version: str = ""):
+        """
+        Open or create the cache at the given path.
+
+        :param path: The path of the SQLite database.
+        :param capacity: The maximum number of samples kept, the least recently used ones are evicted first.
+        :param version: The version of the preprocessing, results of other versions are not reused.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._capacity = capacity
+        self._version = version
+        self._lock = Lock()
+        with self._lock, self._connection:
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+
+    def sample_key(self, sample: Path, max_matches: Optional[int] = None) -> str:
+        """Return the key of the given sample, based on its content, the engine and preprocessing versions and the number of matches."""
+        return text_digest(f"{self.VERSION}:{CachedRuleParser.VERSION}:{self._version}:{max_matches}:{content_digest(sample)}")
+
+    @staticmethod
+    def rule_key(rule: Rule) -> str:
+        """Return the key of the given rule, based on its pattern including all literal values."""
+        return text_digest(repr(rule.pattern))
+
+    def get(self, sample: str, alternatives: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, Tuple[Tuple[Location, ...], ...]]:
+        """
+        Return all cached results of the given sample.
+
+        :param sample: The key of the sample.
+        :param alternatives: The dict the names of the alternatives matched are stored in by rule key, if any.
+        :return: A dict mapping rule keys to the matches found, including empty matches.
+        """
+        with self._lock, self._connection:
+            rows = self._connection.execute("SELECT rule, matches FROM results WHERE sample = ?", (sample,)).fetchall()
+            if rows:
+                self._connection.execute("UPDATE samples SET accessed = ? WHERE sample = ?", (time(), sample))
+        results = {}
+        for rule, value in rows:
+            if isinstance(value := loads(value), dict):
+                if alternatives is not None:
+                    alternatives[rule] = tuple(value["alternatives"])
+                value = value["matches"]
+            results[rule] = tuple(tuple(self._location(x) for x in match) for match in value)
+        return results
+
+    @staticmethod
+    def _location(value: Any) -> Location:
+        """Restore a location from json, where file and line are stored as a list."""
+        return tuple(value) if isinstance(value, list) else value  # type: ignore
+
+    def put(
+        self,
+        sample: str,
+        results: Dict[str, Tuple[Tuple[Location, ...], ...]],
+        alternatives: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ):
+        """
+        Store the results of the given sample, evicting the least recently used samples if the cache is full.
+
+        :param sample: The key of the sample.
+        :param results: A dict mapping rule keys to the matches found.
+        :param alternatives: A dict mapping rule keys to the names of the alternatives matched, if any.
+        """
+        alternatives = alternatives or {}
+        values = (
+            (sample, rule, dumps({"matches": matches, "alternatives": alternatives[rule]} if rule in alternatives else matches))
+            for rule, matches in results.items()
+        )
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO samples VALUES (?, ?)", (sample, time()))
+            self._connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", values)
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM samples").fetchone()
+            if count > self._capacity:
+                evicted = "SELECT sample FROM samples ORDER BY accessed LIMIT ?"
+                self._connection.execute(f"DELETE FROM results WHERE sample IN ({evicted})", (count - self._capacity,))
+                self._connection.execute(f"DELETE FROM samples WHERE sample IN ({evicted})", (count - self._capacity,))
+
+    def __len__(self) -> int:
+        """Return the number of samples cached."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+    def __del__(self):
+        """Close the connection when the cache is deconstructed."""
+        self._connection.close()
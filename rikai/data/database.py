@@ -1,15 +1,113 @@
 """Module handling connections and sessions from typeDB."""
-from typing import Any, Dict, Generator, Tuple
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from threading import Event, Lock, Timer, local
+from time import monotonic
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple
 
-from typedb.client import SessionType, Thing, TransactionType, TypeDB, TypeDBSession  # type: ignore
+from rikai.data.graph import CALL, INTEGER_LITERAL, PARAMETER, STRING_LITERAL, Location
+from rikai.data.loader import GraphLoader
+from rikai.data.planner import QueryPlanner, Statistics
+from rikai.data.query import QueryGenerator
+from rikai.pattern import Behavior, Block
+from rikai.util.metrics import Metrics
+from typedb.client import (  # type: ignore
+    SessionType,
+    Thing,
+    TransactionType,
+    TypeDB,
+    TypeDBClientException,
+    TypeDBOptions,
+    TypeDBSession,
+    TypeDBTransaction,
+)
 
 
-class Database:
+class QueryTimeout(Exception):
+    """Exception raised when a query is cancelled because it exceeded its deadline."""
+
+
+class DatabaseInterface(ABC):
+    """Basic interface for all databases pattern can be matched on."""
+
+    def __init__(self):
+        """Create a new database, collecting its statistics lazily."""
+        self._statistics: Optional[Statistics] = None
+
+    @abstractmethod
+    def match(self, block: Block, limit: Optional[int] = None, timeout: Optional[float] = None) -> Tuple[Tuple[Location, ...], ...]:
+        """
+        Match the given block on the database.
+
+        :param block: The block to be matched.
+        :param limit: The maximum number of matches returned, all matches if None.
+        :param timeout: The number of seconds after which the query is cancelled, unbounded if None.
+        :return: A tuple containing tuples with the locations of the calls in the block for each match, see graph.Location.
+        :raises QueryTimeout: If the query exceeded the timeout.
+        """
+
+    def may_match(self, behavior: Behavior, timeout: Optional[float] = None) -> bool:
+        """Check whether any expansion of the given behavior could match, allowing to skip expanding it otherwise."""
+        return True
+
+    @property
+    def statistics(self) -> Statistics:
+        """Return the statistics of the database, collecting them on first access."""
+        if self._statistics is None:
+            self._statistics = self.get_statistics()
+        return self._statistics
+
+    @abstractmethod
+    def get_statistics(self) -> Statistics:
+        """Count the calls per label and the literals per value in the database."""
+
+    def get_labels(self) -> Set[str]:
+        """Return the set of labels of all call nodes in the database."""
+        return set(self.statistics.labels)
+
+    @abstractmethod
+    def get_calls(self) -> Generator[Tuple[str, str], Any, None]:
+        """Iterate all call nodes and their ids in the database."""
+
+    @abstractmethod
+    def get_literals(self) -> Generator[Tuple[str, str], Any, None]:
+        """Iterate all literal nodes and their ids in the database."""
+
+    @abstractmethod
+    def get_parameters(self) -> Generator[Tuple[str, str, int], Any, None]:
+        """Iterate all parameter relations in the database."""
+
+    @abstractmethod
+    def get_records(self) -> Generator[Dict[str, Any], Any, None]:
+        """Iterate all nodes and relations of the database as graph file records, yielding all nodes before the relations."""
+
+    def close(self):
+        """Release all resources held by the database."""
+        pass
+
+
+class Database(DatabaseInterface):
     """Class modelling a TypeDBSession instance."""
 
-    def __init__(self, session: TypeDBSession):
-        """Create a new Database based on the given session."""
+    def __init__(self, session: TypeDBSession, max_age: float = 60, query_timeout: Optional[float] = None):
+        """
+        Create a new Database based on the given session.
+
+        :param session: The session to be utilized.
+        :param max_age: The time in seconds a read transaction is reused before it is replaced.
+        :param query_timeout: If given, the server closes read transactions living longer than their maximum age plus this
+            number of seconds, in case a query could not be cancelled by the client.
+        """
+        super().__init__()
         self._session = session
+        self._max_age = max_age
+        self._options = TypeDBOptions.core()
+        if query_timeout:
+            self._options.set_transaction_timeout_millis(int((max_age + query_timeout) * 1000))
+        self._local = local()
+        self._transactions: List[TypeDBTransaction] = []
+        self._lock = Lock()
+        self._files: Optional[bool] = None
 
     def query(self, query: str) -> Tuple[Dict[str, Thing]]:
         """
@@ -18,52 +116,366 @@ class Database:
         :param query: The string query to be send.
         :return: A tuple of result mappings, mapping variable names to Thing instances.
         """
-        with self._session.transaction(TransactionType.READ) as transaction:
-            result = transaction.query().match(query)
-            return [x.map() for x in result]  # type: ignore
+        return list(self.iterate(query))  # type: ignore
+
+    def iterate(self, query: str, timeout: Optional[float] = None) -> Generator[Dict[str, Thing], Any, None]:
+        """
+        Send the given query to the database, streaming the answers as they arrive.
+
+        A query exceeding the timeout is cancelled by closing its transaction, so the next query of the thread opens a new one.
+
+        :param query: The string query to be send.
+        :param timeout: The number of seconds after which the query is cancelled, unbounded if None.
+        :return: Yield result mappings, mapping variable names to Thing instances.
+        :raises QueryTimeout: If the query was cancelled.
+        """
+        transaction = self._transaction()
+        expired = Event()
+        watchdog = Timer(timeout, self._cancel, (transaction, expired)) if timeout is not None else None
+        if watchdog is not None:
+            watchdog.start()
+        try:
+            for answer in transaction.query().match(query):
+                yield answer.map()
+        except TypeDBClientException as e:
+            if expired.is_set():
+                raise QueryTimeout(f"Query cancelled after {timeout:.1f}s") from e
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+
+    def exists(self, query: str, timeout: Optional[float] = None) -> bool:
+        """Check whether the given query has at least one answer, without fetching further answers, see iterate for the timeout."""
+        return next(self.iterate(query, timeout), None) is not None
+
+    def match(self, block: Block, limit: Optional[int] = None, timeout: Optional[float] = None) -> Tuple[Tuple[Location, ...], ...]:
+        """
+        Match the given block on the database.
+
+        :param block: The block to be matched.
+        :param limit: The maximum number of matches returned, all matches if None.
+        :param timeout: The number of seconds after which the query is cancelled, unbounded if None.
+        :return: A tuple containing tuples with the locations of the calls in the block for each match, see graph.Location.
+        :raises QueryTimeout: If the query exceeded the timeout.
+        """
+        planner = QueryPlanner(self.statistics)
+        if not planner.is_satisfiable(block):
+            return tuple()
+        calls = range(len(block.calls))
+        if not self.has_files:
+            return tuple(
+                tuple(int(match[f"l{i}"].as_attribute().get_value()) for i in calls)
+                for match in self.iterate(QueryGenerator.generate(block, planner, limit), timeout)
+            )
+        return tuple(
+            tuple((match[f"f{i}"].as_attribute().get_value(), int(match[f"l{i}"].as_attribute().get_value())) for i in calls)
+            for match in self.iterate(QueryGenerator.generate(block, planner, limit, files=True), timeout)
+        )
+
+    @property
+    def has_files(self) -> bool:
+        """Check whether the calls of the database record their file, i.e. whether it was created from a project of several files."""
+        if self._files is None:
+            self._files = self._transaction().concepts().get_attribute_type("File") is not None and self.exists(
+                "match $x isa Call, has File $f;"
+            )
+        return self._files
 
-    def get_calls(self) -> Generator[Thing, Any, None]:
+    def may_match(self, behavior: Behavior, timeout: Optional[float] = None) -> bool:
+        """Check whether any expansion of the given behavior could match, expressing its disjunctions in a single query."""
+        if not QueryGenerator.can_compile(behavior):
+            return True
+        return self.exists(QueryGenerator.generate_behavior(behavior, limit=1), timeout)
+
+    def _transaction(self) -> TypeDBTransaction:
+        """Return the read transaction of the current thread, opening a new one if it is closed or too old."""
+        transaction, opened = getattr(self._local, "transaction", (None, 0.0))
+        if transaction is not None and transaction.is_open() and monotonic() - opened <= self._max_age:
+            return transaction
+        with self._lock:
+            if transaction is not None and transaction in self._transactions:
+                self._transactions.remove(transaction)
+                if transaction.is_open():
+                    transaction.close()
+            transaction = self._session.transaction(TransactionType.READ, self._options)
+            self._transactions.append(transaction)
+        self._local.transaction = (transaction, monotonic())
+        return transaction
+
+    def _cancel(self, transaction: TypeDBTransaction, expired: Event):
+        """Close the given transaction, aborting the query running in it."""
+        expired.set()
+        with self._lock:
+            if transaction.is_open():
+                transaction.close()
+
+    def get_calls(self) -> Generator[Tuple[str, str], Any, None]:
         """Iterate all call nodes and their ids in the database."""
-        for mapping in self.query("match $x isa Call, has Label $y;"):
+        for mapping in self.iterate("match $x isa Call, has Label $y;"):
             yield mapping["x"].get_iid(), mapping["y"].as_attribute().get_value()
 
-    def get_literals(self) -> Generator[Thing, Any, None]:
+    def get_statistics(self) -> Statistics:
+        """Count the calls per label and the literals per value in the database."""
+        labels = self._count("match $x isa Call, has Label $y; get $x, $y; group $y; count;")
+        literals = {
+            (kind, value): count
+            for kind, attribute in ((STRING_LITERAL, "StringValue"), (INTEGER_LITERAL, "IntegerValue"))
+            for value, count in self._count(f"match $x isa {kind}, has {attribute} $y; get $x, $y; group $y; count;").items()
+        }
+        return Statistics(labels, literals)
+
+    def _count(self, query: str) -> Dict[Any, int]:
+        """Run the given group count query, returning a dict mapping attribute values to their counts."""
+        result = self._transaction().query().match_group_aggregate(query)
+        return {group.owner().as_attribute().get_value(): group.numeric().as_int() for group in result}
+
+    def get_literals(self) -> Generator[Tuple[str, str], Any, None]:
         """Iterate all literal nodes and their ids in the database."""
-        for mapping in self.query("match $x isa Literal, has StringValue $y;"):
+        for mapping in self.iterate("match $x isa Literal, has StringValue $y;"):
             yield mapping["x"].get_iid(), mapping["y"].as_attribute().get_value()
 
     def get_parameters(self) -> Generator[Tuple[str, str, int], Any, None]:
         """Iterate all parameter relations in the database."""
-        for mapping in self.query("match $x (Source: $p, Sink: $c) isa Parameter, has Index $i;"):
+        for mapping in self.iterate("match $x (Source: $p, Sink: $c) isa Parameter, has Index $i;"):
             yield mapping["p"].get_iid(), mapping["c"].get_iid(), mapping["i"].as_attribute().get_value()
 
+    def get_records(self) -> Generator[Dict[str, Any], Any, None]:
+        """Iterate all nodes and relations of the database as graph file records, yielding all nodes before the relations."""
+        if self.has_files:
+            for mapping in self.iterate("match $x isa Call, has Label $y, has Line $l, has File $f;"):
+                label, line, file = (mapping[x].as_attribute().get_value() for x in ("y", "l", "f"))
+                yield {"type": CALL, "id": mapping["x"].get_iid(), "label": label, "line": line, "file": file}
+        else:
+            for mapping in self.iterate("match $x isa Call, has Label $y, has Line $l;"):
+                label, line = (mapping[x].as_attribute().get_value() for x in ("y", "l"))
+                yield {"type": CALL, "id": mapping["x"].get_iid(), "label": label, "line": line}
+        for kind, attribute in ((STRING_LITERAL, "StringValue"), (INTEGER_LITERAL, "IntegerValue")):
+            for mapping in self.iterate(f"match $x isa {kind}, has {attribute} $y;"):
+                yield {"type": kind, "id": mapping["x"].get_iid(), "value": mapping["y"].as_attribute().get_value()}
+        for source, sink, index in self.get_parameters():
+            yield {"type": PARAMETER, "source": source, "sink": sink, "index": index}
+
+    def close(self):
+        """Close all transactions and the session."""
+        with self._lock:
+            for transaction in self._transactions:
+                if transaction.is_open():
+                    transaction.close()
+            self._transactions.clear()
+        if self._session.is_open():
+            self._session.close()
+
     def __del__(self):
         """Close the session when the object is deconstructed."""
-        self._session.close()
+        self.close()
 
 
 class DatabaseManager:
     """Class managing a connection to a TypeDB server."""
 
-    def __init__(self, hostname: str, port: int):
+    PREFIX = "rikai-"
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        sessions: int = 0,
+        max_age: float = 60,
+        retention: int = 0,
+        batch_size: int = 1000,
+        writers: int = 4,
+        query_timeout: Optional[float] = None,
+    ):
         """
         Create a manager for database objects handling TypeDB.
 
         :param hostname: The hostname of the server to connect to.
         :param port: The port to connect on.
+        :param sessions: The number of idle database sessions kept open for reuse, sessions in use by an analysis are never closed.
+        :param max_age: The time in seconds a read transaction is reused before it is replaced.
+        :param retention: The number of sample databases kept on the server, 0 keeps all of them.
+        :param batch_size: The number of records inserted per write transaction when importing graphs.
+        :param writers: The number of sessions writing in parallel when importing graphs.
+        :param query_timeout: The number of seconds queries are cancelled after, bounding the lifetime of read transactions on the server.
         """
+        self._batch_size = batch_size
+        self._query_timeout = query_timeout
+        self._writers = writers
         self._client = TypeDB.core_client(f"{hostname}:{port}")
+        self._capacity = sessions
+        self._max_age = max_age
+        self._sessions: OrderedDict[str, Database] = OrderedDict()
+        self._lock = Lock()
+        self._retention = retention
+        self._used: OrderedDict[str, None] = OrderedDict(
+            (database.name(), None) for database in self._client.databases().all() if database.name().startswith(self.PREFIX)
+        )
+        self._ingesting: Dict[str, Lock] = defaultdict(Lock)
+        self._pinned: Dict[str, int] = defaultdict(int)
+        self._borrowed: Dict[str, int] = defaultdict(int)
+
+    def provide(self, key: str, ingest: Callable[[str], Any]) -> str:
+        """
+        Return the name of the database for the given content key, only ingesting the content if it does not exist yet.
+
+        The database is pinned until it is released, the least recently provided databases which are not pinned
+        are deleted once more than the retained number of databases exist.
+
+        :param key: A key identifying the content of the database, e.g. the hash of a sample.
+        :param ingest: A function creating the database with the given name.
+        :return: The name of the database.
+        """
+        name = f"{self.PREFIX}{key}"
+        with self._lock:
+            lock = self._ingesting[name]
+        with lock:
+            if not self.contains(name):
+                try:
+                    ingest(name)
+                except BaseException:
+                    if self.contains(name):
+                        self.delete(name)
+                    raise
+            self._touch(name)
+        self._evict()
+        return name
+
+    def release(self, name: str):
+        """
+        Release the given database once the analysis it was provided and got for finished.
+
+        The database is unpinned, allowing its deletion if the retention is exceeded, and its session may be closed once it is idle.
+
+        :param name: The name of the database, as returned by provide.
+        """
+        with self._lock:
+            for counts in (self._pinned, self._borrowed):
+                if counts.get(name, 0) > 1:
+                    counts[name] -= 1
+                else:
+                    counts.pop(name, None)
+            idle = self._trim()
+        for database in idle:
+            database.close()
+        self._evict()
+
+    def load(
+        self,
+        name: str,
+        records: Iterable[Dict[str, Any]],
+        metrics: Optional[Metrics] = None,
+        progress: Optional[Callable[[int], Any]] = None,
+    ) -> int:
+        """
+        Create the database with the given name and bulk import the given graph records into it.
+
+        :param name: The name of the database to be created.
+        :param records: The records of all nodes and relations, see rikai.data.graph.
+        :param metrics: If given, the time spent on the import and the number of records imported are recorded.
+        :param progress: A function called with the number of records of each batch once it is committed, if any.
+        :return: The number of records imported.
+        """
+        loader = GraphLoader(self._client, self._batch_size, self._writers, metrics, progress)
+        loader.define(name)
+        return loader.load(name, records)
+
+    def databases(self) -> List[str]:
+        """Return the names of all sample databases on the server, least recently used first."""
+        with self._lock:
+            return list(self._used)
+
+    def contains(self, name: str) -> bool:
+        """Check whether the database with the given name exists."""
+        with self._lock:
+            if name in self._sessions:
+                return True
+        return self._client.databases().contains(name)
+
+    def delete(self, name: str):
+        """
+        Delete the database with the given name, closing its session.
+
+        :param name: The name of the database.
+        """
+        with self._lock:
+            if database := self._sessions.pop(name, None):
+                database.close()
+            self._used.pop(name, None)
+            self._pinned.pop(name, None)
+            self._borrowed.pop(name, None)
+            self._ingesting.pop(name, None)
+        if self._client.databases().contains(name):
+            self._client.databases().get(name).delete()
+
+    def _touch(self, name: str):
+        """Mark the given database as recently used and pin it."""
+        with self._lock:
+            self._used[name] = None
+            self._used.move_to_end(name)
+            self._pinned[name] += 1
+
+    def _evict(self):
+        """Delete the least recently used databases exceeding the retention, skipping databases which are pinned or being provided."""
+        if not self._retention:
+            return
+        with self._lock:
+            excess = max(len(self._used) - self._retention, 0)
+            idle = [name for name in self._used if name not in self._pinned and name not in self._borrowed]
+            evicted = [(name, self._ingesting[name]) for name in idle[:excess]]
+        for name, lock in evicted:
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with self._lock:
+                    used = name in self._pinned or name in self._borrowed
+                if not used:
+                    self.delete(name)
+            finally:
+                lock.release()
 
     def get(self, name: str) -> Database:
         """
-        Get the database with the given name.
+        Get the database with the given name, reusing its session if it is still open.
+
+        Sessions kept for reuse are only closed once they are idle, i.e. every database got has to be released after its analysis.
 
         :param name: The name of the database.
         :return: The database object requested.
         """
+        with self._lock:
+            if name in self._sessions:
+                self._sessions.move_to_end(name)
+                self._borrowed[name] += 1
+                return self._sessions[name]
         assert self._client.databases().contains(name), f"Database {name} does not exist!"
-        return Database(self._client.session(name, SessionType.DATA))
+        database = Database(self._client.session(name, SessionType.DATA), self._max_age, self._query_timeout)
+        if not self._capacity:
+            return database
+        with self._lock:
+            if (opened := self._sessions.get(name, None)) is None:
+                self._sessions[name] = opened = database
+            self._borrowed[name] += 1
+            idle = self._trim()
+        if opened is not database:
+            idle.append(database)
+        for unused in idle:
+            unused.close()
+        return opened
+
+    def _trim(self) -> List[Database]:
+        """Remove the least recently used idle sessions exceeding the capacity, the lock has to be held."""
+        idle = [name for name in self._sessions if name not in self._borrowed]
+        return [self._sessions.pop(name) for name in idle[: max(len(self._sessions) - self._capacity, 0)]] if self._capacity else []
+
+    def close(self):
+        """Close all sessions kept and the connection."""
+        with self._lock:
+            for database in self._sessions.values():
+                database.close()
+            self._sessions.clear()
+        self._client.close()
 
     def __del__(self):
         """Close the connection when the manager is deconstructed."""
-        self._client.close()
+        self.close()
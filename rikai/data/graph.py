@@ -0,0 +1,37 @@
+"""Module defining the graph files utilized to exchange sample graphs without a TypeDB server.
+
+Graph files contain one json record per line, e.g.
+{"type": "Call", "id": "1", "label": "VirtualAlloc", "line": 12}
+{"type": "StringLiteral", "id": "2", "value": "kernel32.dll"}
+{"type": "IntegerLiteral", "id": "3", "value": 64}
+{"type": "Parameter", "source": "2", "sink": "1", "index": 1}
+
+Graphs of projects spanning several source files additionally record the originating file of each call,
+e.g. {"type": "Call", "id": "1", "label": "VirtualAlloc", "line": 12, "file": "sub_401000.c"}.
+"""
+from json import dumps, loads
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, Tuple, Union
+
+CALL = "Call"
+STRING_LITERAL = "StringLiteral"
+INTEGER_LITERAL = "IntegerLiteral"
+PARAMETER = "Parameter"
+
+# The location of a matched call, its line or, in graphs of projects, its file and line.
+Location = Union[int, Tuple[str, int]]
+
+
+def read_records(path: Path) -> Generator[Dict[str, Any], Any, None]:
+    """Iterate all records of the given graph file."""
+    with path.open("r") as source:
+        for line in source:
+            if line.strip():
+                yield loads(line)
+
+
+def write_records(records: Iterable[Dict[str, Any]], path: Path):
+    """Write the given records to a graph file at the given path."""
+    with path.open("w") as output:
+        for record in records:
+            output.write(dumps(record) + "\n")
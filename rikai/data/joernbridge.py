@@ -1,14 +1,32 @@
 """Module handling the communication with the joern plugin."""
-import sys
+from contextlib import suppress
+from functools import cached_property
 from pathlib import Path
-from subprocess import CalledProcessError, run
+from queue import Queue
+from selectors import EVENT_READ, DefaultSelector
+from subprocess import PIPE, Popen, run
 from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import monotonic
+from typing import Callable, List, Optional, TypeVar
 from uuid import uuid4
 
+from rikai.util.hashing import file_digest
+
+T = TypeVar("T")
+
+
+class JoernError(Exception):
+    """Exception raised when a joern worker could not process a sample."""
+
+    pass
+
 
 class JoernBridge:
     """Class managing communication with the joern-rikai-interface."""
 
+    EXPORT_FLAG = "--export"
+
     def __init__(self, path: Path, timeout: int = 120):
         """
         Create a new JoenBridge.
@@ -20,6 +38,14 @@ class JoernBridge:
         self.rikai_path = path
         self.timeout = timeout
 
+    def close(self):
+        """Release the resources of the bridge, joern is launched per sample so none are kept."""
+
+    @cached_property
+    def version(self) -> str:
+        """Return a digest identifying the version of the rikai executable, hashed once per bridge instead of once per sample."""
+        return file_digest(self.rikai_path)
+
     def process_data(self, data: str) -> str:
         """
         Pass the given data to joern utilizing a temporary file.
@@ -29,21 +55,252 @@ class JoernBridge:
         """
         with NamedTemporaryFile() as buffer:
             buffer.write(data.encode("utf-8"))
+            buffer.flush()
             return self.process_source(Path(buffer.name))
 
-    def process_source(self, path: Path) -> str:
+    def process_source(self, path: Path, database_id: Optional[str] = None) -> str:
         """
-        Use joern to process the given file.
+        Use joern to process the given file or, if it is a directory, all source files of the project contained.
 
-        :param path: The path to the source file to be processed.
+        :param path: The path to the source file or project directory to be processed.
+        :param database_id: The id of the database to be created, a random one if None.
         :return: The id of the created database.
+        :raises JoernError: If joern failed to process the source.
         """
-        assert path.exists(), "The given source file does not exist!"
-        database_id = str(uuid4())
+        assert path.exists(), "The given source does not exist!"
+        database_id = database_id or str(uuid4())
         result = run((self.rikai_path, database_id, path), timeout=self.timeout, capture_output=True)
-        try:
-            result.check_returncode()
-        except CalledProcessError as e:
-            print(e.stderr.decode("utf-8"))
-            sys.exit()
+        if result.returncode != 0:
+            raise JoernError(f"Joern failed to process {path}: {result.stderr.decode('utf-8')}")
         return database_id
+
+    def export_source(self, path: Path, output: Path) -> Path:
+        """
+        Use joern to process the given file or project directory, writing its graph to a graph file instead of TypeDB.
+
+        :param path: The path to the source file or project directory to be processed.
+        :param output: The path of the graph file to be written, see rikai.data.graph.
+        :return: The path of the graph file.
+        """
+        assert path.exists(), "The given source does not exist!"
+        result = run((self.rikai_path, self.EXPORT_FLAG, output, path), timeout=self.timeout, capture_output=True)
+        if result.returncode != 0:
+            raise JoernError(f"Joern failed to export {path}: {result.stderr.decode('utf-8')}")
+        return output
+
+
+class JoernWorker:
+    """
+    Class wrapping a long-running rikai process started in worker mode.
+
+    The worker speaks a line-based protocol on stdin and stdout:
+    it announces itself with READY, answers PING with PONG and processes
+    requests of the form '<database id><tab><path>' with either 'OK <database id>' or 'ERROR <message>'.
+    Requests of the form 'EXPORT<tab><graph file><tab><path>' write the graph to the given file instead of TypeDB.
+    """
+
+    WORKER_FLAG = "--worker"
+    READY = "READY"
+    PING = "PING"
+    PONG = "PONG"
+    OK = "OK"
+    ERROR = "ERROR"
+    EXPORT = "EXPORT"
+
+    def __init__(self, path: Path, timeout: int = 120):
+        """
+        Start a new worker process.
+
+        :param path: The path to the rikai executable to be utilized.
+        :param timeout: The timeout in seconds for starting up and processing a single sample.
+        """
+        self._path = path
+        self._timeout = timeout
+        self._process = Popen((path, self.WORKER_FLAG), stdin=PIPE, stdout=PIPE, text=True, bufsize=1)
+        if (line := self._readline(timeout)) != self.READY:
+            self.close()
+            raise JoernError(f"Joern worker failed to start: {line}")
+        self.answered = monotonic()
+
+    @property
+    def pid(self) -> int:
+        """Return the process id of the worker."""
+        return self._process.pid
+
+    @property
+    def alive(self) -> bool:
+        """Check whether the worker process is still running."""
+        return self._process.poll() is None
+
+    def ping(self, timeout: float = 5) -> bool:
+        """Check whether the worker is responsive."""
+        try:
+            self._send(self.PING)
+            return self._readline(timeout) == self.PONG
+        except JoernError:
+            return False
+
+    def process(self, database_id: str, path: Path) -> str:
+        """
+        Let the worker process the given file.
+
+        :param database_id: The id of the database to be created.
+        :param path: The path to the source file to be processed.
+        :return: The id of the created database.
+        """
+        return self._request(f"{database_id}\t{path.absolute()}", path)
+
+    def export(self, path: Path, output: Path) -> Path:
+        """
+        Let the worker write the graph of the given file to a graph file.
+
+        :param path: The path to the source file to be processed.
+        :param output: The path of the graph file to be written.
+        :return: The path of the graph file.
+        """
+        return Path(self._request(f"{self.EXPORT}\t{output.absolute()}\t{path.absolute()}", path))
+
+    def _request(self, request: str, path: Path) -> str:
+        """Send the given request for the given file, returning the message of the answer."""
+        self._send(request)
+        status, _, message = self._readline(self._timeout).partition(" ")
+        if status != self.OK:
+            raise JoernError(f"Joern failed to process {path}: {message}")
+        return message
+
+    def close(self):
+        """Terminate the worker process."""
+        if self.alive:
+            self._process.kill()
+        self._process.wait()
+        for stream in (self._process.stdin, self._process.stdout):
+            with suppress(BrokenPipeError):
+                stream.close()  # type: ignore
+
+    def _send(self, line: str):
+        """Send a single line to the worker."""
+        try:
+            self._process.stdin.write(line + "\n")  # type: ignore
+            self._process.stdin.flush()  # type: ignore
+        except (BrokenPipeError, ValueError) as e:
+            self.close()
+            raise JoernError(f"Joern worker {self.pid} is not running anymore!") from e
+
+    def _readline(self, timeout: float) -> str:
+        """Read a single line from the worker, killing it if no answer is received in time."""
+        with DefaultSelector() as selector:
+            selector.register(self._process.stdout, EVENT_READ)  # type: ignore
+            if not selector.select(timeout):
+                self.close()
+                raise JoernError(f"Joern worker {self.pid} did not answer within {timeout} seconds!")
+        if not (line := self._process.stdout.readline()):  # type: ignore
+            self.close()
+            raise JoernError(f"Joern worker {self.pid} terminated unexpectedly!")
+        self.answered = monotonic()
+        return line.strip()
+
+
+class PersistentJoernBridge(JoernBridge):
+    """JoernBridge keeping a pool of warm joern workers instead of launching joern for every sample."""
+
+    def __init__(self, path: Path, timeout: int = 120, workers: int = 1, ping_after: float = 60):
+        """
+        Create a new bridge and start the given amount of workers.
+
+        :param path: The path to the rikai executable to be utilized.
+        :param timeout: The timeout in seconds.
+        :param workers: The amount of joern processes kept running.
+        :param ping_after: The seconds a worker may be idle before it is pinged, and restarted if not responding, prior to its next sample.
+        """
+        self._ping_after = ping_after
+        self._workers: List[JoernWorker] = []
+        self._idle: Queue[JoernWorker] = Queue()
+        self._lock = Lock()
+        super().__init__(path, timeout)
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def process_source(self, path: Path, database_id: Optional[str] = None) -> str:
+        """
+        Let the next idle worker process the given file or project directory, restarting crashed workers.
+
+        :param path: The path to the source file or project directory to be processed.
+        :param database_id: The id of the database to be created, a random one if None.
+        :return: The id of the created database.
+        """
+        return self._run(lambda worker: worker.process(database_id or str(uuid4()), path), path)
+
+    def export_source(self, path: Path, output: Path) -> Path:
+        """
+        Let the next idle worker write the graph of the given file or project directory to a graph file.
+
+        :param path: The path to the source file or project directory to be processed.
+        :param output: The path of the graph file to be written.
+        :return: The path of the graph file.
+        """
+        return self._run(lambda worker: worker.export(path, output), path)
+
+    def _run(self, task: Callable[[JoernWorker], T], path: Path) -> T:
+        """Run the given task on the next idle worker, restarting the worker if it crashed."""
+        assert path.exists(), "The given source does not exist!"
+        worker = self._acquire()
+        try:
+            return task(worker)
+        except JoernError:
+            if not worker.alive:
+                worker = self._restart(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def health_check(self) -> int:
+        """
+        Ping all idle workers, restarting the ones not responding.
+
+        :return: The number of workers restarted.
+        """
+        restarted = 0
+        for _ in range(self._idle.qsize()):
+            worker = self._idle.get()
+            if not worker.ping():
+                worker = self._restart(worker)
+                restarted += 1
+            self._idle.put(worker)
+        return restarted
+
+    def close(self):
+        """Terminate all workers."""
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers.clear()
+
+    def _acquire(self) -> JoernWorker:
+        """Wait for an idle worker, replacing it if its process died in the meantime or it stopped responding while idle."""
+        worker = self._idle.get()
+        if not worker.alive or (monotonic() - worker.answered > self._ping_after and not worker.ping()):
+            try:
+                worker = self._restart(worker)
+            except JoernError:
+                self._idle.put(worker)
+                raise
+        return worker
+
+    def _spawn(self) -> JoernWorker:
+        """Start a new worker and keep track of it."""
+        worker = JoernWorker(self.rikai_path, self.timeout)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _restart(self, worker: JoernWorker) -> JoernWorker:
+        """Replace the given worker with a newly started one."""
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        return self._spawn()
+
+    def __del__(self):
+        """Terminate all workers when the bridge is deconstructed."""
+        self.close()
@@ -0,0 +1,153 @@
+"""Module implementing the bulk import of graph files into TypeDB."""
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from queue import Queue
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from rikai.data import graph
+from rikai.util.metrics import Metrics
+from typedb.client import ConceptMap, SessionType, TransactionType, TypeDBClient, TypeDBSession  # type: ignore
+
+SCHEMA = """define
+Label sub attribute, value string;
+Line sub attribute, value long;
+File sub attribute, value string;
+StringValue sub attribute, value string;
+IntegerValue sub attribute, value long;
+Index sub attribute, value long;
+Parameter sub relation, relates Source, relates Sink, owns Index;
+Call sub entity, owns Label, owns Line, owns File, plays Parameter:Source, plays Parameter:Sink;
+Literal sub entity, abstract, plays Parameter:Source;
+StringLiteral sub Literal, owns StringValue;
+IntegerLiteral sub Literal, owns IntegerValue;
+"""
+
+
+class GraphLoader:
+    """
+    Class bulk inserting the records of a graph file into a TypeDB database.
+
+    All nodes are inserted first, then all parameter relations, matching their nodes by the iids assigned.
+    Each batch of records is inserted with a single query in its own write transaction, and batches are
+    spread over several sessions in parallel, so the import scales with the number of cores of the server.
+    """
+
+    def __init__(
+        self,
+        client: TypeDBClient,
+        batch_size: int = 1000,
+        sessions: int = 4,
+        metrics: Optional[Metrics] = None,
+        progress: Optional[Callable[[int], Any]] = None,
+    ):
+        """
+        Create a new loader.
+
+        :param client: The client connected to the TypeDB server.
+        :param batch_size: The number of records inserted per write transaction.
+        :param sessions: The number of sessions inserting batches in parallel.
+        :param metrics: If given, the time spent per phase and the number of records imported are recorded.
+        :param progress: A function called with the number of records of each batch once it is committed.
+        """
+        self._client = client
+        self._batch_size = batch_size
+        self._sessions = sessions
+        self._metrics = metrics if metrics is not None else Metrics()
+        self._progress = progress
+
+    def define(self, name: str):
+        """Create the database with the given name and define the schema of sample graphs."""
+        self._client.databases().create(name)
+        with self._client.session(name, SessionType.SCHEMA) as session, session.transaction(TransactionType.WRITE) as transaction:
+            transaction.query().define(SCHEMA)
+            transaction.commit()
+
+    def load(self, name: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert the given records into the database with the given name, which has to be defined already.
+
+        :param name: The name of the database.
+        :param records: The records of all nodes and relations, see rikai.data.graph.
+        :return: The number of records imported.
+        """
+        nodes: List[Dict[str, Any]] = []
+        parameters: List[Dict[str, Any]] = []
+        for record in records:
+            (parameters if record["type"] == graph.PARAMETER else nodes).append(record)
+        sessions: Queue[TypeDBSession] = Queue()
+        for _ in range(self._sessions):
+            sessions.put(self._client.session(name, SessionType.DATA))
+        try:
+            with ThreadPoolExecutor(max_workers=self._sessions) as executor:
+                iids: Dict[str, str] = {}
+                with self._metrics.timer("import.nodes"):
+                    for batch in executor.map(lambda x: self._load_nodes(sessions, x), self._batches(nodes)):
+                        iids.update(batch)
+                with self._metrics.timer("import.parameters"):
+                    list(
+                        executor.map(lambda x: self._commit(sessions, self._insert_parameters(x, iids), len(x)), self._batches(parameters))
+                    )
+        finally:
+            while not sessions.empty():
+                sessions.get().close()
+        self._metrics.increment("imported", len(nodes) + len(parameters))
+        return len(nodes) + len(parameters)
+
+    def _batches(self, records: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Split the given records into batches."""
+        iterator = iter(records)
+        while batch := list(islice(iterator, self._batch_size)):
+            yield batch
+
+    def _load_nodes(self, sessions: "Queue[TypeDBSession]", batch: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Insert the given nodes, returning a dict mapping the ids of their records to the iids assigned."""
+        concepts = self._commit(sessions, self._insert_nodes(batch), len(batch))[0].map()
+        return {record["id"]: concepts[f"n{i}"].get_iid() for i, record in enumerate(batch)}
+
+    def _commit(self, sessions: "Queue[TypeDBSession]", query: str, size: int) -> List[ConceptMap]:
+        """Run the given insert query in a write transaction of the next idle session, reporting the progress once committed."""
+        session = sessions.get()
+        try:
+            with session.transaction(TransactionType.WRITE) as transaction:
+                answers = list(transaction.query().insert(query))
+                transaction.commit()
+        finally:
+            sessions.put(session)
+        if self._progress is not None:
+            self._progress(size)
+        return answers
+
+    @staticmethod
+    def _insert_nodes(batch: List[Dict[str, Any]]) -> str:
+        """Generate a single query inserting all given nodes, binding the i-th node to $n{i}."""
+        lines = ["insert"]
+        for i, record in enumerate(batch):
+            match record["type"]:
+                case graph.CALL:
+                    file = f", has File {GraphLoader._string(record['file'])}" if "file" in record else ""
+                    lines.append(f"$n{i} isa Call, has Label {GraphLoader._string(record['label'])}, has Line {int(record['line'])}{file};")
+                case graph.STRING_LITERAL:
+                    lines.append(f"$n{i} isa StringLiteral, has StringValue {GraphLoader._string(record['value'])};")
+                case graph.INTEGER_LITERAL:
+                    lines.append(f"$n{i} isa IntegerLiteral, has IntegerValue {int(record['value'])};")
+                case kind:
+                    raise ValueError(f"Unknown record type {kind}!")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _insert_parameters(batch: List[Dict[str, Any]], iids: Dict[str, str]) -> str:
+        """Generate a single query matching all nodes connected by the given parameters by their iid and inserting the relations."""
+        variables: Dict[str, str] = {}
+        for record in batch:
+            for node in (record["source"], record["sink"]):
+                variables.setdefault(iids[node], f"$n{len(variables)}")
+        lines = ["match"] + [f"{variable} iid {iid};" for iid, variable in variables.items()] + ["insert"]
+        for record in batch:
+            source, sink = variables[iids[record["source"]]], variables[iids[record["sink"]]]
+            lines.append(f"(Source: {source}, Sink: {sink}) isa Parameter, has Index {int(record['index'])};")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _string(value: Any) -> str:
+        """Return the given value as a quoted TypeQL string."""
+        return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
@@ -0,0 +1,211 @@
+"""Module implementing an in-memory graph database, matching pattern without a TypeDB server."""
+from collections import OrderedDict, defaultdict
+from itertools import islice, product
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
+
+from rikai.data import graph
+from rikai.data.database import DatabaseInterface, QueryTimeout
+from rikai.data.planner import Statistics
+from rikai.pattern import (
+    Assignment,
+    Block,
+    Call,
+    CallAssignment,
+    IntegerLiteral,
+    LiteralAssignment,
+    Operand,
+    StringLiteral,
+    UnboundVariable,
+    Variable,
+)
+
+
+class MemoryDatabase(DatabaseInterface):
+    """
+    Graph of a single sample held in memory, indexed by call label and literal value.
+
+    Blocks are matched with the same semantics as the queries generated by the QueryGenerator.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        """
+        Create a new database from the given graph records.
+
+        :param records: The records of all nodes and relations, see rikai.data.graph.
+        """
+        super().__init__()
+        self._calls: Dict[str, Tuple[str, int]] = {}
+        self._files: Dict[str, str] = {}
+        self._literals: Dict[str, Tuple[str, Union[str, int]]] = {}
+        self._parameters: List[Tuple[str, str, int]] = []
+        self._labels: Dict[str, List[str]] = defaultdict(list)
+        self._values: Dict[Tuple[str, Union[str, int]], Set[str]] = defaultdict(set)
+        self._sources: Dict[Tuple[str, int], List[str]] = defaultdict(list)
+        for record in records:
+            match record["type"]:
+                case graph.CALL:
+                    self._calls[record["id"]] = (record["label"], int(record["line"]))
+                    self._labels[record["label"]].append(record["id"])
+                    if "file" in record:
+                        self._files[record["id"]] = record["file"]
+                case graph.STRING_LITERAL | graph.INTEGER_LITERAL:
+                    self._literals[record["id"]] = (record["type"], record["value"])
+                    self._values[(record["type"], record["value"])].add(record["id"])
+                case graph.PARAMETER:
+                    self._parameters.append((record["source"], record["sink"], int(record["index"])))
+                    self._sources[(record["sink"], int(record["index"]))].append(record["source"])
+
+    @classmethod
+    def load(cls, path: Path) -> "MemoryDatabase":
+        """Load the graph file at the given path or, if it is a directory, all graph files of the project contained."""
+        if path.is_dir():
+            return cls(cls._read_project(path))
+        return cls(graph.read_records(path))
+
+    @staticmethod
+    def _read_project(path: Path) -> Generator[Dict[str, Any], Any, None]:
+        """
+        Iterate the records of all graph files in the given directory as the graph of a single project.
+
+        Ids are prefixed with the path of their graph file to keep them unique, calls without a file are attributed
+        to the source file the graph file is named after, e.g. 'sub_401000.c' for 'sub_401000.c.jsonl'.
+        """
+        for sub_path in sorted(path.rglob("*.jsonl")):
+            name = sub_path.relative_to(path).as_posix()
+            for record in graph.read_records(sub_path):
+                if record["type"] == graph.PARAMETER:
+                    yield record | {"source": f"{name}:{record['source']}", "sink": f"{name}:{record['sink']}"}
+                    continue
+                record = record | {"id": f"{name}:{record['id']}"}
+                if record["type"] == graph.CALL and "file" not in record:
+                    record["file"] = name.removesuffix(".jsonl")
+                yield record
+
+    def match(self, block: Block, limit: Optional[int] = None, timeout: Optional[float] = None) -> Tuple[Tuple[graph.Location, ...], ...]:
+        """
+        Match the given block on the database.
+
+        Since the constraints of each call only depend on its own parameters, the matches are
+        the product of the lines matching each call. The timeout is checked after each call.
+
+        :param block: The block to be matched.
+        :param limit: The maximum number of matches returned, all matches if None.
+        :param timeout: The number of seconds after which matching is aborted, unbounded if None.
+        :return: A tuple containing tuples with the locations of the calls in the block for each match, see graph.Location.
+        :raises QueryTimeout: If matching exceeded the timeout.
+        """
+        deadline = monotonic() + timeout if timeout is not None else None
+        locations = []
+        for call in block.calls:
+            if not (matching := sorted({self._locate(x) for x in self._labels.get(call.label, ()) if self._satisfies(block, x, call)})):
+                return tuple()
+            if deadline is not None and monotonic() > deadline:
+                raise QueryTimeout(f"Matching aborted after {timeout:.1f}s")
+            locations.append(matching)
+        return tuple(islice(product(*locations), limit))
+
+    def _locate(self, node: str) -> graph.Location:
+        """Return the location of the given call node, including its file if the graph spans several files."""
+        return (self._files.get(node, ""), self._calls[node][1]) if self._files else self._calls[node][1]
+
+    def _satisfies(self, block: Block, node: str, call: Call) -> bool:
+        """Check whether the given call node fulfills the constraints of all parameters of the given call."""
+        for index, parameter in enumerate(call.parameters, start=1):
+            if isinstance(parameter, UnboundVariable):
+                continue
+            constraint = self._constraint(block.get_definition(parameter) if isinstance(parameter, Variable) else parameter)
+            if not any(constraint(source) for source in self._sources.get((node, index), ())):
+                return False
+        return True
+
+    def _constraint(self, definition: Optional[Union[Operand, Assignment]]) -> Callable[[str], bool]:
+        """Return a function checking whether a node fulfills the given definition of a parameter."""
+        match definition:
+            case CallAssignment(_, call):
+                return lambda x: x in self._calls and self._calls[x][0] == call.label
+            case LiteralAssignment(_, StringLiteral(value)) | StringLiteral(value):
+                return self._values.get((graph.STRING_LITERAL, value), set()).__contains__
+            case LiteralAssignment(_, IntegerLiteral(value)) | IntegerLiteral(value):
+                return self._values.get((graph.INTEGER_LITERAL, value), set()).__contains__
+        return lambda x: True
+
+    def get_statistics(self) -> Statistics:
+        """Count the calls per label and the literals per value in the database."""
+        return Statistics(
+            {label: len(nodes) for label, nodes in self._labels.items()}, {key: len(nodes) for key, nodes in self._values.items()}
+        )
+
+    def get_calls(self) -> Generator[Tuple[str, str], Any, None]:
+        """Iterate all call nodes and their ids in the database."""
+        for iid, (label, _) in self._calls.items():
+            yield iid, label
+
+    def get_literals(self) -> Generator[Tuple[str, str], Any, None]:
+        """Iterate all string literal nodes and their ids in the database."""
+        for iid, (kind, value) in self._literals.items():
+            if kind == graph.STRING_LITERAL:
+                yield iid, str(value)
+
+    def get_parameters(self) -> Generator[Tuple[str, str, int], Any, None]:
+        """Iterate all parameter relations in the database."""
+        yield from self._parameters
+
+    def get_records(self) -> Generator[Dict[str, Any], Any, None]:
+        """Iterate all nodes and relations of the database as graph file records, yielding all nodes before the relations."""
+        for iid, (label, line) in self._calls.items():
+            yield {"type": graph.CALL, "id": iid, "label": label, "line": line} | ({"file": self._files[iid]} if iid in self._files else {})
+        for iid, (kind, value) in self._literals.items():
+            yield {"type": kind, "id": iid, "value": value}
+        for source, sink, index in self._parameters:
+            yield {"type": graph.PARAMETER, "source": source, "sink": sink, "index": index}
+
+
+class MemoryDatabaseManager:
+    """Class managing in-memory databases loaded from graph files, named by their path."""
+
+    def __init__(self, sessions: int = 0):
+        """
+        Create a new manager.
+
+        :param sessions: The number of loaded graphs kept for reuse.
+        """
+        self._capacity = sessions
+        self._databases: OrderedDict[str, MemoryDatabase] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, name: str) -> MemoryDatabase:
+        """
+        Get the database stored in the graph file with the given path.
+
+        :param name: The path of the graph file.
+        :return: The database object requested.
+        """
+        with self._lock:
+            if name in self._databases:
+                self._databases.move_to_end(name)
+                return self._databases[name]
+        assert self.contains(name), f"Database {name} does not exist!"
+        database = MemoryDatabase.load(Path(name))
+        if self._capacity:
+            with self._lock:
+                self._databases[name] = database
+                while len(self._databases) > self._capacity:
+                    self._databases.popitem(last=False)
+        return database
+
+    def contains(self, name: str) -> bool:
+        """Check whether the graph file or the project directory with the given path exists."""
+        return Path(name).exists()
+
+    def delete(self, name: str):
+        """Drop the graph file with the given path from memory, keeping the file."""
+        with self._lock:
+            self._databases.pop(name, None)
+
+    def close(self):
+        """Drop all graphs from memory."""
+        with self._lock:
+            self._databases.clear()
@@ -0,0 +1,63 @@
+"""Module implementing the planning of queries based on statistics about the sample graph."""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from rikai.data.graph import INTEGER_LITERAL, STRING_LITERAL
+from rikai.pattern import Assignment, Block, Call, IntegerLiteral, LiteralAssignment, Operand, StringLiteral, Variable
+
+
+@dataclass(frozen=True)
+class Statistics:
+    """Class modelling the number of calls per label and literals per value of a sample graph."""
+
+    labels: Dict[str, int] = field(default_factory=dict)
+    literals: Dict[Tuple[str, Union[str, int]], int] = field(default_factory=dict)
+
+
+class QueryPlanner:
+    """
+    Class estimating the selectivity of calls from the statistics of a sample graph.
+
+    Blocks with a call without candidates are unsatisfiable and can be answered without a query. The order of the
+    calls only affects the text of generated queries and the plans shown by explain, since TypeDB plans the traversal
+    of a query itself.
+    """
+
+    def __init__(self, statistics: Statistics):
+        """Create a new planner based on the statistics of a sample graph."""
+        self._statistics = statistics
+
+    def order(self, block: Block) -> List[Tuple[int, Call]]:
+        """
+        Order the calls of the given block by their estimated number of matches.
+
+        :param block: The block to be planned.
+        :return: A list of the calls and their original indices, most selective first.
+        """
+        return sorted(enumerate(block.calls), key=lambda x: (self.estimate(block, x[1]), x[0]))
+
+    def estimate(self, block: Block, call: Call) -> int:
+        """Estimate the number of nodes matching the given call, bounded by the count of its label and its literal parameters."""
+        estimate = self._statistics.labels.get(call.label, 0)
+        for parameter in call.parameters:
+            if (literal := self._literal(block.get_definition(parameter) if isinstance(parameter, Variable) else parameter)) is not None:
+                estimate = min(estimate, self._statistics.literals.get(literal, 0))
+        return estimate
+
+    def is_satisfiable(self, block: Block) -> bool:
+        """Check whether all calls of the given block have matching candidates."""
+        return all(self.estimate(block, call) > 0 for call in block.calls)
+
+    def explain(self, block: Block) -> str:
+        """Return a description of the plan chosen for the given block."""
+        return "\n".join(f"{i}: {call} (~{self.estimate(block, call)} matches)" for i, call in self.order(block))
+
+    @staticmethod
+    def _literal(definition: Optional[Union[Operand, Assignment]]) -> Optional[Tuple[str, Union[str, int]]]:
+        """Return the type and value of literal parameters."""
+        match definition:
+            case LiteralAssignment(_, StringLiteral(value)) | StringLiteral(value):
+                return STRING_LITERAL, value
+            case LiteralAssignment(_, IntegerLiteral(value)) | IntegerLiteral(value):
+                return INTEGER_LITERAL, value
+        return None
@@ -1,31 +1,126 @@
 """Module handling the generation of TypeDB queries."""
-from typing import Any, Generator
+from typing import Any, Generator, Iterable, Optional, Set
 
-from rikai.pattern import Block, Call, CallAssignment, IntegerLiteral, LiteralAssignment, StringLiteral, UnboundVariable, Variable
+from rikai.data.planner import QueryPlanner
+from rikai.pattern import (
+    Behavior,
+    Block,
+    Call,
+    CallAssignment,
+    IntegerLiteral,
+    LiteralAssignment,
+    StringLiteral,
+    UnboundVariable,
+    Variable,
+)
 
 
 class QueryGenerator:
     """Static class handling the generation of TypeDB queries."""
 
     @staticmethod
-    def generate(block: Block) -> str:
-        """Generate a query matching the given block."""
-        return "\n".join(QueryGenerator._generate_query(block))
+    def generate(block: Block, planner: Optional[QueryPlanner] = None, limit: Optional[int] = None, files: bool = False) -> str:
+        """
+        Generate a query matching the given block.
+
+        :param block: The block to be matched.
+        :param planner: If given, the constraints of the most selective calls are written first, a hint only as TypeDB plans queries itself.
+        :param limit: The maximum number of answers, e.g. 1 to only check for existence.
+        :param files: If set, the file of the i-th call is bound to $f{i}, for databases of projects spanning several files.
+        :return: The query as a string, binding the line of the i-th call to $l{i}.
+        """
+        return "\n".join(QueryGenerator._limit(QueryGenerator._generate_query(block, planner, files), limit))
+
+    @staticmethod
+    def generate_behavior(behavior: Behavior, limit: Optional[int] = None) -> str:
+        """
+        Generate a single query expressing the disjunctions of the given behavior as or-clauses.
+
+        The query has answers whenever any expansion of the behavior matches. Only the lines of the calls outside of
+        the disjunctions are part of the answers, since variables bound in a single alternative are local to it.
+
+        :param behavior: The behavior to be matched, see can_compile.
+        :param limit: The maximum number of answers, e.g. 1 to only check for existence.
+        :return: The query as a string.
+        """
+        return "\n".join(QueryGenerator._limit(QueryGenerator._generate_behavior_query(behavior), limit))
+
+    @staticmethod
+    def can_compile(behavior: Behavior) -> bool:
+        """
+        Check whether the disjunctions of the given behavior can be expressed as or-clauses of a single query.
+
+        This requires at least one call outside of the disjunctions and that no variable is defined in several disjunctions,
+        since the definition used would depend on the combination of alternatives chosen.
+        """
+        if not behavior.block.calls:
+            return False
+        defined: Set[Variable] = set()
+        for disjunction in behavior.disjunctions:
+            variables = set().union(*(block.definitions.keys() for block in disjunction.blocks))
+            if variables & defined:
+                return False
+            defined |= variables
+        return True
 
     @staticmethod
-    def _generate_query(block: Block) -> Generator[str, Any, None]:
+    def _limit(lines: Iterable[str], limit: Optional[int]) -> Generator[str, Any, None]:
+        """Append a limit clause to the given query lines, if a limit is given."""
+        yield from lines
+        if limit is not None:
+            yield f"limit {limit};"
+
+    @staticmethod
+    def _generate_query(block: Block, planner: Optional[QueryPlanner] = None, files: bool = False) -> Generator[str, Any, None]:
         """
         Yield queries for each statement in the block, tracking the lines of Call matches.
 
         :param block: The block to be processed.
+        :param planner: The planner ordering the constraints of the calls, if any.
+        :param files: Whether the files of Call matches are tracked as well.
+        :return: Strings making up the query.
+        """
+        yield "match"
+        yield from QueryGenerator._add_calls(block, block, "", planner, files)
+        yield "get " + ", ".join(f"$f{i}, $l{i}" if files else f"$l{i}" for i, _ in enumerate(block.calls)) + ";"
+
+    @staticmethod
+    def _generate_behavior_query(behavior: Behavior) -> Generator[str, Any, None]:
+        """
+        Yield queries for the main block of the behavior and or-clauses for each of its disjunctions.
+
+        :param behavior: The behavior to be processed.
         :return: Strings making up the query.
         """
         yield "match"
-        for i, call in enumerate(block.calls):
-            call_name = f"$call{i}"
-            yield f'{call_name} isa Call, has Label "{call.label}", has Line $l{i};\n'
-            yield from QueryGenerator._add_parameters(block, call_name, call)
-        yield "get " + ", ".join(f"$l{i}" for i in range(len(block.statements))) + ";"
+        yield from QueryGenerator._add_calls(behavior.block, behavior.block, "")
+        for i, disjunction in enumerate(behavior.disjunctions):
+            alternatives = []
+            for j, block in enumerate(disjunction.blocks):
+                scope = Block(behavior.block.statements + block.statements)
+                alternatives.append("{\n" + "\n".join(QueryGenerator._add_calls(block, scope, f"d{i}a{j}")) + "\n}")
+            yield " or ".join(alternatives) + ";"
+        yield "get " + ", ".join(f"$l{i}" for i, _ in enumerate(behavior.block.calls)) + ";"
+
+    @staticmethod
+    def _add_calls(
+        block: Block, scope: Block, prefix: str, planner: Optional[QueryPlanner] = None, files: bool = False
+    ) -> Generator[str, Any, None]:
+        """
+        Generate constraints for all calls in the given block.
+
+        :param block: The block whose calls should be processed.
+        :param scope: The block containing the definitions of all variables utilized.
+        :param prefix: The prefix of all variables generated, keeping them unique in the query.
+        :param planner: The planner ordering the constraints of the calls, if None, calls are written in the order of the block.
+        :param files: Whether the file of each call is bound as well.
+        :return: Strings describing the calls and their parameters.
+        """
+        for i, call in planner.order(block) if planner else enumerate(block.calls):
+            call_name = f"${prefix}call{i}"
+            file = f", has File ${prefix}f{i}" if files else ""
+            yield f'{call_name} isa Call, has Label "{call.label}", has Line ${prefix}l{i}{file};\n'
+            yield from QueryGenerator._add_parameters(scope, call_name, call)
 
     @staticmethod
     def _add_parameters(block, call_name: str, statement: Call) -> Generator[str, Any, None]:
@@ -44,7 +139,7 @@ class QueryGenerator:
             match block.get_definition(parameter) if isinstance(parameter, Variable) else parameter:
                 case CallAssignment(target, call):
                     yield f'{call_name}_{j} isa Call, has Label "{call.label}";'
-                case LiteralAssignment(StringLiteral(value)):
+                case LiteralAssignment(_, StringLiteral(value)) | StringLiteral(value):
                     yield f'{call_name}_{j} isa StringLiteral, has StringValue "{value}";'
-                case LiteralAssignment(IntegerLiteral(value)):
+                case LiteralAssignment(_, IntegerLiteral(value)) | IntegerLiteral(value):
                     yield f"{call_name}_{j} isa IntegerLiteral, has IntegerValue {value};"
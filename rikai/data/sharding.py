@@ -0,0 +1,249 @@
+"""Module spreading the sample databases over several TypeDB servers."""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence, Set, Tuple
+
+from rikai.data.database import Database, DatabaseManager
+from rikai.util.hashing import text_digest
+from rikai.util.metrics import Metrics
+from typedb.client import TypeDBClientException  # type: ignore
+from typedb.common.exception import CLIENT_NOT_OPEN, UNABLE_TO_CONNECT  # type: ignore
+
+
+class ServerUnavailable(Exception):
+    """Exception raised when no TypeDB server is available for a database."""
+
+
+@dataclass
+class Node:
+    """Class modelling a TypeDB server of a sharded deployment."""
+
+    hostname: str
+    port: int
+    manager: Optional[DatabaseManager] = None
+    failed: Optional[float] = None
+    ingesting: int = 0
+
+    @property
+    def address(self) -> str:
+        """Return the address of the server."""
+        return f"{self.hostname}:{self.port}"
+
+
+class ShardedDatabaseManager:
+    """
+    Class managing connections to several TypeDB servers, placing the database of each sample on one of them.
+
+    Databases stay on the server they were placed on, so samples with the same content are routed to the same server,
+    including databases created by previous runs. A server which can not be reached is not sent any work until the retry
+    interval passed, and the databases placed on it are placed and ingested again on the remaining servers.
+    """
+
+    PLACEMENTS = ("least-loaded", "round-robin", "hash")
+
+    def __init__(self, servers: Sequence[Tuple[str, int]], placement: str = "least-loaded", retry: float = 30, **options: Any):
+        """
+        Create a manager connecting to the given servers.
+
+        :param servers: The hostnames and ports of the servers.
+        :param placement: The placement of new databases, one of PLACEMENTS: on the server ingesting the fewest samples and
+            holding the fewest databases, on each server in turn, or on the server selected by rendezvous hashing of the content key.
+        :param retry: The number of seconds a failed server is skipped before it is tried again.
+        :param options: The options of the DatabaseManager of each server.
+        """
+        if placement not in self.PLACEMENTS:
+            raise ValueError(f"Unknown placement {placement}, expected one of {', '.join(self.PLACEMENTS)}!")
+        self._nodes = [Node(hostname, port) for hostname, port in servers]
+        self._placement = placement
+        self._retry = retry
+        self._options = options
+        self._lock = Lock()
+        self._located: Dict[str, Node] = {}
+        self._turn = 0
+        for node in self._nodes:
+            try:
+                self._manager(node)
+            except Exception as e:
+                if not self._unavailable(e):
+                    raise
+                self._fail(node)
+
+    def provide(self, key: str, ingest: Callable[[str], Any]) -> str:
+        """
+        Return the name of the database for the given content key, ingesting it on the server it is placed on if it does not exist yet.
+
+        If the server fails, the database is placed and ingested on another server.
+
+        :param key: A key identifying the content of the database, e.g. the hash of a sample.
+        :param ingest: A function creating the database with the given name.
+        :return: The name of the database.
+        :raises ServerUnavailable: If all servers failed.
+        """
+        name = f"{DatabaseManager.PREFIX}{key}"
+        tried: Set[int] = set()
+        while True:
+            node = self._locate(name, key, tried)
+            try:
+                with self._ingesting(node):
+                    return self._route(node, lambda manager: manager.provide(key, ingest))
+            except Exception as e:
+                if not self._unavailable(e):
+                    raise
+                tried.add(id(node))
+
+    def load(
+        self,
+        name: str,
+        records: Iterable[Dict[str, Any]],
+        metrics: Optional[Metrics] = None,
+        progress: Optional[Callable[[int], Any]] = None,
+    ) -> int:
+        """Create the database with the given name on the server it is placed on and bulk import the given records, see DatabaseManager."""
+        node = self._locate(name, name)
+        return self._route(node, lambda manager: manager.load(name, records, metrics, progress))
+
+    def release(self, name: str):
+        """Unpin the database with the given name on the server it was placed on, if the server is available, see DatabaseManager."""
+        with self._lock:
+            node = self._located.get(name, None)
+        if node is None or not self._available(node):
+            return
+        try:
+            self._route(node, lambda manager: manager.release(name))
+        except Exception as e:
+            if not self._unavailable(e):
+                raise
+
+    def contains(self, name: str) -> bool:
+        """Check whether the database with the given name exists on an available server."""
+        with self._lock:
+            node = self._located.get(name, None)
+        if node is None or not self._available(node):
+            return False
+        return self._route(node, lambda manager: manager.contains(name))
+
+    def delete(self, name: str):
+        """Delete the database with the given name from the server it was placed on, if the server is available."""
+        with self._lock:
+            node = self._located.pop(name, None)
+        if node is not None and self._available(node):
+            self._route(node, lambda manager: manager.delete(name))
+
+    def get(self, name: str) -> Database:
+        """
+        Get the database with the given name from the server it was placed on, so all queries on it are sent to that server.
+
+        :param name: The name of the database.
+        :return: The database object requested.
+        :raises ServerUnavailable: If the server of the database failed.
+        """
+        with self._lock:
+            node = self._located.get(name, None)
+        assert node is not None, f"Database {name} does not exist!"
+        if not self._available(node):
+            raise ServerUnavailable(f"The server {node.address} of database {name} is unavailable!")
+        return self._route(node, lambda manager: manager.get(name))
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Return the address, availability, number of databases and number of ongoing ingestions of each server."""
+        with self._lock:
+            return [
+                {
+                    "address": node.address,
+                    "available": self._available(node),
+                    "databases": len(node.manager.databases()) if node.manager is not None else 0,
+                    "ingesting": node.ingesting,
+                }
+                for node in self._nodes
+            ]
+
+    def close(self):
+        """Close the connections to all servers."""
+        for node in self._nodes:
+            if node.manager is not None:
+                node.manager.close()
+                node.manager = None
+
+    def _create(self, hostname: str, port: int) -> DatabaseManager:
+        """Connect to the given server."""
+        return DatabaseManager(hostname, port, **self._options)
+
+    def _manager(self, node: Node) -> DatabaseManager:
+        """Return the manager of the given server, connecting to it and collecting its databases on first use or after a failure."""
+        if (manager := node.manager) is not None:
+            return manager
+        created = self._create(node.hostname, node.port)
+        with self._lock:
+            if (manager := node.manager) is None:
+                node.manager = created
+                for name in created.databases():
+                    self._located.setdefault(name, node)
+                return created
+        created.close()
+        return manager
+
+    def _route(self, node: Node, operation: Callable[[DatabaseManager], Any]) -> Any:
+        """Run the given operation on the manager of the given server, marking the server as failed if it can not be reached."""
+        try:
+            result = operation(self._manager(node))
+        except Exception as e:
+            if self._unavailable(e):
+                self._fail(node)
+            raise
+        node.failed = None
+        return result
+
+    def _locate(self, name: str, key: str, excluded: Optional[Set[int]] = None) -> Node:
+        """Return the server the given database is placed on, placing it on an available server if it is not placed yet."""
+        excluded = excluded or set()
+        with self._lock:
+            node = self._located.get(name, None)
+            if node is not None and self._available(node) and id(node) not in excluded:
+                return node
+            if not (candidates := [x for x in self._nodes if self._available(x) and id(x) not in excluded]):
+                raise ServerUnavailable(f"No TypeDB server is available for database {name}!")
+            self._located[name] = node = self._choose(candidates, key)
+            return node
+
+    def _choose(self, candidates: List[Node], key: str) -> Node:
+        """Select the server a new database is placed on, the lock has to be held."""
+        if self._placement == "hash":
+            return max(candidates, key=lambda x: text_digest(f"{x.address}/{key}"))
+        if self._placement == "round-robin":
+            self._turn += 1
+            return candidates[self._turn % len(candidates)]
+        return min(candidates, key=lambda x: (x.ingesting, len(x.manager.databases()) if x.manager is not None else 0))
+
+    @contextmanager
+    def _ingesting(self, node: Node) -> Generator[None, Any, None]:
+        """Count the enclosed ingestion as load of the given server."""
+        with self._lock:
+            node.ingesting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                node.ingesting -= 1
+
+    def _available(self, node: Node) -> bool:
+        """Check whether work may be sent to the given server, i.e. it did not fail or the retry interval passed."""
+        return node.failed is None or monotonic() - node.failed >= self._retry
+
+    def _fail(self, node: Node):
+        """Mark the given server as failed, dropping its connection."""
+        node.failed = monotonic()
+        manager, node.manager = node.manager, None
+        if manager is not None:
+            try:
+                manager.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _unavailable(error: BaseException) -> bool:
+        """Check whether the given error was caused by a server which can not be reached."""
+        if isinstance(error, TypeDBClientException):
+            return error.error_message in (UNABLE_TO_CONNECT, CLIENT_NOT_OPEN)
+        return isinstance(error, ConnectionError)
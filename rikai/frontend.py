@@ -1,14 +1,35 @@
 """Module implementing various frontends for rikai."""
+import asyncio
+import sys
 from abc import ABC
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from configparser import ConfigParser
+from contextlib import aclosing
+from functools import partial
+from itertools import islice
 from os import environ
 from pathlib import Path
-from typing import Any, Generator, Tuple
+from re import sub
+from tempfile import TemporaryDirectory
+from threading import Event, Lock, local
+from time import monotonic
+from typing import Any, AsyncGenerator, Callable, Collection, Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
+from uuid import uuid4
 
-from rikai.data.database import DatabaseManager
-from rikai.data.joernbridge import JoernBridge
+from rikai.data.cache import ResultCache
+from rikai.data.database import DatabaseInterface, DatabaseManager, QueryTimeout
+from rikai.data.graph import Location, read_records
+from rikai.data.joernbridge import JoernBridge, PersistentJoernBridge
+from rikai.data.memory import MemoryDatabaseManager
+from rikai.data.planner import QueryPlanner
+from rikai.data.sharding import ShardedDatabaseManager
 from rikai.matcher import PatternMatcher
-from rikai.pattern import Rule, RuleParser
+from rikai.pattern import CachedRuleParser, Rule, RuleChanges, RuleIndex
+from rikai.scheduler import RuleScheduler
+from rikai.util.export import DatabasePlotter
+from rikai.util.hashing import content_digest, text_digest
+from rikai.util.metrics import JsonLinesSink, Metrics, MetricsSink, PrometheusSink
+from rikai.util.watcher import DirectoryWatcher
 
 
 class FrontendInterface(ABC):
@@ -24,40 +45,679 @@ class FrontendInterface(ABC):
         """
         self._config = ConfigParser()
         self._config.read(config)
-        self._bridge = JoernBridge(config.absolute().parent.joinpath(Path(self._config.get("rikai", "Path"))))
-        self._manager = DatabaseManager(
-            environ.get(self.ENV_DBHOST, self._config.get("typedb", "Hostname")), int(self._config.get("typedb", "Port"))
+        self._directory = config.absolute().parent
+        self._bridge: Optional[JoernBridge] = None
+        if self._config.get("backend", "Type", fallback="typedb") != "memory":
+            self._bridge = self._create_bridge(self._directory.joinpath(Path(self._config.get("rikai", "Path"))))
+        self._manager = self._create_manager()
+        self._ephemeral = self._config.getboolean("typedb", "Ephemeral", fallback=False)
+        self._import = self._config.getboolean("import", "Enabled", fallback=False)
+        self.max_matches: Optional[int] = self._config.getint("rikai", "MaxMatches", fallback=0) or None
+        self.query_timeout: Optional[float] = self._config.getfloat("rikai", "QueryTimeout", fallback=0) or None
+        self.sample_timeout: Optional[float] = self._config.getfloat("rikai", "SampleTimeout", fallback=0) or None
+        # Called with the sample and the number of records of each batch committed while importing the graph of a sample.
+        self.progress: Optional[Callable[[Path, int], Any]] = None
+        self._parser = CachedRuleParser(
+            self._directory.joinpath(cache) if (cache := self._config.get("rules", "Cache", fallback=None)) else None,
+            self._config.getint("rules", "Jobs", fallback=1),
         )
-        self._parser = RuleParser()
+        self._index: Optional[RuleIndex] = None
+        self._reload_lock = Lock()
+        self._results = self._create_result_cache()
+        self.metrics = Metrics()
+        self._scheduler = RuleScheduler(self.metrics)
+        self._sink = self._create_sink()
 
-    def _preprocess(self, sample: Path) -> str:
-        """Preprocess the file at the given path utilizing the JoernBridge."""
-        return self._bridge.process_source(Path(sample))
+    @property
+    def rules(self) -> Tuple[Rule, ...]:
+        """Return all rules of the configured rule directory, parsing them on first access."""
+        return self.index.rules
+
+    @property
+    def index(self) -> RuleIndex:
+        """Return the index over all rules, parsing them on first access."""
+        if self._index is None:
+            self.load_rules()
+        return self._index  # type: ignore
+
+    def load_rules(self):
+        """Parse all rules of the configured rule directory, keeping them for the lifetime of the frontend and reporting invalid files."""
+        self._index = RuleIndex(self._parser.iterate(Path(self._config.get("rules", "Path"))))
+        for error in self._parser.errors:
+            print(f"Skipping invalid rule file {error}", file=sys.stderr)
+
+    def reload_rules(self) -> RuleChanges:
+        """
+        Parse the rule files again, only reparsing files which changed, and replace the rules atomically.
+
+        Analyses in progress keep matching the rules they started with, only analyses started afterwards use the new rules.
+
+        :return: The rules added, changed and removed by the reload.
+        """
+        with self._reload_lock, self.metrics.timer("reload"):
+            previous = self._index
+            self.load_rules()
+            return self.index.changes(previous)
+
+    def watch(self, interval: float = 1.0, stop: Optional[Event] = None) -> Generator[RuleChanges, Any, None]:
+        """
+        Watch the configured rule directory, reloading the rules whenever rule files are added, modified or removed.
+
+        :param interval: The number of seconds between two polls of the rule directory.
+        :param stop: The event stopping the watch, the rule directory is watched forever if None.
+        :return: Yield the changes of each reload which added, changed or removed any rule.
+        """
+        if self._index is None:
+            self.load_rules()
+        for _ in DirectoryWatcher(Path(self._config.get("rules", "Path")), interval=interval).watch(stop):
+            if changes := self.reload_rules():
+                yield changes
+
+    def _create_bridge(self, path: Path) -> JoernBridge:
+        """Create a bridge launching joern per sample or, if workers are configured, keeping joern processes warm."""
+        if workers := self._config.getint("rikai", "Workers", fallback=0):
+            return PersistentJoernBridge(path, workers=workers, ping_after=self._config.getfloat("rikai", "PingAfter", fallback=60))
+        return JoernBridge(path)
+
+    def _create_manager(self) -> Union[DatabaseManager, ShardedDatabaseManager, MemoryDatabaseManager]:
+        """
+        Create the manager of the configured backend, either connecting to TypeDB or loading graph files into memory.
+
+        Several comma separated hosts, each optionally with its own port, spread the sample databases over these TypeDB servers.
+        """
+        if self._bridge is None:
+            return MemoryDatabaseManager(self._config.getint("typedb", "Sessions", fallback=0))
+        port = self._config.getint("typedb", "Port")
+        servers = [
+            (hostname, int(custom) if custom else port)
+            for hostname, _, custom in (
+                host.strip().partition(":") for host in environ.get(self.ENV_DBHOST, self._config.get("typedb", "Hostname")).split(",")
+            )
+            if hostname
+        ]
+        options: Dict[str, Any] = dict(
+            sessions=self._config.getint("typedb", "Sessions", fallback=0),
+            max_age=self._config.getfloat("typedb", "TransactionAge", fallback=60),
+            retention=self._config.getint("typedb", "Retention", fallback=0),
+            batch_size=self._config.getint("import", "BatchSize", fallback=1000),
+            writers=self._config.getint("import", "Sessions", fallback=4),
+            query_timeout=self._config.getfloat("rikai", "QueryTimeout", fallback=0) or None,
+        )
+        if len(servers) > 1:
+            return ShardedDatabaseManager(
+                servers,
+                self._config.get("typedb", "Placement", fallback="least-loaded"),
+                self._config.getfloat("typedb", "Retry", fallback=30),
+                **options,
+            )
+        return DatabaseManager(*servers[0], **options)
+
+    def _create_result_cache(self) -> Optional[ResultCache]:
+        """Open the result cache, if configured, at a path relative to the config file."""
+        if not (path := self._config.get("cache", "Path", fallback=None)):
+            return None
+        return ResultCache(self._directory.joinpath(path), self._config.getint("cache", "Samples", fallback=10000), self._version)
+
+    def _create_sink(self) -> Optional[MetricsSink]:
+        """Create the sink exporting the metrics of each analysis, if configured."""
+        if not (path := self._config.get("metrics", "Path", fallback=None)):
+            return None
+        if self._config.get("metrics", "Format", fallback="prometheus") == "jsonl":
+            return JsonLinesSink(Path(path))
+        return PrometheusSink(Path(path))
+
+    def _record(self, sample: Path, metrics: Metrics):
+        """Add the metrics of an analyzed sample to the metrics of the frontend, exporting them if a sink is configured."""
+        self.metrics.merge(metrics)
+        self.metrics.increment("samples")
+        if self._sink is not None:
+            self._sink.publish(str(sample), metrics, self.metrics)
+
+    @staticmethod
+    def _report(
+        results: Iterable[Tuple[Rule, Tuple[Tuple[Location, ...], ...]]],
+        timeouts: Iterable[Rule],
+        alternatives: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> List[dict]:
+        """Return the matches of the given results with the alternatives matched, followed by the rules which timed out for json exports."""
+        alternatives = alternatives or {}
+        return [
+            rule.to_dict() | {"matches": matches} | ({"alternatives": list(alternatives[rule.name])} if rule.name in alternatives else {})
+            for rule, matches in results
+        ] + [rule.to_dict() | {"status": "timeout"} for rule in timeouts]
+
+    @property
+    def _version(self) -> str:
+        """Return a string identifying the preprocessing of samples."""
+        return self._bridge.version if self._bridge else "memory"
+
+    def _lookup(
+        self, sample: Path, rules: Iterable[Rule], metrics: Metrics, alternatives: Dict[str, Tuple[str, ...]]
+    ) -> Tuple[Optional[str], List[Tuple[Rule, Tuple[Tuple[Location, ...], ...]]], List[Rule]]:
+        """
+        Look up the cached results of the given rules on the given file.
+
+        :param sample: The path to the file or project directory to be analyzed.
+        :param rules: The rules to be matched.
+        :param metrics: The collection the time spent on the cache and the number of cached rules are recorded in.
+        :param alternatives: The dict the alternatives matched by the cached rules are stored in by rule name.
+        :return: The key of the sample, None if no cache is configured, the cached rules which matched and the rules to be matched.
+        """
+        if self._results is None:
+            return None, [], list(rules)
+        with metrics.timer("cache"):
+            key = self._results.sample_key(Path(sample), self.max_matches)
+            cached_alternatives: Dict[str, Tuple[str, ...]] = {}
+            cached = self._results.get(key, cached_alternatives)
+        matched, pending = [], []
+        for rule in rules:
+            if (matches := cached.get(rule_key := self._results.rule_key(rule), None)) is None:
+                pending.append(rule)
+                continue
+            metrics.increment("cached")
+            if rule_key in cached_alternatives:
+                alternatives[rule.name] = cached_alternatives[rule_key]
+            if matches:
+                matched.append((rule, matches))
+        return key, matched, pending
+
+    def _store(
+        self,
+        key: str,
+        rules: Iterable[Rule],
+        results: Iterable[Tuple[Rule, Tuple[Tuple[Location, ...], ...]]],
+        timeouts: Iterable[Rule],
+        alternatives: Dict[str, Tuple[str, ...]],
+        metrics: Metrics,
+    ):
+        """
+        Cache the results of the given rules on the sample with the given key, see _lookup.
+
+        :param key: The key of the sample.
+        :param rules: The rules matched, rules without results are cached as not matching.
+        :param results: The rules which matched with their matches.
+        :param timeouts: The rules which timed out, which are not cached.
+        :param alternatives: The alternatives matched by rule name.
+        :param metrics: The collection the time spent on the cache is recorded in.
+        """
+        assert self._results is not None
+        rules = list(rules)
+        cached: Dict[str, Tuple[Tuple[Location, ...], ...]] = {self._results.rule_key(rule): tuple() for rule in rules}
+        for rule, matches in results:
+            cached[self._results.rule_key(rule)] = matches
+        for rule in timeouts:
+            cached.pop(self._results.rule_key(rule), None)
+        matched = {self._results.rule_key(rule): alternatives[rule.name] for rule in rules if rule.name in alternatives}
+        with metrics.timer("cache"):
+            self._results.put(key, cached, matched)
+
+    def _preprocess(self, sample: Path, metrics: Optional[Metrics] = None) -> str:
+        """
+        Preprocess the file at the given path utilizing the JoernBridge, reusing databases of previous runs on the same content.
+
+        Databases are keyed by the content of the sample and the version of the preprocessing, so upgrading joern creates new databases.
+        Each database returned has to be passed to _release once its analysis finished.
+
+        :param sample: The path to the file or project directory to be preprocessed.
+        :param metrics: The collection the time spent on importing the graph of the sample is recorded in, if any.
+        :return: The name of the database of the sample.
+        """
+        if (bridge := self._bridge) is None:
+            return str(sample)
+        if self._ephemeral:
+            return self._ingest(bridge, Path(sample), None, metrics)
+        key = text_digest(f"{self._version}:{content_digest(Path(sample))}")
+        return self._manager.provide(key, lambda name: self._ingest(bridge, Path(sample), name, metrics))  # type: ignore
+
+    def _ingest(self, bridge: JoernBridge, sample: Path, name: Optional[str] = None, metrics: Optional[Metrics] = None) -> str:
+        """
+        Create the database of the given sample, either by joern itself or by bulk importing the graph file exported by joern.
+
+        Graphs are always imported when several TypeDB servers are configured, since joern only writes to a single server.
+        The progress of imports is reported to the progress function of the frontend, if set.
+        """
+        if not self._import and not isinstance(self._manager, ShardedDatabaseManager):
+            return bridge.process_source(sample, name)
+        name = name or str(uuid4())
+        progress = None if self.progress is None else partial(self.progress, sample)
+        with TemporaryDirectory(prefix="rikai-") as directory:
+            output = bridge.export_source(sample, Path(directory) / "graph.jsonl")
+            self._manager.load(name, read_records(output), metrics, progress)  # type: ignore
+        return name
+
+    def _release(self, db_name: str):
+        """Delete the database of an analyzed sample in ephemeral mode, otherwise unpin it so it may be deleted beyond the retention."""
+        if self._ephemeral:
+            self._manager.delete(db_name)
+        elif self._bridge is not None:
+            self._manager.release(db_name)  # type: ignore
+
+    def close(self):
+        """Terminate the warm joern workers of the bridge, if any, once the frontend is no longer used."""
+        if self._bridge is not None:
+            self._bridge.close()
 
 
 class SynchronousFrontend(FrontendInterface):
     """Blocking frontend for local usage."""
 
-    def analyze(self, sample: Path) -> Generator[Tuple[Rule, Tuple[Tuple[int, ...], ...]], Any, None]:
+    def analyze(
+        self,
+        sample: Path,
+        metrics: Optional[Metrics] = None,
+        timeouts: Optional[List[Rule]] = None,
+        alternatives: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> Generator[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], Any, None]:
         """
-        Analyze the given file.
+        Analyze the given file, reusing cached results of previous analyses of the same content.
 
-        :param sample: The path to the file to be analyzed.
+        Directories are analyzed as a single project with one database, locating matched calls by file and line.
+        Rules are matched cheapest first, rules exceeding the query timeout or the time budget of the sample are skipped.
+
+        :param sample: The path to the file or project directory to be analyzed.
+        :param metrics: The collection the timers and counters of the analysis are recorded in, if any.
+        :param timeouts: The list the rules which timed out are appended to, if any.
+        :param alternatives: The dict the names of the alternatives of disjunctions matched are stored in by rule name, if any.
         :return: A dictionary mapping the matched rules to the matching lines.
         """
-        db_name = self._preprocess(sample)
-        db = self._manager.get(db_name)
-        matcher = PatternMatcher(db)
-        for rule in self._parser.iterate(Path(self._config.get("rules", "Path"))):
-            result = matcher.match(rule.pattern)
+        metrics = metrics if metrics is not None else Metrics()
+        try:
+            yield from self._analyze(
+                sample, metrics, timeouts if timeouts is not None else [], alternatives if alternatives is not None else {}
+            )
+        finally:
+            self._record(sample, metrics)
+
+    def _analyze(
+        self, sample: Path, metrics: Metrics, timeouts: List[Rule], alternatives: Dict[str, Tuple[str, ...]]
+    ) -> Generator[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], Any, None]:
+        """Analyze the given file, only matching the rules whose results are not cached, and not caching rules which timed out."""
+        index = self.index
+        key, cached, pending = self._lookup(sample, index.rules, metrics, alternatives)
+        yield from cached
+        if not pending:
+            return
+        results = []
+        for rule, matches in self._match(sample, None if key is None else pending, metrics, index, timeouts, alternatives):
+            results.append((rule, matches))
+            yield rule, matches
+        if key is not None:
+            self._store(key, pending, results, timeouts, alternatives, metrics)
+
+    def _match(
+        self,
+        sample: Path,
+        rules: Optional[Collection[Rule]] = None,
+        metrics: Optional[Metrics] = None,
+        index: Optional[RuleIndex] = None,
+        timeouts: Optional[List[Rule]] = None,
+        alternatives: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> Generator[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], Any, None]:
+        """
+        Preprocess the given file and match the given rules on it, cheapest first.
+
+        :param sample: The path to the file to be analyzed.
+        :param rules: The rules to be matched, all rules of the index if None.
+        :param metrics: The collection the time spent per phase and per rule is recorded in, if any.
+        :param index: The index selecting the candidate rules, the current index if None.
+        :param timeouts: The list the rules exceeding the query timeout or the time budget of the sample are appended to, if any.
+        :param alternatives: The dict the names of the alternatives of disjunctions matched are stored in by rule name, if any.
+        :return: Yield all matched rules with their matching lines.
+        """
+        metrics = metrics if metrics is not None else Metrics()
+        with metrics.timer("preprocess"):
+            db_name = self._preprocess(sample, metrics)
+        try:
+            with metrics.timer("session"):
+                db = self._manager.get(db_name)
+                labels = db.get_labels()
+            yield from self._match_database(db, labels, rules, metrics, index, timeouts, alternatives)
+        finally:
+            self._release(db_name)
+
+    def _match_database(
+        self,
+        db: DatabaseInterface,
+        labels: Set[str],
+        rules: Optional[Collection[Rule]] = None,
+        metrics: Optional[Metrics] = None,
+        index: Optional[RuleIndex] = None,
+        timeouts: Optional[List[Rule]] = None,
+        alternatives: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> Generator[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], Any, None]:
+        """
+        Match the given rules on the database of an already preprocessed file, cheapest first.
+
+        :param db: The database of the file.
+        :param labels: The labels of the calls contained in the database.
+        :return: Yield all matched rules with their matching lines, see _match for the remaining parameters.
+        """
+        metrics = metrics if metrics is not None else Metrics()
+        index = index if index is not None else self.index
+        deadline = monotonic() + self.sample_timeout if self.sample_timeout else None
+        matcher = PatternMatcher(db, labels, self.max_matches, metrics, index.compiled, self.query_timeout, deadline)
+        selected = None if rules is None else {id(rule) for rule in rules}
+        candidates = [rule for rule in index.candidates(labels) if selected is None or id(rule) in selected]
+        for rule in self._scheduler.order(candidates, db.statistics, labels):
+            try:
+                with metrics.timer(Metrics.RULE + rule.name):
+                    names, result = matcher.match_alternatives(rule.pattern)
+            except QueryTimeout:
+                metrics.increment("timeouts")
+                if timeouts is not None:
+                    timeouts.append(rule)
+                continue
+            if names and alternatives is not None:
+                alternatives[rule.name] = names
             if result:
                 yield rule, result
 
+    def rematch(
+        self, samples: Iterable[Path], rules: Collection[Rule]
+    ) -> Generator[Tuple[Path, Tuple[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], ...]], Any, None]:
+        """
+        Match only the given rules on the given files, e.g. the rules changed while watching the rule directory.
+
+        Unless databases are ephemeral, the databases of samples analyzed before are reused instead of preprocessing them again.
+
+        :param samples: The paths of the files to be analyzed.
+        :param rules: The rules to be matched.
+        :return: Yield each sample with the given rules which matched.
+        """
+        index = RuleIndex(rules)
+        for sample in samples:
+            metrics = Metrics()
+            try:
+                yield sample, tuple(self._match(sample, metrics=metrics, index=index))
+            finally:
+                self._record(sample, metrics)
+
+    def explain(self, sample: Path) -> Generator[Tuple[Rule, str], Any, None]:
+        """
+        Describe the query plans chosen for all rules which could match the given file.
+
+        :param sample: The path to the file to be analyzed.
+        :return: Yield each candidate rule with the plans of its expanded blocks.
+        """
+        db_name = self._preprocess(sample)
+        try:
+            db = self._manager.get(db_name)
+            planner = QueryPlanner(db.statistics)
+            labels = db.get_labels()
+            for rule in self.index.candidates(labels):
+                yield rule, "\n\n".join(planner.explain(block) for block in rule.pattern.expand(labels))
+        finally:
+            self._release(db_name)
+
+    def plot(self, sample: Path, directory: Path, format: str = "dot", hops: int = 1) -> Generator[Path, Any, None]:
+        """
+        Plot the neighbourhood of the calls matched by each rule on the given file.
+
+        The file is preprocessed once, its database is both matched and plotted before it is released, and the plots of all rules
+        share the same passes over the database.
+
+        :param sample: The path to the file to be analyzed.
+        :param directory: The directory the plots are written to, named after the sample and the rule.
+        :param format: The format of the plots, see DatabasePlotter.FORMATS.
+        :param hops: The number of parameter relations the plotted neighbourhood of the matched calls spans.
+        :return: Yield the path of each plot written.
+        """
+        plotter = DatabasePlotter(format)
+        metrics = Metrics()
+        with metrics.timer("preprocess"):
+            db_name = self._preprocess(sample, metrics)
+        try:
+            with metrics.timer("session"):
+                db = self._manager.get(db_name)
+                labels = db.get_labels()
+            plots = {
+                directory / sub(r"[^\w.-]", "_", f"{Path(sample).name}.{rule.name}.{format}"): {loc for match in matches for loc in match}
+                for rule, matches in self._match_database(db, labels, metrics=metrics)
+            }
+            directory.mkdir(parents=True, exist_ok=True)
+            with metrics.timer("plot"):
+                plotter.save_all(db, plots, hops)
+            yield from plots
+        finally:
+            self._release(db_name)
+            self._record(sample, metrics)
+
+    def analyze_batch(
+        self, samples: Iterable[Path], jobs: int = 1, errors: Optional[List[Tuple[Path, Exception]]] = None
+    ) -> Generator[Tuple[Path, Tuple[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], ...]], Any, None]:
+        """
+        Analyze the given files concurrently, sharing the parsed rules and the database connection.
+
+        Samples are processed on a thread pool, since both the joern preprocessing and the queries
+        are mostly spent waiting on external processes. A sample whose analysis fails is skipped without
+        aborting the analysis of the remaining samples.
+
+        :param samples: The paths of the files to be analyzed.
+        :param jobs: The maximum number of samples analyzed at the same time.
+        :param errors: The list the samples which failed are appended to with their error, printed to stderr if None.
+        :return: Yield each sample with its matched rules as soon as its analysis has finished.
+        """
+        for sample, results, _, _, _, error in self._analyze_batch(samples, jobs):
+            if error is None:
+                yield sample, results
+            elif errors is not None:
+                errors.append((sample, error))
+            else:
+                print(f"Skipping sample {sample}: {type(error).__name__}: {error}", file=sys.stderr)
+
+    def _analyze_batch(
+        self, samples: Iterable[Path], jobs: int
+    ) -> Generator[
+        Tuple[
+            Path,
+            Tuple[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], ...],
+            Metrics,
+            List[Rule],
+            Dict[str, Tuple[str, ...]],
+            Optional[Exception],
+        ],
+        Any,
+        None,
+    ]:
+        """
+        Analyze the given files concurrently, yielding each sample with its results, metrics, timeouts, alternatives and error.
+
+        At most twice as many samples as jobs are submitted at a time, further samples are only submitted once others finished.
+        Closing the generator cancels the samples not started yet and waits for the running ones.
+        """
+        if self._index is None:
+            self.load_rules()
+        remaining = iter(samples)
+        futures: Dict[Future, Path] = {}
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            while True:
+                for sample in islice(remaining, 2 * jobs - len(futures)):
+                    futures[executor.submit(self._analyze_all, sample)] = sample
+                if not futures:
+                    return
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures.pop(future), *future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _analyze_all(
+        self, sample: Path
+    ) -> Tuple[
+        Tuple[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], ...], Metrics, List[Rule], Dict[str, Tuple[str, ...]], Optional[Exception]
+    ]:
+        """Analyze the given file, collecting all results, metrics, the rules which timed out, the alternatives matched and the error."""
+        metrics, timeouts, alternatives = Metrics(), [], {}  # type: Tuple[Metrics, List[Rule], Dict[str, Tuple[str, ...]]]
+        try:
+            return tuple(self.analyze(sample, metrics, timeouts, alternatives)), metrics, timeouts, alternatives, None
+        except Exception as e:
+            self.metrics.increment("failed")
+            return tuple(), metrics, timeouts, alternatives, e
+
     def report_live(self, sample: Path):
-        """Analyze the file while reporting matches on the go."""
-        for rule, matches in self.analyze(sample):
-            print(f"{rule.name} matched at {matches}")
+        """Analyze the file while reporting matches and the alternatives matched on the go, followed by the rules which timed out."""
+        timeouts: List[Rule] = []
+        alternatives: Dict[str, Tuple[str, ...]] = {}
+        for rule, matches in self.analyze(sample, timeouts=timeouts, alternatives=alternatives):
+            names = f" via {', '.join(alternatives[rule.name])}" if rule.name in alternatives else ""
+            print(f"{rule.name} matched at {matches}{names}")
+        for rule in timeouts:
+            print(f"{rule.name} timed out")
+
+    def report_dict(self, sample: Path, timings: bool = False) -> Union[list, dict]:
+        """
+        Analyze the file and return a list with the results for json exports.
+
+        Rules with disjunctions report the names of the 'alternatives' matched,
+        rules which timed out are reported with the status 'timeout' instead of their matches.
+
+        :param sample: The path to the file to be analyzed.
+        :param timings: If set, a dict with the list of 'results' and the 'timings' of the analysis is returned instead.
+        """
+        metrics, timeouts, alternatives = Metrics(), [], {}  # type: Tuple[Metrics, List[Rule], Dict[str, Tuple[str, ...]]]
+        results = self._report(list(self.analyze(sample, metrics, timeouts, alternatives)), timeouts, alternatives)
+        return {"results": results, "timings": metrics.to_dict()} if timings else results
 
-    def report_dict(self, sample: Path) -> list:
-        """Analyze the file and return a list with the results for json exports."""
-        return [rule.to_dict() | {"matches": matches} for (rule, matches) in self.analyze(sample)]  # type: ignore
+    def report_batch(self, samples: Iterable[Path], jobs: int = 1, timings: bool = False) -> Generator[dict, Any, None]:
+        """
+        Analyze the given files concurrently, yielding a dict for json exports per finished sample, optionally with its timings.
+
+        Samples whose analysis failed are reported with the 'error' instead of their 'results'.
+        """
+        for sample, results, metrics, timeouts, alternatives, error in self._analyze_batch(samples, jobs):
+            report: Dict[str, Any] = {"sample": str(sample)}
+            if error is None:
+                report["results"] = self._report(results, timeouts, alternatives)
+            else:
+                report["error"] = f"{type(error).__name__}: {error}"
+            yield report | {"timings": metrics.to_dict()} if timings else report
+
+
+class AsyncFrontend(FrontendInterface):
+    """Asynchronous frontend evaluating the rules of a sample concurrently."""
+
+    def __init__(self, config: Path = Path("config.ini"), concurrency: Optional[int] = None):
+        """
+        Create a new frontend instance based on the given config.
+
+        :param config: The path to the config file.
+        :param concurrency: The maximum number of queries in flight, defaults to [typedb] Concurrency.
+        """
+        super().__init__(config)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency or self._config.getint("typedb", "Concurrency", fallback=8))
+
+    def close(self):
+        """Cancel the queries not started yet, wait for the running ones and terminate the joern workers."""
+        self._executor.shutdown(cancel_futures=True)
+        super().close()
+
+    async def analyze(
+        self,
+        sample: Path,
+        metrics: Optional[Metrics] = None,
+        timeouts: Optional[List[Rule]] = None,
+        alternatives: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> AsyncGenerator[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], None]:
+        """
+        Analyze the given file, querying all rules concurrently, cheapest first, and reusing cached results of previous analyses.
+
+        :param sample: The path to the file to be analyzed.
+        :param metrics: The collection the timers and counters of the analysis are recorded in, if any.
+        :param timeouts: The list the rules exceeding the query timeout or the time budget of the sample are appended to, if any.
+        :param alternatives: The dict the names of the alternatives of disjunctions matched are stored in by rule name, if any.
+        :return: Yield the cached rules which matched, then the matched rules and their matching lines in the order the queries finish.
+        """
+        metrics = metrics if metrics is not None else Metrics()
+        timeouts = timeouts if timeouts is not None else []
+        alternatives = alternatives if alternatives is not None else {}
+        loop = asyncio.get_running_loop()
+        try:
+            if self._index is None:
+                await loop.run_in_executor(None, self.load_rules)
+            index = self.index
+            key, cached, pending = await loop.run_in_executor(None, self._lookup, sample, index.rules, metrics, alternatives)
+            for rule, matches in cached:
+                yield rule, matches
+            if not pending:
+                return
+            results = []
+            async with aclosing(self._match(sample, None if key is None else pending, index, metrics, timeouts, alternatives)) as matched:
+                async for rule, matches in matched:
+                    results.append((rule, matches))
+                    yield rule, matches
+            if key is not None:
+                await loop.run_in_executor(None, self._store, key, pending, results, timeouts, alternatives, metrics)
+        finally:
+            self._record(sample, metrics)
+
+    async def _match(
+        self,
+        sample: Path,
+        rules: Optional[Collection[Rule]],
+        index: RuleIndex,
+        metrics: Metrics,
+        timeouts: List[Rule],
+        alternatives: Dict[str, Tuple[str, ...]],
+    ) -> AsyncGenerator[Tuple[Rule, Tuple[Tuple[Location, ...], ...]], None]:
+        """
+        Preprocess the given file and match the given rules on it concurrently, see SynchronousFrontend._match.
+
+        Each thread of the executor matches with its own PatternMatcher. Once the matching is finished or closed early,
+        the queries not started yet are cancelled and the running ones are awaited before the database is released.
+        """
+        loop = asyncio.get_running_loop()
+        with metrics.timer("preprocess"):
+            db_name = await loop.run_in_executor(None, self._preprocess, sample, metrics)
+        futures: List[Future] = []
+        try:
+            with metrics.timer("session"):
+                db = await loop.run_in_executor(self._executor, self._manager.get, db_name)
+                labels = await loop.run_in_executor(self._executor, db.get_labels)
+            deadline = monotonic() + self.sample_timeout if self.sample_timeout else None
+            matchers = local()
+
+            def match(rule: Rule) -> Tuple[Rule, Optional[Tuple[Tuple[str, ...], Tuple[Tuple[Location, ...], ...]]]]:
+                if (matcher := getattr(matchers, "matcher", None)) is None:
+                    matcher = matchers.matcher = PatternMatcher(
+                        db, labels, self.max_matches, metrics, index.compiled, self.query_timeout, deadline
+                    )
+                try:
+                    with metrics.timer(Metrics.RULE + rule.name):
+                        return rule, matcher.match_alternatives(rule.pattern)
+                except QueryTimeout:
+                    metrics.increment("timeouts")
+                    return rule, None
+
+            selected = None if rules is None else {id(rule) for rule in rules}
+            candidates = [rule for rule in index.candidates(labels) if selected is None or id(rule) in selected]
+            futures = [self._executor.submit(match, rule) for rule in self._scheduler.order(candidates, db.statistics, labels)]
+            for completed in asyncio.as_completed([asyncio.wrap_future(future) for future in futures]):
+                rule, result = await completed
+                if result is None:
+                    timeouts.append(rule)
+                    continue
+                names, matches = result
+                if names:
+                    alternatives[rule.name] = names
+                if matches:
+                    yield rule, matches
+        finally:
+            for future in futures:
+                future.cancel()
+            await loop.run_in_executor(None, wait, futures)
+            await loop.run_in_executor(None, self._release, db_name)
+
+    async def report_dict(self, sample: Path, timings: bool = False) -> Union[list, dict]:
+        """
+        Analyze the file and return a list with the results for json exports.
+
+        Rules with disjunctions report the names of the 'alternatives' matched,
+        rules which timed out are reported with the status 'timeout' instead of their matches.
+
+        :param sample: The path to the file to be analyzed.
+        :param timings: If set, a dict with the list of 'results' and the 'timings' of the analysis is returned instead.
+        """
+        metrics, timeouts, alternatives = Metrics(), [], {}  # type: Tuple[Metrics, List[Rule], Dict[str, Tuple[str, ...]]]
+        results = self._report([result async for result in self.analyze(sample, metrics, timeouts, alternatives)], timeouts, alternatives)
+        return {"results": results, "timings": metrics.to_dict()} if timings else results
@@ -1,29 +1,133 @@
 """Module implementing classes dedicated to match pattern on database objects."""
-from typing import Tuple
+from time import monotonic
+from typing import Dict, Optional, Set, Tuple
 
-from .data.database import Database
-from .data.query import QueryGenerator
-from .pattern import Behavior
+from .data.database import DatabaseInterface, QueryTimeout
+from .data.graph import Location
+from .pattern import Behavior, Block, CompiledRuleSet
+from .pattern.compiler import BlockKey
+from .util.metrics import Metrics
 
 
 class PatternMatcher:
-    """Class matching pattern on the given database."""
+    """
+    Class matching pattern on the given database.
 
-    def __init__(self, db: Database):
-        """Create a new instance linked to the given Database object."""
+    The results of all blocks are kept by their canonical key, so blocks shared by several behaviors are only queried once per database.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseInterface,
+        labels: Optional[Set[str]] = None,
+        max_matches: Optional[int] = None,
+        metrics: Optional[Metrics] = None,
+        rules: Optional[CompiledRuleSet] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Create a new instance linked to the given Database object.
+
+        :param db: The database to be queried.
+        :param labels: The labels of all calls in the database, used to skip blocks which can not match.
+        :param max_matches: The maximum number of matches reported per behavior, e.g. 1 to only check for a match.
+        :param metrics: If given, the time spent on queries and the number of queries and matches are recorded.
+        :param rules: If given, the prefixes shared by the compiled rules are checked before matching their behaviors.
+        :param timeout: The number of seconds after which each query is cancelled, unbounded if None.
+        :param deadline: The monotonic time after which no further queries are run, e.g. the time budget of a sample.
+        """
         self._db = db
-        self._generator = QueryGenerator
+        self._labels = labels
+        self._max_matches = max_matches
+        self._metrics = metrics
+        self._rules = rules
+        self._timeout = timeout
+        self._deadline = deadline
+        self._results: Dict[BlockKey, Tuple[Tuple[Location, ...], ...]] = {}
+        self._exists: Dict[BlockKey, bool] = {}
 
-    def match(self, behavior: Behavior) -> Tuple[Tuple[int, ...], ...]:
+    def match(self, behavior: Behavior) -> Tuple[Tuple[Location, ...], ...]:
         """
         Try to match the given behavior on the database.
 
         :param behavior: The behavior to be matched.
-        :return: A tuple containing tuples with the line numbers of all matches.
+        :return: A tuple containing tuples with the locations of all matches.
+        :raises QueryTimeout: If a query exceeded the timeout or the deadline passed.
+        """
+        return self.match_alternatives(behavior)[1]
+
+    def match_alternatives(self, behavior: Behavior) -> Tuple[Tuple[str, ...], Tuple[Tuple[Location, ...], ...]]:
+        """
+        Try to match the given behavior on the database, reporting the alternatives of its disjunctions which matched.
+
+        The prefixes the behavior shares with other compiled rules are checked first, then behaviors with disjunctions
+        are checked by the database, so that only behaviors which could match are expanded.
+
+        :param behavior: The behavior to be matched.
+        :return: The names of the alternatives matched and a tuple containing tuples with the locations of all matches.
+        :raises QueryTimeout: If a query exceeded the timeout or the deadline passed.
         """
-        for block in behavior.expand():
-            query = self._generator.generate(block)
-            result = self._db.query(query)
+        if self._rules is not None and not all(self._exists_any(prefix) for prefix in self._rules.prefixes(behavior)):
+            self._count("pruned")
+            return tuple(), tuple()
+        if behavior.disjunctions and not self._may_match(behavior):
+            return tuple(), tuple()
+        for names, block in behavior.expand_named(self._labels):
+            result = self._match(block)
             if result:
-                return tuple(tuple(int(x.as_attribute().get_value()) for x in match.values()) for match in result)
-        return tuple()
+                return names, result
+        return tuple(), tuple()
+
+    def _may_match(self, behavior: Behavior) -> bool:
+        """Check whether the behavior could match, recording the time spent if metrics are collected."""
+        if self._metrics is None:
+            return self._db.may_match(behavior, self._remaining())
+        with self._metrics.timer("prefilter"):
+            return self._db.may_match(behavior, self._remaining())
+
+    def _exists_any(self, block: Block) -> bool:
+        """Check whether the given block has any match, reusing the results of identical blocks."""
+        key = CompiledRuleSet.key(block.statements)
+        if key in self._results:
+            return bool(self._results[key])
+        if key not in self._exists:
+            self._exists[key] = bool(self._query(block, 1))
+        else:
+            self._count("shared")
+        return self._exists[key]
+
+    def _match(self, block: Block) -> Tuple[Tuple[Location, ...], ...]:
+        """Match the given block on the database, reusing the results of identical blocks."""
+        key = CompiledRuleSet.key(block.statements)
+        if key in self._results:
+            self._count("shared")
+            return self._results[key]
+        if self._exists.get(key, True) is False:
+            self._count("shared")
+            return tuple()
+        result = self._results[key] = self._query(block, self._max_matches)
+        return result
+
+    def _query(self, block: Block, limit: Optional[int]) -> Tuple[Tuple[Location, ...], ...]:
+        """Query the matches of the given block, recording the query if metrics are collected."""
+        if self._metrics is None:
+            return self._db.match(block, limit, self._remaining())
+        with self._metrics.timer("query"):
+            result = self._db.match(block, limit, self._remaining())
+        self._metrics.increment("queries")
+        self._metrics.increment("rows", len(result))
+        return result
+
+    def _remaining(self) -> Optional[float]:
+        """Return the time the next query may take, bounded by the timeout and the deadline."""
+        if self._deadline is None:
+            return self._timeout
+        if (remaining := self._deadline - monotonic()) <= 0:
+            raise QueryTimeout("Time budget exhausted")
+        return remaining if self._timeout is None else min(remaining, self._timeout)
+
+    def _count(self, name: str):
+        """Increment the given counter if metrics are collected."""
+        if self._metrics is not None:
+            self._metrics.increment(name)
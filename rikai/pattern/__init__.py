@@ -1,3 +1,6 @@
 """Module implementing behavior pattern and their components."""
+from .cache import CachedRuleParser
+from .compiler import CompiledRuleSet
+from .index import RuleChanges, RuleIndex
 from .operands import EnumValue, IntegerLiteral, Literal, Operand, StringLiteral, UnboundVariable, Variable
-from .parser import Assignment, Behavior, Block, Call, CallAssignment, LiteralAssignment, PatternParser, Rule, RuleParser
+from .parser import Assignment, Behavior, Block, Call, CallAssignment, LiteralAssignment, PatternParser, Rule, RuleError, RuleParser
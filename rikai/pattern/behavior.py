@@ -2,59 +2,124 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections import ChainMap, defaultdict
+from dataclasses import dataclass, field
 from itertools import chain, product
-from typing import Any, Dict, Generator, Optional, Set, Tuple
+from typing import Any, Dict, FrozenSet, Generator, List, Optional, Sequence, Set, Tuple
 
+from .slots import Slotted
 from .statement import Assignment, Call, CallAssignment, Statement, Variable
 
 
-@dataclass(frozen=True)
-class Block:
-    """Class modelling a group of statements."""
+@dataclass(frozen=True, slots=True)
+class Block(Slotted):
+    """
+    Class modelling a group of statements.
+
+    Since blocks are immutable, all lookups are computed once on construction.
+    """
 
     statements: Tuple[Statement, ...]
+    _calls: Tuple[Call, ...] = field(init=False, repr=False, compare=False)
+    _labels: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    _variables: FrozenSet[Variable] = field(init=False, repr=False, compare=False)
+    _assignments: Tuple[Assignment, ...] = field(init=False, repr=False, compare=False)
+    _definitions: Dict[Variable, Assignment] = field(init=False, repr=False, compare=False)
+    _dependents: Dict[Variable, Tuple[Statement, ...]] = field(init=False, repr=False, compare=False)
+    _by_label: Dict[str, Tuple[Call, ...]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Index the calls, labels, variables and definitions of the block in a single pass over its statements."""
+        calls: List[Call] = []
+        assignments: List[Assignment] = []
+        variables: Set[Variable] = set()
+        dependents: Dict[Variable, List[Statement]] = defaultdict(list)
+        by_label: Dict[str, List[Call]] = defaultdict(list)
+        for statement in self.statements:
+            dependencies = statement.dependencies
+            variables |= dependencies
+            for variable in dependencies:
+                dependents[variable].append(statement)
+            if isinstance(statement, Assignment):
+                assignments.append(statement)
+                variables.add(statement.assignee)
+            call = statement.value if isinstance(statement, CallAssignment) else statement
+            if isinstance(call, Call):
+                calls.append(call)
+                by_label[call.label].append(call)
+        object.__setattr__(self, "_calls", tuple(calls))
+        object.__setattr__(self, "_labels", frozenset(by_label))
+        object.__setattr__(self, "_variables", frozenset(variables))
+        object.__setattr__(self, "_assignments", tuple(assignments))
+        object.__setattr__(self, "_definitions", {assignment.assignee: assignment for assignment in assignments})
+        object.__setattr__(self, "_dependents", {variable: tuple(statements) for variable, statements in dependents.items()})
+        object.__setattr__(self, "_by_label", {label: tuple(group) for label, group in by_label.items()})
+
+    @staticmethod
+    def join(blocks: Sequence[Block]) -> Block:
+        """
+        Concatenate the statements of the given blocks, merging their lookups instead of computing them again.
+
+        A single block is returned as is, so expansions without alternatives share the block of their behavior.
+        """
+        if len(blocks) == 1:
+            return blocks[0]
+        joined = object.__new__(Block)
+        object.__setattr__(joined, "statements", tuple(chain.from_iterable(block.statements for block in blocks)))
+        object.__setattr__(joined, "_calls", tuple(chain.from_iterable(block.calls for block in blocks)))
+        object.__setattr__(joined, "_labels", frozenset().union(*(block.labels for block in blocks)))
+        object.__setattr__(joined, "_variables", frozenset().union(*(block.variables for block in blocks)))
+        object.__setattr__(joined, "_assignments", tuple(chain.from_iterable(block.assignments for block in blocks)))
+        object.__setattr__(joined, "_definitions", dict(ChainMap(*(block.definitions for block in reversed(blocks)))))
+        object.__setattr__(joined, "_dependents", Block._merge([block._dependents for block in blocks]))
+        object.__setattr__(joined, "_by_label", Block._merge([block._by_label for block in blocks]))
+        return joined
+
+    @staticmethod
+    def _merge(lookups: Sequence[Dict[Any, Tuple[Any, ...]]]) -> Dict[Any, Tuple[Any, ...]]:
+        """Merge the given lookups, concatenating the values of keys contained in several of them."""
+        merged = dict(lookups[0])
+        for lookup in lookups[1:]:
+            for key, values in lookup.items():
+                merged[key] = merged[key] + values if key in merged else values
+        return merged
 
     @property
-    def calls(self) -> Generator[Call, Any, None]:
-        """Yield all calls contained in the block."""
-        for statement in self.statements:
-            if isinstance(statement, Call):
-                yield statement
-            elif isinstance(statement, CallAssignment):
-                yield statement.value
+    def calls(self) -> Tuple[Call, ...]:
+        """Return all calls contained in the block."""
+        return self._calls
 
     @property
-    def labels(self) -> Set[str]:
+    def labels(self) -> FrozenSet[str]:
         """Return a set of utilized labels."""
-        return {x.label for x in self.calls}
+        return self._labels
 
     @property
-    def variables(self) -> Set[Variable]:
+    def variables(self) -> FrozenSet[Variable]:
         """Return a set of all variables utilized."""
-        return {var for statement in self.statements for var in statement.variables}
+        return self._variables
 
     @property
     def assignments(self) -> Tuple[Assignment, ...]:
         """Return all assignment objects contained in the behavior."""
-        return tuple(statement for statement in self.statements if isinstance(statement, Assignment))
+        return self._assignments
 
     @property
     def definitions(self) -> Dict[Variable, Assignment]:
         """Return a dict mapping variables to their assignment statements."""
-        return {assignment.assignee: assignment for assignment in self.assignments}
+        return self._definitions
 
     def get_definition(self, variable: Variable) -> Optional[Assignment]:
         """Return the definition of the given variable."""
-        return self.definitions.get(variable, None)
+        return self._definitions.get(variable, None)
 
     def get_dependencies(self, variable: Variable) -> Tuple[Statement, ...]:
         """Return the statements depending on the given variable."""
-        return tuple(statement for statement in self.statements if variable in statement.dependencies)
+        return self._dependents.get(variable, tuple())
 
     def get_statements(self, label) -> Tuple[Call, ...]:
         """Return all calls referring to the given label."""
-        return tuple(call for call in self.calls if call.label == label)
+        return self._by_label.get(label, tuple())
 
     def __str__(self):
         """Return a string representation (reparseable)."""
@@ -65,9 +130,11 @@ class Block:
         return len(self.statements)
 
 
-class BlockContainer(ABC):
+class BlockContainer(Slotted, ABC):
     """Base interface for objects containing several blocks."""
 
+    __slots__ = ()
+
     @property
     @abstractmethod
     def blocks(self) -> Tuple[Block, ...]:
@@ -75,14 +142,14 @@ class BlockContainer(ABC):
         pass
 
     @property
-    def labels(self) -> Set[str]:
+    def labels(self) -> FrozenSet[str]:
         """Return a set of utilized labels."""
-        return set().union(*(block.labels for block in self.blocks))
+        return frozenset().union(*(block.labels for block in self.blocks))
 
     @property
-    def variables(self) -> Set[Variable]:
+    def variables(self) -> FrozenSet[Variable]:
         """Return a set of all variables utilized."""
-        return set().union(*(block.variables for block in self.blocks))
+        return frozenset().union(*(block.variables for block in self.blocks))
 
     def __iter__(self) -> Generator[Block, Any, None]:
         """Iterate ovr all blocks contained in the container."""
@@ -93,16 +160,21 @@ class BlockContainer(ABC):
         return sum(len(block) for block in self.blocks)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Disjunction(BlockContainer):
     """Class modelling a block with several alternatives."""
 
     possibilities: Dict[str, Block]
+    _blocks: Tuple[Block, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Collect the blocks of all alternatives once."""
+        object.__setattr__(self, "_blocks", tuple(self.possibilities.values()))
 
     @property
     def blocks(self) -> Tuple[Block, ...]:
         """Return all Blocks in the disjunction."""
-        return tuple(self.possibilities.values())
+        return self._blocks
 
     def __str__(self) -> str:
         """Return a string representation of the disjunction with its blocks and their names."""
@@ -111,28 +183,57 @@ class Disjunction(BlockContainer):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Behavior(BlockContainer):
     """Class modelling a behavior, potentially containing several blocks."""
 
     block: Block
     disjunctions: Tuple[Disjunction, ...]
+    _blocks: Tuple[Block, ...] = field(init=False, repr=False, compare=False)
+    _required_labels: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Collect all blocks and the labels required by every combination of them once."""
+        object.__setattr__(self, "_blocks", (self.block,) + tuple(chain.from_iterable(x.blocks for x in self.disjunctions)))
+        object.__setattr__(
+            self,
+            "_required_labels",
+            self.block.labels.union(*(frozenset.intersection(*(block.labels for block in x.blocks)) for x in self.disjunctions)),
+        )
 
-    def expand(self) -> Generator[Block, Any, None]:
-        """Iterate all possible combinations of statement blocks."""
-        for possibility in product(*map(lambda x: x.blocks, self.disjunctions)):
-            yield Block(self.block.statements + tuple(chain(*(block.statements for block in possibility))))
+    def expand(self, labels: Optional[Set[str]] = None) -> Generator[Block, Any, None]:
+        """
+        Iterate all possible combinations of statement blocks.
+
+        :param labels: If given, skip all combinations requiring labels not contained in the set.
+        """
+        for _, block in self.expand_named(labels):
+            yield block
+
+    def expand_named(self, labels: Optional[Set[str]] = None) -> Generator[Tuple[Tuple[str, ...], Block], Any, None]:
+        """
+        Iterate all possible combinations of statement blocks together with the names of the alternatives chosen.
+
+        :param labels: If given, skip all combinations requiring labels not contained in the set.
+        """
+        if labels is not None and not self.block.labels <= labels:
+            return
+        alternatives = (
+            tuple((name, block) for name, block in x.possibilities.items() if labels is None or block.labels <= labels)
+            for x in self.disjunctions
+        )
+        for possibility in product(*alternatives):
+            yield tuple(name for name, _ in possibility), Block.join((self.block,) + tuple(block for _, block in possibility))
+
+    @property
+    def required_labels(self) -> FrozenSet[str]:
+        """Return the set of labels contained in every possible combination of blocks."""
+        return self._required_labels
 
     @property
     def blocks(self) -> Tuple[Block, ...]:
         """Return a tuple of all blocks in the behavior."""
-        return tuple(self.__iter__())
-
-    def __iter__(self) -> Generator[Block, Any, None]:
-        """Iterate all blocks in the behavior."""
-        yield self.block
-        for disjunction in self.disjunctions:
-            yield from disjunction.blocks
+        return self._blocks
 
     def __str__(self):
         """Return a string representation of the behavior."""
@@ -0,0 +1,92 @@
+"""Module implementing a persistent cache of compiled rules."""
+import pickle
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Dict, Generator, Optional, Tuple, Union
+
+from .parser import RuleParser
+from .rule import Rule
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """Class modelling a compiled rule together with the state of its source file."""
+
+    mtime: int
+    size: int
+    digest: str
+    rule: Rule
+
+
+class CachedRuleParser(RuleParser):
+    """RuleParser keeping compiled rules in memory and on disk, only reparsing files that changed."""
+
+    VERSION = 3
+
+    def __init__(self, path: Optional[Path] = None, jobs: int = 1):
+        """
+        Create a new parser backed by the given cache file.
+
+        :param path: The path of the cache file, if None, rules are only cached in memory.
+        :param jobs: The number of processes parsing the rule files not contained in the cache.
+        """
+        super().__init__(jobs)
+        self._path = path
+        self._entries: Dict[Path, CacheEntry] = self._load()
+
+    def iterate(self, path: Path) -> Generator[Rule, Any, None]:
+        """
+        Iterate all rules in the given directory, parsing only files not contained in the cache.
+
+        :param path: The path to the root rule directory.
+        :return: Yield all rules found.
+        """
+        self.errors = []
+        paths = list(path.rglob("*.yaml"))
+        found: Dict[Path, CacheEntry] = {}
+        stale: Dict[Path, Tuple[int, int, str]] = {}
+        for sub_path in paths:
+            if isinstance(entry := self._get_entry(sub_path), CacheEntry):
+                found[sub_path] = entry
+            else:
+                stale[sub_path] = entry
+        for sub_path, rule in self.parse_files(list(stale)):
+            found[sub_path] = CacheEntry(*stale[sub_path], rule)
+        entries = {sub_path: found[sub_path] for sub_path in paths if sub_path in found}
+        self._entries = {key: value for key, value in self._entries.items() if not key.is_relative_to(path)} | entries
+        self._save()
+        for entry in entries.values():
+            yield entry.rule
+
+    def _get_entry(self, path: Path) -> Union[CacheEntry, Tuple[int, int, str]]:
+        """Return the cache entry for the given file or, if its content changed, the state of the file to be parsed."""
+        stat = path.stat()
+        cached = self._entries.get(path, None)
+        if cached and (cached.mtime, cached.size) == (stat.st_mtime_ns, stat.st_size):
+            return cached
+        digest = sha256(path.read_bytes()).hexdigest()
+        if cached and cached.digest == digest:
+            return CacheEntry(stat.st_mtime_ns, stat.st_size, digest, cached.rule)
+        return stat.st_mtime_ns, stat.st_size, digest
+
+    def _load(self) -> Dict[Path, CacheEntry]:
+        """Load the cache file, discarding it if it is unreadable or outdated."""
+        if self._path is None or not self._path.exists():
+            return {}
+        try:
+            with self._path.open("rb") as cache:
+                version, entries = pickle.load(cache)
+        except Exception:
+            return {}
+        return entries if version == self.VERSION else {}
+
+    def _save(self):
+        """Persist the cache, replacing the cache file atomically."""
+        if self._path is None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        buffer = self._path.with_suffix(self._path.suffix + ".tmp")
+        with buffer.open("wb") as cache:
+            pickle.dump((self.VERSION, self._entries), cache)
+        buffer.replace(self._path)
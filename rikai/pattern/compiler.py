@@ -0,0 +1,92 @@
+"""Module implementing the compilation of rule sets into blocks shared across rules."""
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from .behavior import Behavior, Block
+from .operands import Operand, Variable
+from .rule import Rule
+from .statement import Assignment, Call, Statement
+
+BlockKey = Tuple[Hashable, ...]
+
+
+class CompiledRuleSet:
+    """
+    Rule set compiled for evaluating blocks shared by several rules once per sample.
+
+    Blocks are identified by a canonical key which numbers their variables in the order of their first use,
+    so blocks only differing in the names of their variables are evaluated once and their results are shared.
+    Furthermore, the longest statement prefixes the main blocks of several rules have in common are collected:
+    since adding statements only restricts the matches of a block, a rule can be skipped if any of its shared
+    prefixes has no match, which is checked with a single query for all rules sharing the prefix.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        """
+        Compile the given rules.
+
+        :param rules: The rules to be compiled.
+        """
+        self.rules = tuple(rules)
+        keys = {id(rule): self.key(rule.pattern.block.statements) for rule in self.rules}
+        counts: Counter[BlockKey] = Counter()
+        for key in keys.values():
+            counts.update(key[:n] for n in range(1, len(key) + 1))
+        blocks: Dict[BlockKey, Block] = {}
+        self._prefixes: Dict[int, Tuple[Block, ...]] = {}
+        for rule in self.rules:
+            key, statements = keys[id(rule)], rule.pattern.block.statements
+            sharing = [counts[key[:n]] for n in range(1, len(key) + 1)] + [0]
+            prefixes = []
+            for n in range(1, len(key) + 1):
+                if sharing[n - 1] < 2:
+                    break
+                if sharing[n] == sharing[n - 1]:
+                    continue
+                if self._is_prefix(rule.pattern, n):
+                    prefixes.append(blocks.setdefault(key[:n], Block(statements[:n])))
+            self._prefixes[id(rule.pattern)] = tuple(prefixes)
+        self.shared = len(blocks)
+
+    def prefixes(self, behavior: Behavior) -> Tuple[Block, ...]:
+        """
+        Return the prefixes the given behavior shares with other rules.
+
+        :param behavior: The pattern of a compiled rule.
+        :return: The shared prefixes of its main block, shortest first, which all have to match for the behavior to match.
+        """
+        return self._prefixes.get(id(behavior), tuple())
+
+    @staticmethod
+    def key(statements: Iterable[Statement]) -> BlockKey:
+        """
+        Return the canonical key of the given statements, the key of a prefix of the statements being the prefix of their key.
+
+        :param statements: The statements of a block.
+        :return: A tuple with an entry per statement, replacing variables by the index of their first use.
+        """
+        names: Dict[Variable, int] = {}
+
+        def rename(operand: Operand) -> Hashable:
+            return names.setdefault(operand, len(names)) if isinstance(operand, Variable) else operand
+
+        def call(statement: Call) -> Hashable:
+            return statement.label, tuple(rename(parameter) for parameter in statement.parameters)
+
+        key: List[Hashable] = []
+        for statement in statements:
+            if isinstance(statement, Assignment):
+                key.append((rename(statement.assignee), call(statement.value) if isinstance(statement.value, Call) else statement.value))
+            elif isinstance(statement, Call):
+                key.append(call(statement))
+        return tuple(key)
+
+    @staticmethod
+    def _is_prefix(behavior: Behavior, n: int) -> bool:
+        """Check whether the first n statements of the main block of the behavior can be matched on their own to rule it out."""
+        prefix = Block(behavior.block.statements[:n])
+        if not prefix.calls or (n == len(behavior.block) and not behavior.disjunctions):
+            return False
+        assignees = {x.assignee for x in behavior.block.statements[n:] if isinstance(x, Assignment)}
+        assignees.update(*(block.definitions.keys() for x in behavior.disjunctions for block in x.blocks))
+        return not assignees & prefix.variables
@@ -0,0 +1,85 @@
+"""Module implementing an index selecting the rules which could match a sample."""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .compiler import CompiledRuleSet
+from .rule import Rule
+
+
+@dataclass(frozen=True)
+class RuleChanges:
+    """Class describing the differences between two rule sets."""
+
+    added: Tuple[Rule, ...] = tuple()
+    changed: Tuple[Rule, ...] = tuple()
+    removed: Tuple[str, ...] = tuple()
+
+    @property
+    def modified(self) -> Tuple[Rule, ...]:
+        """Return all rules which have to be matched again, i.e. all added and changed rules."""
+        return self.added + self.changed
+
+    def __bool__(self) -> bool:
+        """Check whether any rule was added, changed or removed."""
+        return bool(self.added or self.changed or self.removed)
+
+
+class RuleIndex:
+    """Inverted index mapping call labels to the rules requiring them, together with the compiled rule set sharing their blocks."""
+
+    def __init__(self, rules: Iterable[Rule]):
+        """
+        Create a new index over the given rules.
+
+        :param rules: The rules to be indexed.
+        """
+        self.rules = tuple(rules)
+        self.compiled = CompiledRuleSet(self.rules)
+        self._required = tuple(len(rule.pattern.required_labels) for rule in self.rules)
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        for i, rule in enumerate(self.rules):
+            for label in rule.pattern.required_labels:
+                self._index[label].append(i)
+
+    def candidates(self, labels: Set[str]) -> Tuple[Rule, ...]:
+        """
+        Return all rules which could match a sample containing the given call labels.
+
+        :param labels: The labels of all calls in the sample.
+        :return: The rules whose required labels are all contained, in their original order.
+        """
+        found = [0] * len(self.rules)
+        for label in labels:
+            for i in self._index.get(label, ()):
+                found[i] += 1
+        return tuple(
+            rule
+            for i, rule in enumerate(self.rules)
+            if found[i] == self._required[i] and next(rule.pattern.expand(labels), None) is not None
+        )
+
+    def changes(self, previous: Optional["RuleIndex"]) -> RuleChanges:
+        """
+        Compare the rules of this index to the rules of a previous index.
+
+        Rules are compared by identity, since the CachedRuleParser returns the same objects for unchanged rule files.
+
+        :param previous: The index the rules were replaced from, all rules are added if None.
+        :return: The rules added, the rules changed and the names of the rules removed.
+        """
+        if previous is None:
+            return RuleChanges(self.rules)
+        kept = {id(rule) for rule in previous.rules}
+        names = {rule.name for rule in previous.rules}
+        current = {rule.name for rule in self.rules}
+        modified = [rule for rule in self.rules if id(rule) not in kept]
+        return RuleChanges(
+            tuple(rule for rule in modified if rule.name not in names),
+            tuple(rule for rule in modified if rule.name in names),
+            tuple(rule.name for rule in previous.rules if rule.name not in current),
+        )
+
+    def __len__(self) -> int:
+        """Return the number of rules indexed."""
+        return len(self.rules)
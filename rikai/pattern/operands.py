@@ -2,20 +2,22 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
+from .slots import Slotted
 
-class Operand(ABC):
+
+class Operand(Slotted, ABC):
     """Generic base class for all operands."""
 
-    pass
+    __slots__ = ()
 
 
 class Literal(Operand):
     """Base class for all literal types."""
 
-    pass
+    __slots__ = ()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StringLiteral(Literal):
     """Base class for string literals."""
 
@@ -26,7 +28,7 @@ class StringLiteral(Literal):
         return f'"{self.value}"'
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IntegerLiteral(Literal):
     """Base class for string literals."""
 
@@ -37,7 +39,7 @@ class IntegerLiteral(Literal):
         return hex(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EnumValue(IntegerLiteral):
     """Class representing a named enum value."""
 
@@ -48,7 +50,7 @@ class EnumValue(IntegerLiteral):
         return self.name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Variable(Operand):
     """Class representing a bound variable."""
 
@@ -59,7 +61,7 @@ class Variable(Operand):
         return f"{self.name}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UnboundVariable(Operand):
     """Class representing unbound (don't care) variables."""
 
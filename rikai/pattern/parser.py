@@ -1,121 +1,254 @@
 """Module implementing the parsing of pattern and rules from strings."""
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
 from pathlib import Path
 from re import compile
-from typing import Any, Dict, Generator, Iterable, Optional, Tuple
+from sys import intern
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
 
-from yaml import safe_load
+from yaml import load
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml is not available
+    from yaml import SafeLoader  # type: ignore
 
 from .behavior import Behavior, Block, Disjunction
 from .operands import EnumValue, IntegerLiteral, Literal, Operand, StringLiteral, UnboundVariable, Variable
 from .rule import Rule
 from .statement import Assignment, Call, CallAssignment, LiteralAssignment, Statement
 
+T = TypeVar("T")
+
 
 class PatternParser:
     """Class in charge of parsing pattern and their nested objects."""
 
-    REGEX_ASSIGNMENT = compile(r"(?P<lhs>\w+) = (?P<rhs>[\S ]+)")
-    REGEX_CALL = compile(r"(?P<label>[\w@!-_]+)\((?P<parameters>[\w\- ,:\"]+)?\)")
+    REGEX_STATEMENT = compile(
+        r'(?:(?P<lhs>\w+) = )?(?:(?P<label>(?!")[\w@!-_]+)\((?P<parameters>(?:"[^"]*"|[^()"])*)\)|(?P<literal>"[^"]*"|\S+))'
+    )
+    REGEX_OPERAND = compile(r'\s*(?:(?P<index>\d+):)?(?:"(?P<string>[^"]*)"|(?P<token>[^\s,]+))?\s*(?:,|$)')
+
+    def __init__(self, definition: Dict[str, int], pool: Optional[Dict[Any, Any]] = None):
+        """
+        Generate a new PatternParser instance.
 
-    def __init__(self, definition: Dict[str, int]):
-        """Generate a new PatternParser instance."""
+        :param definition: The values of named enum constants.
+        :param pool: The objects already parsed, equal objects are shared instead of being allocated again.
+        """
         self._definitions = definition
+        self._pool: Dict[Any, Any] = pool if pool is not None else {}
 
     def parse_block(self, lines: Iterable[str]) -> Block:
         """Generate a block from an iterable returning strings."""
-        return Block(tuple(self.parse_statement(line) for line in lines))
+        return self._intern(Block(tuple(self.parse_statement(line) for line in lines)))
 
     def parse_disjunction(self, disjunction: dict) -> Disjunction:
         """Parse the given disjunction, generating a nested tuple of statements."""
         assert "or" in disjunction, f"Malformed disjunction {disjunction}!"
-        return Disjunction(
-            {
-                name: Block(tuple(self.parse_statement(statement) for statement in alternative))
-                for name, alternative in disjunction["or"].items()
-            }
-        )
+        return Disjunction({name: self.parse_block(alternative) for name, alternative in disjunction["or"].items()})
 
     def parse_behavior(self, lines: Tuple[str | Tuple[str, ...], ...]) -> Behavior:
         """Generate a behavior from an string iterable."""
         return Behavior(
-            Block(tuple(self.parse_statement(line) for line in lines if isinstance(line, str))),
+            self.parse_block(line for line in lines if isinstance(line, str)),
             tuple(self.parse_disjunction(line) for line in lines if isinstance(line, dict)),
         )
 
     def parse_statement(self, text: str) -> Statement:
-        """Parse a statement from the given string."""
-        if " = " in text:
-            return self.parse_assignment(text)
-        return self.parse_call(text)
+        """Parse a statement from the given string, reusing the statement parsed from the same text before."""
+        return self._cached(Statement, text, self._parse_statement)
+
+    def _parse_statement(self, text: str) -> Statement:
+        """
+        Parse a statement from the given string, tokenizing assignments and calls in a single pass.
+
+        Text following a call, e.g. a trailing semicolon or comment, is ignored, while literals have to end the statement.
+        """
+        if not (match := self.REGEX_STATEMENT.match(stripped := text.strip())):
+            raise ValueError(f'Malformed statement: "{text}"')
+        lhs, label, parameters, literal = match.group("lhs", "label", "parameters", "literal")
+        if label is None and match.end() != len(stripped):
+            raise ValueError(f'Malformed statement: "{text}"')
+        if label is not None:
+            call = self._intern(Call(intern(label), self._parse_parameters(parameters)))
+            return call if lhs is None else self._intern(CallAssignment(self._variable(lhs), call))
+        if lhs is None:
+            raise ValueError(f'Malformed call: "{text}"')
+        return self._intern(LiteralAssignment(self._variable(lhs), self.parse_literal(literal)))
 
     def parse_assignment(self, text: str) -> Assignment:
         """Parse an assignment from the given string."""
-        if not (match := self.REGEX_ASSIGNMENT.match(text)):
-            raise ValueError(f'Malformed call: "{text}"')
-        values = match.groupdict("")
-        if self._could_be_call(match.group("rhs")):
-            return CallAssignment(Variable(values["lhs"]), self.parse_call(values["rhs"]))
-        return LiteralAssignment(Variable(values["lhs"]), self.parse_literal(values["rhs"]))
+        if not isinstance(statement := self.parse_statement(text), Assignment):
+            raise ValueError(f'Malformed assignment: "{text}"')
+        return statement
 
     def parse_call(self, text: str) -> Call:
         """Parse a call statement from the given string."""
-        if not (match := self.REGEX_CALL.match(text)):
+        if not isinstance(statement := self.parse_statement(text), Call):
             raise ValueError(f'Malformed call: "{text}"')
-        values = match.groupdict("")
-        return Call(values["label"], self._parse_parameters(values["parameters"]))
+        return statement
 
     def parse_literal(self, text: str) -> Literal:
         """Parse a literal (e.g. integer or string) from the given string."""
         if text in self._definitions:
-            return EnumValue(self._definitions[text], text)
+            return self._intern(EnumValue(self._definitions[text], text))
         if text.startswith('"'):
-            return StringLiteral(text.strip('"'))
+            return self._intern(StringLiteral(text.strip('"')))
         if text.isnumeric():
-            return IntegerLiteral(int(text))
+            return self._intern(IntegerLiteral(int(text)))
         raise ValueError(f'"{text}" is not a valid literal!')
 
     def _parse_parameters(self, text: str) -> Tuple[Operand, ...]:
-        """Parse the parameter string, checking for the presence of indices."""
-        tokens = (parameter.strip() for parameter in filter(None, text.split(",")))
-        if ":" not in text:
-            return tuple(self._parse_operand(token) for token in tokens)
-        params = {index: operand for index, operand in (self._parse_index_operand(token) for token in tokens)}
-        last_index = max(params.keys())
-        return tuple(params[i] if i in params else UnboundVariable() for i in range(1, last_index + 1))
+        """
+        Tokenize the parameter string in a single pass.
+
+        Parameters are either all positional or all given as <index>:<operand>, missing indices are unbound. Empty parameters are skipped.
+        """
+        indices, operands, position = [], [], 0
+        while position < len(text):
+            if not (match := self.REGEX_OPERAND.match(text, position)) or match.end() == position:
+                raise ValueError(f'Malformed parameters: "{text}"')
+            index, string, token = match.group("index", "string", "token")
+            position = match.end()
+            if string is None and token is None:
+                if index is not None:
+                    raise ValueError(f'Malformed parameters: "{text}"')
+                continue
+            indices.append(index)
+            operands.append(self._intern(StringLiteral(string)) if string is not None else self._parse_token(token))
+        if all(index is None for index in indices):
+            return tuple(operands)
+        if any(index is None for index in indices):
+            raise ValueError(f'Mixed indexed and positional parameters: "{text}"')
+        params = {int(index): operand for index, operand in zip(indices, operands)}
+        return tuple(params[i] if i in params else self._intern(UnboundVariable()) for i in range(1, max(params.keys()) + 1))
 
     def _parse_operand(self, text: str) -> Operand:
         """Parse an operand from the given string."""
-        if text == UnboundVariable.SYMBOL:
-            return UnboundVariable()
-        try:
+        if text.startswith('"'):
             return self.parse_literal(text)
-        except ValueError as e:
-            return Variable(text)
+        return self._parse_token(text)
+
+    def _parse_token(self, text: str) -> Operand:
+        """Parse an unquoted operand, reusing the operand parsed from the same text before."""
+        return self._cached(Operand, text, self._parse_unquoted)
+
+    def _parse_unquoted(self, text: str) -> Operand:
+        """Parse an unquoted operand, i.e. an unbound variable, an enum value, an integer or a variable."""
+        if text == UnboundVariable.SYMBOL:
+            return self._intern(UnboundVariable())
+        if text in self._definitions:
+            return self._intern(EnumValue(self._definitions[text], text))
+        if text.isnumeric():
+            return self._intern(IntegerLiteral(int(text)))
+        return self._variable(text)
+
+    def _variable(self, name: str) -> Variable:
+        """Return the variable with the given name."""
+        return self._intern(Variable(intern(name)))
 
     def _parse_index_operand(self, text: str) -> Tuple[int, Operand]:
         """Parse an indexed operand in the form of <index>:<operand>."""
-        assert ":" in text, f"Malformed indexed operand: {text}"
-        index_string, operand_token = text.split(":", 2)
-        return int(index_string), self._parse_operand(operand_token)
+        if not (match := self.REGEX_OPERAND.fullmatch(text)):
+            raise ValueError(f"Malformed indexed operand: {text}")
+        index, string, token = match.group("index", "string", "token")
+        if index is None or (string is None and token is None):
+            raise ValueError(f"Malformed indexed operand: {text}")
+        return int(index), self._intern(StringLiteral(string)) if string is not None else self._parse_token(token)
 
-    @staticmethod
-    def _could_be_call(text: str) -> bool:
-        """Check whether the given string could be a call."""
-        return not text.startswith('"') and "(" in text
+    def _cached(self, kind: type, text: str, parse: Callable[[str], T]) -> T:
+        """
+        Return the object of the given kind parsed from the given text, parsing each text only once for all rules.
+
+        Since enum definitions are local to a rule, texts are not cached for rules defining enums.
+        """
+        if self._definitions:
+            return parse(text)
+        if (cached := self._pool.get((kind, text), None)) is None:
+            cached = self._pool[(kind, text)] = parse(text)
+        return cached
+
+    def _intern(self, value: T) -> T:
+        """Return the object equal to the given one which was parsed first, sharing it between all rules."""
+        return self._pool.setdefault(value, value)
+
+
+class RuleError(Exception):
+    """Error describing a rule file which could not be parsed."""
+
+    def __init__(self, path: Path, message: str):
+        """Create a new error for the rule file at the given path."""
+        super().__init__(path, message)
+        self.path = path
+        self.message = message
+
+    def __str__(self) -> str:
+        """Return the path of the file and the reason it could not be parsed."""
+        return f"{self.path}: {self.message}"
 
 
 class RuleParser:
     """Class dedicated to parse rule definitions from yaml files."""
 
+    def __init__(self, jobs: int = 1):
+        """
+        Create a new parser, sharing equal operands, statements and blocks between the rules parsed together.
+
+        :param jobs: The number of processes parsing rule files, rules parsed by different processes do not share objects.
+        """
+        self._pool: Dict[Any, Any] = {}
+        self._jobs = jobs
+        self.errors: List[RuleError] = []
+
     def iterate(self, path: Path) -> Generator[Rule, Any, None]:
         """
         Iterate all rules in the given directory and its subdirectories.
 
+        Files which can not be parsed are skipped and reported in the errors of the parser.
+
         :param path: The path to the root rule directory.
         :return: Yield all rules found.
         """
-        for sub_path in path.rglob("*.yaml"):
-            yield self.parse_file(sub_path)
+        self.errors = []
+        for _, rule in self.parse_files(list(path.rglob("*.yaml"))):
+            yield rule
+
+    def parse_files(self, paths: Sequence[Path]) -> Generator[Tuple[Path, Rule], Any, None]:
+        """
+        Parse the given rule files, using a process pool if several jobs are configured.
+
+        Objects are only shared between the rules of a call, the pool is cleared afterwards so reloading rules does not grow it.
+
+        :param paths: The paths of the yaml files to be parsed.
+        :return: Yield each file with its rule, in the given order, recording the files which could not be parsed as errors.
+        """
+        try:
+            if self._jobs > 1 and len(paths) > 1:
+                size = ceil(len(paths) / min(len(paths), self._jobs * 4))
+                with ProcessPoolExecutor(max_workers=self._jobs) as executor:
+                    chunks = executor.map(_parse_chunk, [paths[i:][:size] for i in range(0, len(paths), size)])
+                    results: Iterable[Tuple[Path, Union[Rule, RuleError]]] = (result for chunk in chunks for result in chunk)
+                    yield from self._collect(results)
+            else:
+                yield from self._collect((path, self._try_parse(path)) for path in paths)
+        finally:
+            self._pool.clear()
+
+    def _collect(self, results: Iterable[Tuple[Path, Union[Rule, RuleError]]]) -> Generator[Tuple[Path, Rule], Any, None]:
+        """Yield the rules parsed successfully, recording all errors."""
+        for path, result in results:
+            if isinstance(result, RuleError):
+                self.errors.append(result)
+            else:
+                yield path, result
+
+    def _try_parse(self, path: Path) -> Union[Rule, RuleError]:
+        """Parse the given file, returning the error instead of raising it."""
+        try:
+            return self.parse_file(path)
+        except Exception as error:
+            return RuleError(path, str(error) or type(error).__name__)
 
     def parse_file(self, path: Path) -> Rule:
         """
@@ -125,8 +258,9 @@ class RuleParser:
         :return: The rules contained.
         """
         with path.open("r") as source:
-            data = safe_load(source)
-        assert "pattern" in data, f"Malformed rule file {path}"
+            data = load(source, Loader=SafeLoader)
+        if not isinstance(data, dict) or "pattern" not in data:
+            raise ValueError(f"Malformed rule file {path}")
         return self.parse_rule(data)
 
     def parse_rule(self, data: dict) -> Rule:
@@ -136,5 +270,11 @@ class RuleParser:
         :param data: A dict containing a 'name', 'meta' and 'pattern' field.
         :return: The corresponding Rule object.
         """
-        parser = PatternParser(data["definitions"] if "definitions" in data else {})
+        parser = PatternParser(data["definitions"] if "definitions" in data else {}, self._pool)
         return Rule(data["name"], data["meta"], parser.parse_behavior(data["pattern"]))
+
+
+def _parse_chunk(paths: Sequence[Path]) -> List[Tuple[Path, Union[Rule, RuleError]]]:
+    """Parse the given rule files in a worker process, sharing objects between the rules of the chunk."""
+    parser = RuleParser()
+    return [(path, parser._try_parse(path)) for path in paths]
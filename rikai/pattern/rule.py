@@ -3,10 +3,11 @@ from dataclasses import dataclass
 from typing import Dict
 
 from .behavior import Behavior
+from .slots import Slotted
 
 
-@dataclass(frozen=True)
-class Rule:
+@dataclass(frozen=True, slots=True)
+class Rule(Slotted):
     """Class modelling a pattern with a name and metadata."""
 
     name: str
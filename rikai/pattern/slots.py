@@ -0,0 +1,18 @@
+"""Module implementing the base class of the compact, immutable pattern model."""
+from dataclasses import fields
+from typing import Any, Tuple
+
+
+class Slotted:
+    """
+    Base class of frozen dataclasses with slots.
+
+    Objects are pickled by the arguments of their constructor, since frozen dataclasses with slots can not be
+    restored by assigning their attributes on Python 3.10. Derived lookups are recomputed instead of being stored.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Return the class and the constructor arguments recreating the object."""
+        return self.__class__, tuple(getattr(self, field.name) for field in fields(self) if field.init)  # type: ignore
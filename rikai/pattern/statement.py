@@ -4,11 +4,14 @@ from dataclasses import dataclass
 from typing import Optional, Set, Tuple
 
 from .operands import Literal, Operand, Variable
+from .slots import Slotted
 
 
-class Statement(ABC):
+class Statement(Slotted, ABC):
     """Base interface for all statements making up a line in a behavior."""
 
+    __slots__ = ()
+
     @property
     @abstractmethod
     def defines(self) -> Set[Variable]:
@@ -26,7 +29,7 @@ class Statement(ABC):
         pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Call(Statement):
     """Class representing a call to an API function."""
 
@@ -53,7 +56,7 @@ class Call(Statement):
         return self.dependencies
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Assignment(Statement, ABC):
     """Class representing a statement defining a value."""
 
@@ -70,7 +73,7 @@ class Assignment(Statement, ABC):
         return {self.assignee}
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CallAssignment(Assignment):
     """Class assigning the return value fo a call to a variable."""
 
@@ -87,7 +90,7 @@ class CallAssignment(Assignment):
         return {self.assignee} | self.value.dependencies
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LiteralAssignment(Assignment):
     """Class assigning a literals value to a variable."""
 
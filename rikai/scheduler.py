@@ -0,0 +1,62 @@
+"""Module implementing the cost-based ordering of the rules matched on a sample."""
+from typing import Dict, Iterable, List, Set
+
+from .data.planner import QueryPlanner, Statistics
+from .pattern import Rule
+from .util.metrics import Metrics
+
+
+class RuleScheduler:
+    """
+    Class ordering rules by their estimated cost, so cheap rules are matched first and slow rules are the ones hitting a deadline.
+
+    The cost of a rule is the average time it took on previous samples, if it was matched before.
+    Otherwise, it is estimated from the number of candidate calls per statement and the number of expansions of its behavior,
+    scaled by the ratio between the measured time and the estimate of the rules matched before.
+    """
+
+    def __init__(self, history: Metrics):
+        """
+        Create a new scheduler.
+
+        :param history: The metrics accumulated over previous analyses, providing the time spent per rule.
+        """
+        self._history = history
+
+    def order(self, rules: Iterable[Rule], statistics: Statistics, labels: Set[str]) -> List[Rule]:
+        """
+        Order the given rules by their estimated cost on a sample.
+
+        :param rules: The rules to be matched.
+        :param statistics: The statistics of the sample graph.
+        :param labels: The labels of all calls in the sample.
+        :return: The rules, cheapest first, rules of equal cost keeping their order.
+        """
+        rules = list(rules)
+        planner = QueryPlanner(statistics)
+        estimates = {id(rule): self.estimate(rule, planner, labels) for rule in rules}
+        measured: Dict[int, float] = {}
+        for rule in rules:
+            if (seconds := self._history.average(Metrics.RULE + rule.name)) is not None:
+                measured[id(rule)] = seconds
+        scale = sum(measured.values()) / max(sum(estimates[x] for x in measured), 1.0) if measured else 1.0
+        return sorted(rules, key=lambda x: measured.get(id(x), estimates[id(x)] * scale))
+
+    @staticmethod
+    def estimate(rule: Rule, planner: QueryPlanner, labels: Set[str]) -> float:
+        """
+        Estimate the cost of matching the given rule without expanding its behavior.
+
+        :param rule: The rule to be estimated.
+        :param planner: The planner estimating the number of candidate calls per statement.
+        :param labels: The labels of all calls in the sample, excluding alternatives which can not match.
+        :return: The number of expansions times the number of candidate calls per expansion.
+        """
+        behavior = rule.pattern
+        candidates = float(sum(planner.estimate(behavior.block, call) for call in behavior.block.calls))
+        expansions = 1
+        for disjunction in behavior.disjunctions:
+            alternatives = [block for block in disjunction.blocks if block.labels <= labels] or list(disjunction.blocks)
+            expansions *= len(alternatives)
+            candidates += sum(planner.estimate(block, call) for block in alternatives for call in block.calls) / len(alternatives)
+        return expansions * max(candidates, 1.0)
@@ -0,0 +1,315 @@
+"""Module implementing a resident analysis service and a thin client submitting samples to it."""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from pathlib import Path
+from queue import Full, Queue
+from threading import Event, Lock, Thread
+from time import sleep, time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+from uuid import uuid4
+
+from rikai.data.sharding import ShardedDatabaseManager
+from rikai.frontend import SynchronousFrontend
+from rikai.util.metrics import PrometheusSink
+
+
+@dataclass
+class Job:
+    """Class modelling the analysis of a sample submitted to the service."""
+
+    sample: str
+    timings: bool = False
+    id: str = field(default_factory=lambda: uuid4().hex)
+    status: str = "queued"
+    submitted: float = field(default_factory=time)
+    result: Optional[Union[list, dict]] = None
+    error: Optional[str] = None
+    done: Event = field(default_factory=Event, repr=False, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the state of the job for json exports, the result being the output of report_dict once the job is done."""
+        return {"id": self.id, "sample": self.sample, "status": self.status, "result": self.result, "error": self.error}
+
+
+class ServiceFrontend(SynchronousFrontend):
+    """
+    Frontend running as a resident service, keeping the database connection, the compiled rules and joern warm between samples.
+
+    Samples are submitted over HTTP and analyzed by a fixed number of workers from a bounded queue.
+    Submissions are rejected while the queue is full, so clients back off instead of piling up work.
+    """
+
+    def __init__(self, config: Path = Path("config.ini"), workers: Optional[int] = None, capacity: Optional[int] = None):
+        """
+        Create a new service based on the given config.
+
+        :param config: The path to the config file.
+        :param workers: The number of samples analyzed concurrently, defaults to [service] Workers.
+        :param capacity: The maximum number of queued samples, defaults to [service] Queue.
+        """
+        super().__init__(config)
+        self.workers = workers or self._config.getint("service", "Workers", fallback=4)
+        self._queue: Queue[Optional[Job]] = Queue(capacity if capacity else self._config.getint("service", "Queue", fallback=64))
+        self._retention = self._config.getint("service", "Retention", fallback=1000)
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = Lock()
+        self._threads: List[Thread] = []
+
+    def submit(self, sample: Path, timings: bool = False) -> Job:
+        """
+        Queue the given sample for analysis.
+
+        :param sample: The path to the file to be analyzed, as seen by the service.
+        :param timings: If set, the result contains the timings of the analysis, see report_dict.
+        :return: The job analyzing the sample.
+        :raises queue.Full: If the queue is full.
+        """
+        job = Job(str(sample), timings)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except Full:
+            with self._lock:
+                del self._jobs[job.id]
+            self.metrics.increment("rejected")
+            raise
+        return job
+
+    def get_job(self, id: str) -> Optional[Job]:
+        """Return the job with the given id, if it is queued, running or among the most recently finished jobs."""
+        with self._lock:
+            return self._jobs.get(id, None)
+
+    def status(self) -> Dict[str, Any]:
+        """Return the number of jobs per status, the size of the queue, the number of rules loaded and the state of sharded servers."""
+        with self._lock:
+            jobs = {status: 0 for status in ("queued", "running", "done", "failed")}
+            for job in self._jobs.values():
+                jobs[job.status] += 1
+        status: Dict[str, Any] = {"jobs": jobs, "workers": self.workers, "capacity": self._queue.maxsize, "rules": len(self.index)}
+        if isinstance(self._manager, ShardedDatabaseManager):
+            status["servers"] = self._manager.status()
+        return status
+
+    def start(self):
+        """Load the rules and start the workers."""
+        if self._index is None:
+            self.load_rules()
+        self._threads = [Thread(target=self._work, name=f"rikai-worker-{i}", daemon=True) for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop the workers once all queued jobs are finished and terminate the joern workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.close()
+
+    def create_server(self, host: Optional[str] = None, port: Optional[int] = None) -> "ServiceServer":
+        """
+        Create the HTTP server of the service, which is only bound to the local host by default.
+
+        :param host: The address the server is bound to, defaults to [service] Host.
+        :param port: The port the server listens on, defaults to [service] Port, 0 selects a free port.
+        :return: The server, which still has to be run with serve_forever.
+        """
+        return ServiceServer(
+            (
+                host if host is not None else self._config.get("service", "Host", fallback="127.0.0.1"),
+                port if port is not None else self._config.getint("service", "Port", fallback=8730),
+            ),
+            self,
+        )
+
+    def serve(self, host: Optional[str] = None, port: Optional[int] = None):
+        """Run the service until it is interrupted, see create_server for the parameters."""
+        server = self.create_server(host, port)
+        self.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stop()
+
+    def _work(self):
+        """Analyze queued samples until the worker is stopped, marking jobs as failed on any error so the worker keeps running."""
+        while (job := self._queue.get()) is not None:
+            job.status = "running"
+            try:
+                job.result = self.report_dict(Path(job.sample), job.timings)
+                job.status = "done"
+            except BaseException as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = "failed"
+            finally:
+                job.done.set()
+            self._expire()
+
+    def _expire(self):
+        """Forget the oldest finished jobs exceeding the configured retention."""
+        with self._lock:
+            finished = [id for id, job in self._jobs.items() if job.done.is_set()]
+            excess = max(len(finished) - self._retention, 0)
+            for id in finished[:excess]:
+                del self._jobs[id]
+
+
+class ServiceServer(ThreadingHTTPServer):
+    """HTTP server handling each request of the service on its own thread."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], frontend: ServiceFrontend):
+        """
+        Create a new server bound to the given address.
+
+        :param address: The host and port the server listens on.
+        :param frontend: The service the requests are passed to.
+        """
+        super().__init__(address, ServiceHandler)
+        self.frontend = frontend
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the service, implementing a small json API.
+
+    POST /jobs with {"sample": path, "timings": bool} queues a sample and responds with the job, or with 503 if the queue is full.
+    GET /jobs/<id>?wait=<seconds> returns the job, waiting up to the given time for it to finish.
+    GET /status returns the state of the queue, GET /metrics the accumulated metrics in the Prometheus text format.
+    POST /reload reloads the changed rule files.
+    """
+
+    MAX_WAIT = 60.0
+
+    server: ServiceServer
+
+    def do_GET(self):
+        """Handle GET requests."""
+        url = urlparse(self.path)
+        frontend: ServiceFrontend = self.server.frontend
+        if url.path == "/status":
+            self._respond(200, frontend.status())
+        elif url.path == "/metrics":
+            text = PrometheusSink.format(frontend.metrics)
+            self._respond(200, text, "text/plain; version=0.0.4")
+        elif url.path.startswith("/jobs/") and (job := frontend.get_job(url.path.removeprefix("/jobs/"))) is not None:
+            try:
+                wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+            except ValueError:
+                wait = -1.0
+            if not wait >= 0:
+                self._respond(400, {"error": "expected a non-negative number of seconds to wait"})
+                return
+            job.done.wait(min(wait, self.MAX_WAIT))
+            self._respond(200, job.to_dict())
+        else:
+            self._respond(404, {"error": "not found"})
+
+    def do_POST(self):
+        """Handle POST requests."""
+        frontend: ServiceFrontend = self.server.frontend
+        if self.path == "/jobs":
+            try:
+                request = loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                sample = Path(request["sample"])
+            except (ValueError, KeyError, TypeError):
+                self._respond(400, {"error": "expected a json object with the path of a sample"})
+                return
+            try:
+                job = frontend.submit(sample, bool(request.get("timings", False)))
+            except Full:
+                self._respond(503, {"error": "queue full"}, headers={"Retry-After": "1"})
+                return
+            self._respond(202, job.to_dict())
+        elif self.path == "/reload":
+            changes = frontend.reload_rules()
+            self._respond(200, {"added": len(changes.added), "changed": len(changes.changed), "removed": len(changes.removed)})
+        else:
+            self._respond(404, {"error": "not found"})
+
+    def log_message(self, format: str, *args: Any):
+        """Suppress the logging of each request."""
+
+    def _respond(self, code: int, body: Any, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None):
+        """Send a response with the given body, serializing it as json unless it is a string."""
+        data = (body if isinstance(body, str) else dumps(body)).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ServiceClient:
+    """Thin client submitting samples to a running ServiceFrontend."""
+
+    def __init__(self, url: str = "http://127.0.0.1:8730"):
+        """
+        Create a new client of the service at the given url.
+
+        :param url: The base url of the service.
+        """
+        self._url = url.rstrip("/")
+
+    def submit(self, sample: Path, timings: bool = False) -> str:
+        """
+        Submit the given sample, waiting while the queue of the service is full.
+
+        :param sample: The path to the file to be analyzed, which has to be accessible to the service.
+        :param timings: If set, the result contains the timings of the analysis.
+        :return: The id of the job.
+        """
+        while True:
+            try:
+                return self._request("/jobs", {"sample": str(sample.absolute()), "timings": timings})["id"]
+            except HTTPError as e:
+                if e.code != 503:
+                    raise
+                sleep(float(e.headers.get("Retry-After", 1)))
+
+    def result(self, id: str) -> Union[list, dict]:
+        """
+        Wait for the given job to finish.
+
+        :param id: The id of the job.
+        :return: The result of the job, as returned by report_dict.
+        :raises RuntimeError: If the analysis failed.
+        """
+        while (job := self._request(f"/jobs/{id}?wait={ServiceHandler.MAX_WAIT}"))["status"] not in ("done", "failed"):
+            pass
+        if job["status"] == "failed":
+            raise RuntimeError(f"Analysis of {job['sample']} failed: {job['error']}")
+        return job["result"]
+
+    def report_dict(self, sample: Path, timings: bool = False) -> Union[list, dict]:
+        """Analyze the given file on the service and return the same output as report_dict of a local frontend."""
+        return self.result(self.submit(sample, timings))
+
+    def status(self) -> Dict[str, Any]:
+        """Return the state of the service."""
+        return self._request("/status")
+
+    def reload(self) -> Dict[str, int]:
+        """Make the service reload the changed rule files, returning the number of rules added, changed and removed."""
+        return self._request("/reload", {})
+
+    def _request(self, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a request to the service, posting the given body as json if given."""
+        data = dumps(body).encode() if body is not None else None
+        request = Request(self._url + path, data, {"Content-Type": "application/json"} if data is not None else {})
+        with urlopen(request, timeout=ServiceHandler.MAX_WAIT + 10) as response:
+            return loads(response.read())
@@ -0,0 +1,61 @@
+"""Module implementing the graph, helpers and fixtures shared by the tests."""
+from json import dumps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+from rikai.data.graph import write_records
+from rikai.pattern import Behavior, PatternParser
+
+# hMem = VirtualAlloc(0, 64); WriteProcessMemory(hProc, hMem, "payload"); Sleep(1000); Sleep(10)
+RECORDS: List[Dict[str, Any]] = [
+    {"type": "Call", "id": "c1", "label": "VirtualAlloc", "line": 3},
+    {"type": "IntegerLiteral", "id": "i1", "value": 0},
+    {"type": "IntegerLiteral", "id": "i2", "value": 64},
+    {"type": "Parameter", "source": "i1", "sink": "c1", "index": 1},
+    {"type": "Parameter", "source": "i2", "sink": "c1", "index": 2},
+    {"type": "Call", "id": "c2", "label": "WriteProcessMemory", "line": 4},
+    {"type": "Parameter", "source": "c1", "sink": "c2", "index": 2},
+    {"type": "StringLiteral", "id": "s1", "value": "payload"},
+    {"type": "Parameter", "source": "s1", "sink": "c2", "index": 3},
+    {"type": "Call", "id": "c3", "label": "Sleep", "line": 5},
+    {"type": "IntegerLiteral", "id": "i3", "value": 1000},
+    {"type": "Parameter", "source": "i3", "sink": "c3", "index": 1},
+    {"type": "Call", "id": "c4", "label": "Sleep", "line": 6},
+    {"type": "IntegerLiteral", "id": "i4", "value": 10},
+    {"type": "Parameter", "source": "i4", "sink": "c4", "index": 1},
+]
+
+
+def behavior(*lines) -> Behavior:
+    """Parse a behavior from the given lines."""
+    return PatternParser({}).parse_behavior(lines)
+
+
+@pytest.fixture
+def memory_frontend_config(tmp_path: Path) -> Callable[..., Path]:
+    """Return a function writing a config using the memory backend to the temporary directory, see write_memory_config."""
+    return lambda *args, **kwargs: write_memory_config(tmp_path, *args, **kwargs)
+
+
+def write_memory_config(
+    tmp_path: Path, rules: Optional[Dict[str, List[Any]]] = None, cache: bool = False, directory: Optional[Path] = None
+) -> Path:
+    """
+    Write a config using the memory backend with the given rules in the rules directory, and RECORDS as sample.jsonl.
+
+    :param tmp_path: The directory the rules and the sample are written to.
+    :param rules: The pattern of each rule by name, written as yaml files.
+    :param cache: Whether the rule and result caches are enabled, stored in .rikai next to the config.
+    :param directory: The directory the config is written to, the given tmp_path if None.
+    :return: The path of the config.
+    """
+    (tmp_path / "rules").mkdir(exist_ok=True)
+    for name, pattern in (rules or {}).items():
+        (tmp_path / "rules" / f"{name}.yaml").write_text(dumps({"name": name, "meta": {}, "pattern": pattern}))
+    caches = "Cache = .rikai/rules.cache\n\n[cache]\nPath = .rikai/results.sqlite\n" if cache else ""
+    config = (directory or tmp_path) / "config.ini"
+    config.parent.mkdir(parents=True, exist_ok=True)
+    config.write_text(f"[backend]\nType = memory\n\n[rules]\nPath = {tmp_path / 'rules'}\n{caches}")
+    write_records(RECORDS, tmp_path / "sample.jsonl")
+    return config
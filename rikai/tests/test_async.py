@@ -0,0 +1,70 @@
+"""Module implementing tests for evaluating the rules of a sample concurrently."""
+import asyncio
+from contextlib import aclosing
+from pathlib import Path
+from time import sleep
+from typing import List
+
+import pytest
+from rikai.data.memory import MemoryDatabase
+from rikai.frontend import AsyncFrontend, SynchronousFrontend
+
+RULES = {
+    "inject": ["x = VirtualAlloc()", "WriteProcessMemory(_, x)"],
+    "alloc": ["VirtualAlloc(0, 64)"],
+    "delay": ["Sleep(1000)"],
+    "wait": ["Sleep(_)"],
+    "thread": ["CreateRemoteThread()"],
+    "write": ['WriteProcessMemory(_, _, "payload")'],
+}
+
+
+@pytest.fixture
+def config(memory_frontend_config) -> Path:
+    """Create a config using the memory backend and the result cache, with several rules and a sample."""
+    return memory_frontend_config(RULES, cache=True)
+
+
+def names(report) -> List[str]:
+    """Return the sorted names of the rules of the given report."""
+    return sorted(result["name"] for result in report)
+
+
+class TestAsyncFrontend:
+    """Implements tests for the asynchronous frontend on the memory backend."""
+
+    def test_report(self, config: Path):
+        """Test that the asynchronous frontend reports the same results as the synchronous one, reusing cached results."""
+        sample = config.parent / "sample.jsonl"
+        frontend = AsyncFrontend(config, concurrency=4)
+        report = asyncio.run(frontend.report_dict(sample))
+        assert names(report) == ["alloc", "delay", "inject", "wait", "write"]
+        assert "cached" not in frontend.metrics.to_dict()["counters"]
+        frontend = AsyncFrontend(config, concurrency=4)
+        assert sorted(asyncio.run(frontend.report_dict(sample)), key=str) == sorted(report, key=str)
+        assert frontend.metrics.to_dict()["counters"]["cached"] == len(RULES)
+        assert sorted(SynchronousFrontend(config).report_dict(sample), key=str) == sorted(report, key=str)
+
+    def test_close(self, memory_frontend_config, monkeypatch):
+        """Test that closing the analysis early cancels pending queries and waits for running ones before the database is released."""
+        config = memory_frontend_config(RULES)
+        events: List[str] = []
+        match = MemoryDatabase.match
+
+        def slow_match(db, block, limit=None, timeout=None):
+            events.append("start")
+            sleep(0.05)
+            events.append("end")
+            return match(db, block, limit, timeout)
+
+        monkeypatch.setattr(MemoryDatabase, "match", slow_match)
+        frontend = AsyncFrontend(config, concurrency=2)
+        frontend._release = lambda name: events.append("release")  # type: ignore
+
+        async def first():
+            async with aclosing(frontend.analyze(config.parent / "sample.jsonl")) as results:
+                async for result in results:
+                    return result
+
+        assert asyncio.run(first())
+        assert events[-1] == "release" and events.count("start") == events.count("end") < len(RULES)
@@ -0,0 +1,84 @@
+"""Module implementing tests for analyzing several samples concurrently."""
+import sys
+from json import loads
+from pathlib import Path
+from subprocess import run
+from typing import List, Tuple
+
+import pytest
+from rikai.data.graph import write_records
+from rikai.frontend import SynchronousFrontend
+from rikai.tests.conftest import RECORDS
+
+CLI = Path(__file__).absolute().parents[2] / "rikai-cmd.py"
+
+
+@pytest.fixture
+def config(tmp_path: Path, memory_frontend_config) -> Path:
+    """Create a config using the memory backend, with a rule and two samples."""
+    config = memory_frontend_config({"delay": ["Sleep(1000)"]})
+    (tmp_path / "samples").mkdir()
+    write_records(RECORDS, tmp_path / "samples" / "a.jsonl")
+    write_records(RECORDS[:9], tmp_path / "samples" / "b.jsonl")
+    return config
+
+
+class TestBatch:
+    """Implements tests for the batch analysis of the frontend and the command line."""
+
+    def test_analyze_batch(self, config: Path):
+        """Test that each sample is yielded with its matches and failed samples are collected without aborting the batch."""
+        samples = config.parent / "samples"
+        frontend = SynchronousFrontend(config)
+        errors: List[Tuple[Path, Exception]] = []
+        batch = [samples / "a.jsonl", samples / "missing.jsonl", samples / "b.jsonl"]
+        results = {
+            sample.name: [(rule.name, matches) for rule, matches in results] for sample, results in frontend.analyze_batch(batch, 2, errors)
+        }
+        assert results == {"a.jsonl": [("delay", ((5,),))], "b.jsonl": []}
+        assert [sample.name for sample, _ in errors] == ["missing.jsonl"]
+        assert frontend.metrics.to_dict()["counters"]["failed"] == 1
+
+    def test_close(self, config: Path):
+        """Test that samples are submitted as others finish and closing the batch stops the analysis of the remaining samples."""
+        frontend = SynchronousFrontend(config)
+        analyzed: List[Path] = []
+        analyze_all = frontend._analyze_all
+        frontend._analyze_all = lambda sample: analyzed.append(sample) or analyze_all(sample)  # type: ignore
+        batch = frontend.analyze_batch([config.parent / "samples" / "a.jsonl"] * 30, 2)
+        assert next(batch)[0].name == "a.jsonl"
+        batch.close()
+        assert len(analyzed) <= 5
+
+    def test_report_batch(self, config: Path):
+        """Test that failed samples are reported with their error next to the results of the other samples."""
+        samples = config.parent / "samples"
+        batch = [samples / "a.jsonl", samples / "missing.jsonl", samples / "b.jsonl"]
+        reports = {Path(report["sample"]).name: report for report in SynchronousFrontend(config).report_batch(batch, 2, timings=True)}
+        assert [result["matches"] for result in reports["a.jsonl"]["results"]] == [((5,),)]
+        assert reports["b.jsonl"]["results"] == []
+        assert "error" in reports["missing.jsonl"] and "results" not in reports["missing.jsonl"]
+        assert all("timings" in report for report in reports.values())
+
+    def test_command_line(self, config: Path):
+        """Test that the command line analyzes all samples of a directory and reports failed samples without aborting."""
+        samples = config.parent / "samples"
+        arguments = [
+            sys.executable,
+            str(CLI),
+            "--config",
+            str(config),
+            "--pattern",
+            "*.jsonl",
+            "-j",
+            "2",
+            str(samples),
+            str(samples / "missing.jsonl"),
+        ]
+        result = run(arguments, capture_output=True, text=True, cwd=CLI.parent)
+        assert result.returncode == 0
+        assert result.stdout.splitlines() == [f"{samples / 'a.jsonl'}: delay matched at ((5,),)"]
+        assert "missing.jsonl failed" in result.stderr
+        result = run(arguments + ["--json"], capture_output=True, text=True, cwd=CLI.parent)
+        reports = {Path(report["sample"]).name: report for report in map(loads, result.stdout.splitlines())}
+        assert set(reports) == {"a.jsonl", "b.jsonl", "missing.jsonl"} and "error" in reports["missing.jsonl"]
@@ -0,0 +1,69 @@
+"""Module implementing tests for the lookups of blocks and behaviors."""
+import pickle
+
+from rikai.pattern import Block, Call, CallAssignment, RuleParser, Variable
+from rikai.tests.conftest import behavior
+
+
+class TestBlock:
+    """Implements tests for the lookups precomputed by blocks."""
+
+    def test_lookups(self):
+        """Test that calls, labels, definitions and dependencies are indexed."""
+        block = behavior("x = foo()", "bar(x)", "y = foo(x)").block
+        assert block.calls == (Call("foo", ()), Call("bar", (Variable("x"),)), Call("foo", (Variable("x"),)))
+        assert block.labels == {"foo", "bar"}
+        assert block.get_definition(Variable("y")) == CallAssignment(Variable("y"), Call("foo", (Variable("x"),)))
+        assert block.get_definition(Variable("z")) is None
+        assert block.get_dependencies(Variable("x")) == (
+            Call("bar", (Variable("x"),)),
+            CallAssignment(Variable("y"), Call("foo", (Variable("x"),))),
+        )
+        assert block.get_statements("foo") == (Call("foo", ()), Call("foo", (Variable("x"),)))
+
+    def test_equality(self):
+        """Test that the precomputed lookups neither affect equality nor hashing and survive pickling."""
+        first, second = behavior("x = foo()", "bar(x)").block, behavior("x = foo()", "bar(x)").block
+        assert first == second and hash(first) == hash(second)
+        assert repr(first) == f"Block(statements={first.statements!r})"
+        assert pickle.loads(pickle.dumps(first)).labels == {"foo", "bar"}
+
+    def test_join(self):
+        """Test that joined blocks have the same lookups as a block built from all statements."""
+        parts = [behavior("x = foo()", "bar(x)").block, behavior("y = foo(x)", "x = baz()", "bar(x, y)").block]
+        joined, built = Block.join(parts), Block(parts[0].statements + parts[1].statements)
+        assert joined == built
+        for name in ("calls", "labels", "variables", "assignments", "definitions"):
+            assert getattr(joined, name) == getattr(built, name)
+        for variable in (Variable("x"), Variable("y")):
+            assert joined.get_dependencies(variable) == built.get_dependencies(variable)
+        assert joined.get_statements("bar") == built.get_statements("bar")
+        assert Block.join(parts[:1]) is parts[0]
+
+
+class TestBehavior:
+    """Implements tests for the lookups precomputed by behaviors."""
+
+    def test_required_labels(self):
+        """Test that only the labels shared by all alternatives of a disjunction are required."""
+        pattern = behavior("foo()", {"or": {"a": ["bar()", "baz()"], "b": ["bar()"]}})
+        assert pattern.required_labels == {"foo", "bar"}
+        assert pattern.labels == {"foo", "bar", "baz"}
+        assert len(pattern.blocks) == 3
+
+    def test_interning(self):
+        """Test that equal operands, statements and blocks are shared between the rules of a parser."""
+        parser = RuleParser()
+        first = parser.parse_rule({"name": "a", "meta": {}, "pattern": ["x = foo(_, 1)", {"or": {"a": ["bar(x)"], "b": ["baz(x)"]}}]})
+        second = parser.parse_rule({"name": "b", "meta": {}, "pattern": ["x = foo(_, 1)", {"or": {"c": ["bar(x)"]}}]})
+        assert first.pattern.block is second.pattern.block
+        assert first.pattern.disjunctions[0].possibilities["a"] is second.pattern.disjunctions[0].possibilities["c"]
+
+    def test_interning_scope(self, tmp_path):
+        """Test that objects are shared between the rules of a directory, but the pool does not grow across reloads."""
+        for name in ("a", "b"):
+            (tmp_path / f"{name}.yaml").write_text(f"name: {name}\nmeta: {{}}\npattern:\n  - foo(1)\n")
+        parser = RuleParser()
+        first, second = parser.iterate(tmp_path)
+        assert first.pattern.block is second.pattern.block and not parser._pool
+        assert all(rule.pattern.block is not first.pattern.block for rule in parser.iterate(tmp_path)) and not parser._pool
@@ -0,0 +1,59 @@
+"""Module implementing tests for the benchmark suite and its synthetic data."""
+from rikai.benchmark import BenchmarkSuite, GraphGenerator, RuleGenerator, compare
+from rikai.data.memory import MemoryDatabase
+from rikai.pattern import RuleParser
+
+
+class TestSynthetic:
+    """Implements tests for the generation of synthetic rules and samples."""
+
+    def test_rules_parse(self, tmp_path):
+        """Test that the generated rules can be parsed with the configured number of statements and alternatives."""
+        RuleGenerator(calls=3, disjunctions=2, alternatives=3).save(5, tmp_path)
+        rules = list(RuleParser().iterate(tmp_path))
+        assert len(rules) == 5
+        for rule in rules:
+            assert len(rule.pattern.block) == 3
+            assert [len(disjunction.blocks) for disjunction in rule.pattern.disjunctions] == [3, 3]
+            assert len(list(rule.pattern.expand())) == 9
+
+    def test_deterministic(self):
+        """Test that the same seed generates the same data."""
+        assert list(RuleGenerator(seed=1).generate(3)) == list(RuleGenerator(seed=1).generate(3))
+        assert list(GraphGenerator(calls=50, seed=1).generate()) == list(GraphGenerator(calls=50, seed=1).generate())
+
+    def test_graph_loads(self, tmp_path):
+        """Test that the generated graph can be loaded by the memory backend."""
+        GraphGenerator(labels=10, calls=100).save(tmp_path / "sample.jsonl")
+        database = MemoryDatabase.load(tmp_path / "sample.jsonl")
+        assert sum(database.statistics.labels.values()) == 100
+
+
+class TestBenchmarkSuite:
+    """Implements tests for timing stages and comparing runs."""
+
+    def test_run(self, tmp_path):
+        """Test that all stages are timed the requested number of times."""
+        suite = BenchmarkSuite(tmp_path, RuleGenerator(labels=10), GraphGenerator(labels=10, calls=100), count=5, samples=2)
+        results = suite.run(repeat=2)
+        assert set(results["stages"]) == set(BenchmarkSuite.STAGES)
+        assert all(len(timing["runs"]) == 2 for timing in results["stages"].values())
+        assert results["parameters"]["count"] == 5
+        assert results["memory"]["rules"] > 0 and results["memory"]["expanded"] > 0
+
+    def test_compare(self):
+        """Test that only stages slower than the threshold are flagged as regression."""
+        baseline = {"stages": {"load": {"median": 1.0}, "match": {"median": 1.0}, "expand": {"median": 1.0}}}
+        current = {"stages": {"load": {"median": 1.05}, "match": {"median": 1.5}, "analyze": {"median": 1.0}}}
+        comparisons = {comparison.stage: comparison for comparison in compare(baseline, current)}
+        assert set(comparisons) == {"load", "match"}
+        assert not comparisons["load"].regressed(0.1)
+        assert comparisons["match"].regressed(0.1)
+        assert comparisons["match"].ratio == 1.5
+
+    def test_compare_memory(self):
+        """Test that the memory measurements are compared as well."""
+        comparisons = list(compare({"stages": {}, "memory": {"rules": 100}}, {"stages": {}, "memory": {"rules": 150}}))
+        assert [(comparison.stage, comparison.unit, comparison.regressed(0.1)) for comparison in comparisons] == [
+            ("memory.rules", "B", True)
+        ]
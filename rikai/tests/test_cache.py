@@ -0,0 +1,67 @@
+"""Module implementing tests for caching compiled rules."""
+from pathlib import Path
+
+from rikai.pattern import CachedRuleParser, Rule
+
+RULE = """name: {name}
+meta:
+  author: test
+pattern:
+  - x = VirtualAlloc()
+  - WriteProcessMemory(_, x)
+"""
+
+
+class CountingParser(CachedRuleParser):
+    """CachedRuleParser counting the rule files actually parsed."""
+
+    def __init__(self, path):
+        """Create a new parser with an empty counter."""
+        super().__init__(path)
+        self.parsed = 0
+
+    def parse_file(self, path: Path) -> Rule:
+        """Count the parsed file."""
+        self.parsed += 1
+        return super().parse_file(path)
+
+
+class TestCachedRuleParser:
+    """Implements tests for reusing compiled rules."""
+
+    def test_reuse(self, tmp_path):
+        """Test that unchanged rules are not reparsed, both in memory and across instances."""
+        rules = tmp_path / "rules"
+        rules.mkdir()
+        for i in range(3):
+            (rules / f"{i}.yaml").write_text(RULE.format(name=i))
+        parser = CountingParser(tmp_path / "rules.cache")
+        first = sorted(parser.iterate(rules), key=lambda rule: rule.name)
+        assert parser.parsed == 3 and len(first) == 3
+        assert sorted(parser.iterate(rules), key=lambda rule: rule.name) == first
+        assert parser.parsed == 3
+        restarted = CountingParser(tmp_path / "rules.cache")
+        assert sorted(restarted.iterate(rules), key=lambda rule: rule.name) == first
+        assert restarted.parsed == 0
+
+    def test_invalidation(self, tmp_path):
+        """Test that changed, added and removed rule files are picked up."""
+        rules = tmp_path / "rules"
+        rules.mkdir()
+        (rules / "a.yaml").write_text(RULE.format(name="a"))
+        (rules / "b.yaml").write_text(RULE.format(name="b"))
+        list(CountingParser(tmp_path / "rules.cache").iterate(rules))
+        (rules / "a.yaml").write_text(RULE.format(name="changed"))
+        (rules / "b.yaml").unlink()
+        (rules / "c.yaml").write_text(RULE.format(name="c"))
+        parser = CountingParser(tmp_path / "rules.cache")
+        assert sorted(rule.name for rule in parser.iterate(rules)) == ["c", "changed"]
+        assert parser.parsed == 2
+
+    def test_corrupt_cache(self, tmp_path):
+        """Test that an unreadable cache file is ignored."""
+        (tmp_path / "rules.cache").write_bytes(b"garbage")
+        rules = tmp_path / "rules"
+        rules.mkdir()
+        (rules / "a.yaml").write_text(RULE.format(name="a"))
+        assert [rule.name for rule in CachedRuleParser(tmp_path / "rules.cache").iterate(rules)] == ["a"]
@@ -0,0 +1,76 @@
+"""Module implementing tests for sharing blocks across the rules of a rule set."""
+from typing import List
+
+from rikai.data.memory import MemoryDatabase
+from rikai.matcher import PatternMatcher
+from rikai.pattern import CompiledRuleSet, RuleParser
+from rikai.tests.conftest import RECORDS, behavior
+from rikai.util.metrics import Metrics
+
+RULES: List[dict] = [
+    {"name": "inject", "meta": {}, "pattern": ["x = VirtualAlloc(0, 64)", "WriteProcessMemory(_, x)", "CreateRemoteThread()"]},
+    {"name": "write", "meta": {}, "pattern": ["y = VirtualAlloc(0, 64)", "WriteProcessMemory(_, y)", "Sleep(1000)"]},
+    {"name": "alloc", "meta": {}, "pattern": ["x = VirtualAlloc(0, 64)", "Sleep(_)"]},
+    {"name": "wait", "meta": {}, "pattern": ["Sleep(_)"]},
+    {"name": "again", "meta": {}, "pattern": ["Sleep(_)"]},
+]
+
+
+def compile_rules(*rules: dict) -> CompiledRuleSet:
+    """Compile the given rules."""
+    parser = RuleParser()
+    return CompiledRuleSet(parser.parse_rule(rule) for rule in rules)
+
+
+class TestCompiledRuleSet:
+    """Implements tests for finding the blocks shared by several rules."""
+
+    def test_key(self):
+        """Test that blocks only differing in the names of their variables share a key, which is extended by further statements."""
+        first = behavior("x = VirtualAlloc(0, 64)", "WriteProcessMemory(_, x)").block.statements
+        second = behavior("y = VirtualAlloc(0, 64)", "WriteProcessMemory(_, y)", "Sleep()").block.statements
+        assert CompiledRuleSet.key(first) == CompiledRuleSet.key(second)[:2]
+        assert CompiledRuleSet.key(first) != CompiledRuleSet.key(
+            behavior("x = VirtualAlloc(0, 64)", "WriteProcessMemory(x)").block.statements
+        )
+
+    def test_prefixes(self):
+        """Test that the longest prefixes shared by several rules are collected, shortest first."""
+        compiled = compile_rules(*RULES)
+        prefixes = {rule.name: [len(block) for block in compiled.prefixes(rule.pattern)] for rule in compiled.rules}
+        assert prefixes == {"inject": [1, 2], "write": [1, 2], "alloc": [1], "wait": [], "again": []}
+        assert compiled.shared == 2
+
+    def test_redefined(self):
+        """Test that prefixes whose variables are defined again later are not shared, since they do not restrict the rule."""
+        compiled = compile_rules(
+            {"name": "a", "meta": {}, "pattern": ["Sleep(x)", "x = 10", "Sleep(x)"]},
+            {"name": "b", "meta": {}, "pattern": ["Sleep(x)", "x = 1000", "Sleep(x)"]},
+        )
+        assert all(not compiled.prefixes(rule.pattern) for rule in compiled.rules)
+
+
+class TestSharedMatching:
+    """Implements tests for matching compiled rule sets."""
+
+    def test_match(self):
+        """Test that shared blocks are queried once and rules whose shared prefix does not match are skipped, without changing results."""
+        compiled = compile_rules(*RULES)
+        db = MemoryDatabase(RECORDS)
+        metrics = Metrics()
+        matcher = PatternMatcher(db, db.get_labels(), metrics=metrics, rules=compiled)
+        results = {rule.name: matcher.match(rule.pattern) for rule in compiled.rules}
+        plain = PatternMatcher(db, db.get_labels())
+        assert results == {rule.name: plain.match(rule.pattern) for rule in compiled.rules}
+        assert results["write"] == ((3, 4, 5),)
+        assert metrics.to_dict()["counters"]["queries"] == 5
+        assert metrics.to_dict()["counters"]["shared"] == 4
+
+    def test_pruned(self):
+        """Test that all rules sharing a prefix without matches are skipped."""
+        compiled = compile_rules(*RULES[:3])
+        db = MemoryDatabase([record for record in RECORDS if record.get("label", None) != "WriteProcessMemory"])
+        metrics = Metrics()
+        matcher = PatternMatcher(db, metrics=metrics, rules=compiled)
+        assert [matcher.match(rule.pattern) for rule in compiled.rules] == [tuple(), tuple(), ((3, 5), (3, 6))]
+        assert metrics.to_dict()["counters"]["pruned"] == 2
@@ -0,0 +1,276 @@
+"""Module implementing tests for managing the sample databases and sessions of a TypeDB server."""
+from pathlib import Path
+from threading import Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pytest
+import rikai.data.database
+from rikai.data.database import Database, DatabaseManager
+from rikai.data.graph import write_records
+from rikai.frontend import SynchronousFrontend
+from rikai.tests.conftest import RECORDS
+from rikai.util.metrics import Metrics
+
+
+class StandInTransaction:
+    """Stand-in for a TypeDB read transaction."""
+
+    def __init__(self):
+        """Open the transaction."""
+        self.open = True
+
+    def is_open(self) -> bool:
+        """Check whether the transaction is open."""
+        return self.open
+
+    def close(self):
+        """Close the transaction."""
+        self.open = False
+
+
+class StandInSession:
+    """Stand-in for a TypeDB session, keeping the transactions it opened."""
+
+    def __init__(self, name: str):
+        """Open a session on the given database."""
+        self.name = name
+        self.open = True
+        self.transactions: List[StandInTransaction] = []
+
+    def transaction(self, kind, options=None) -> StandInTransaction:
+        """Open a new transaction."""
+        assert self.open, "The session has been closed."
+        self.transactions.append(transaction := StandInTransaction())
+        return transaction
+
+    def is_open(self) -> bool:
+        """Check whether the session is open."""
+        return self.open
+
+    def close(self):
+        """Close the session."""
+        self.open = False
+
+
+class StandInDatabase:
+    """Stand-in for a database handle of the TypeDB client."""
+
+    def __init__(self, client: "StandInClient", name: str):
+        """Create a handle for the given database."""
+        self._client = client
+        self._name = name
+
+    def name(self) -> str:
+        """Return the name of the database."""
+        return self._name
+
+    def delete(self):
+        """Delete the database."""
+        self._client.names.remove(self._name)
+
+
+class StandInClient:
+    """Stand-in for a TypeDB client, keeping the names of the databases on the server and the sessions opened."""
+
+    def __init__(self, names: Optional[List[str]] = None):
+        """Create a client of a server holding the given databases."""
+        self.names = list(names or [])
+        self.sessions: List[StandInSession] = []
+
+    def databases(self) -> "StandInClient":
+        """Return the database manager, i.e. the client itself."""
+        return self
+
+    def all(self) -> List[StandInDatabase]:
+        """Return all databases."""
+        return [StandInDatabase(self, name) for name in self.names]
+
+    def contains(self, name: str) -> bool:
+        """Check whether the given database exists."""
+        return name in self.names
+
+    def get(self, name: str) -> StandInDatabase:
+        """Return the given database."""
+        return StandInDatabase(self, name)
+
+    def create(self, name: str):
+        """Create the given database."""
+        self.names.append(name)
+
+    def session(self, name: str, kind) -> StandInSession:
+        """Open a session on the given database."""
+        self.sessions.append(session := StandInSession(name))
+        return session
+
+    def close(self):
+        """Close the connection."""
+
+
+class StandInBridge:
+    """Stand-in for a JoernBridge creating empty databases, counting the samples processed."""
+
+    def __init__(self, client: StandInClient, version: str = "1"):
+        """Create a bridge writing to the given client."""
+        self.client = client
+        self.version = version
+        self.processed = 0
+        self.closed = False
+
+    def close(self):
+        """Mark the bridge as closed."""
+        self.closed = True
+
+    def process_source(self, path: Path, database_id: Optional[str] = None) -> str:
+        """Create the database of the given sample."""
+        self.processed += 1
+        self.client.create(name := database_id or f"ephemeral-{self.processed}")
+        return name
+
+    def export_source(self, path: Path, output: Path) -> Path:
+        """Export the test graph as graph file of the given sample."""
+        self.processed += 1
+        write_records(RECORDS, output)
+        return output
+
+
+@pytest.fixture
+def client(monkeypatch) -> StandInClient:
+    """Make database managers connect to a stand-in client."""
+    client = StandInClient([f"{DatabaseManager.PREFIX}old", "other"])
+    monkeypatch.setattr(rikai.data.database.TypeDB, "core_client", lambda address: client)
+    return client
+
+
+def create_frontend(config: Path, client: StandInClient, ephemeral: bool = False) -> SynchronousFrontend:
+    """Create a frontend of the given config preprocessing samples with a stand-in bridge into the given client."""
+    frontend = SynchronousFrontend(config)
+    frontend._bridge = StandInBridge(client)  # type: ignore
+    frontend._manager = DatabaseManager("localhost", 1729)
+    frontend._ephemeral = ephemeral
+    return frontend
+
+
+class TestDatabaseManager:
+    """Implements tests for providing, retaining and deleting sample databases."""
+
+    def test_provide(self, client: StandInClient):
+        """Test that the content of a key is only ingested if its database does not exist, and removed if the ingestion fails."""
+        manager = DatabaseManager("localhost", 1729)
+        ingested: List[str] = []
+
+        def ingest(name: str):
+            client.create(name)
+            ingested.append(name)
+
+        assert manager.provide("a", ingest) == manager.provide("a", ingest) == f"{DatabaseManager.PREFIX}a"
+        assert manager.provide("old", ingest) == f"{DatabaseManager.PREFIX}old"
+        assert ingested == [f"{DatabaseManager.PREFIX}a"]
+
+        def fail(name: str):
+            client.create(name)
+            raise RuntimeError("joern failed")
+
+        with pytest.raises(RuntimeError):
+            manager.provide("b", fail)
+        assert not client.contains(f"{DatabaseManager.PREFIX}b")
+
+    def test_retention(self, client: StandInClient):
+        """Test that the least recently used databases exceeding the retention are deleted once they are no longer in use."""
+        manager = DatabaseManager("localhost", 1729, retention=2)
+        assert manager.databases() == [f"{DatabaseManager.PREFIX}old"]
+        names = [manager.provide(key, client.create) for key in ("a", "b")]
+        assert not client.contains(f"{DatabaseManager.PREFIX}old") and "other" in client.names
+        manager.provide("c", client.create)
+        assert all(client.contains(name) for name in names)
+        manager.release(names[1])
+        assert client.contains(names[0]) and not client.contains(names[1])
+        manager.release(names[0])
+        assert manager.databases() == [names[0], f"{DatabaseManager.PREFIX}c"]
+
+
+class TestSessions:
+    """Implements tests for reusing sessions and read transactions."""
+
+    def test_transactions(self):
+        """Test that each thread reuses its read transaction until it is too old."""
+        session = StandInSession("a")
+        db = Database(session)  # type: ignore
+        assert db._transaction() is db._transaction()
+        other: List[StandInTransaction] = []
+        thread = Thread(target=lambda: other.append(db._transaction()))
+        thread.start()
+        thread.join()
+        assert other[0] is not db._transaction() and len(session.transactions) == 2
+        db._max_age = -1
+        first = db._transaction()
+        assert db._transaction() is not first and not first.is_open()
+        db.close()
+        assert not session.is_open() and not any(transaction.is_open() for transaction in session.transactions)
+
+    def test_reuse(self, client: StandInClient):
+        """Test that sessions are reused and only the least recently used idle sessions exceeding the capacity are closed."""
+        client.names += ["a", "b"]
+        manager = DatabaseManager("localhost", 1729, sessions=1)
+        a, b = manager.get("a"), manager.get("b")
+        assert manager.get("a") is a and len(client.sessions) == 2
+        assert all(session.is_open() for session in client.sessions)
+        manager.release("a")
+        assert client.sessions[0].is_open()
+        manager.release("a")
+        assert not client.sessions[0].is_open() and client.sessions[1].is_open()
+        manager.release("b")
+        assert manager.get("b") is b and len(client.sessions) == 2
+
+
+class TestPreprocessing:
+    """Implements tests for the databases the frontend creates for samples."""
+
+    def test_version(self, tmp_path: Path, client: StandInClient, memory_frontend_config):
+        """Test that databases are reused for the same content and version, and created again once the preprocessing changed."""
+        frontend = create_frontend(memory_frontend_config(), client)
+        bridge: StandInBridge = frontend._bridge  # type: ignore
+        (sample := tmp_path / "a.c").write_text("int main() { return 0; }")
+        names = [frontend._preprocess(sample) for _ in range(2)]
+        bridge.version = "2"
+        names.append(frontend._preprocess(sample))
+        for name in names:
+            frontend._release(name)
+        assert names[0] == names[1] != names[2] and bridge.processed == 2
+        assert all(client.contains(name) for name in names)
+
+    def test_ephemeral(self, tmp_path: Path, client: StandInClient, memory_frontend_config):
+        """Test that ephemeral databases are created for each analysis and deleted once it finished."""
+        frontend = create_frontend(memory_frontend_config(), client, ephemeral=True)
+        (sample := tmp_path / "a.c").write_text("int main() { return 0; }")
+        names = [frontend._preprocess(sample) for _ in range(2)]
+        assert names[0] != names[1] and all(client.contains(name) for name in names)
+        for name in names:
+            frontend._release(name)
+        assert client.names == [f"{DatabaseManager.PREFIX}old", "other"]
+
+    def test_close(self, client: StandInClient, memory_frontend_config):
+        """Test that closing the frontend closes its bridge."""
+        frontend = create_frontend(memory_frontend_config(), client)
+        frontend.close()
+        assert frontend._bridge.closed  # type: ignore
+
+    def test_import(self, tmp_path: Path, client: StandInClient, memory_frontend_config):
+        """Test that imports are recorded in the metrics of the analyzed sample and reported to the progress function."""
+        frontend = create_frontend(memory_frontend_config(), client)
+        frontend._import = True
+        progress: List[Tuple[Path, int]] = []
+        frontend.progress = lambda sample, records: progress.append((sample, records))
+
+        def load(name: str, records: Iterable[Dict[str, Any]], metrics: Optional[Metrics], report: Callable[[int], Any]) -> int:
+            client.create(name)
+            with metrics.timer("import.nodes"):  # type: ignore
+                count = len(list(records))
+            report(count)
+            return count
+
+        frontend._manager.load = load  # type: ignore
+        (sample := tmp_path / "a.c").write_text("int main() { return 0; }")
+        metrics = Metrics()
+        frontend._release(frontend._preprocess(sample, metrics))
+        assert "import.nodes" in metrics.to_dict()["phases"] and "import.nodes" not in frontend.metrics.to_dict()["phases"]
+        assert progress == [(sample, len(RECORDS))]
@@ -0,0 +1,78 @@
+"""Module implementing tests for plotting databases."""
+from json import loads
+from xml.etree import ElementTree
+
+import pytest
+from rikai.data.memory import MemoryDatabase
+from rikai.frontend import SynchronousFrontend
+from rikai.tests.conftest import RECORDS
+from rikai.util.export import DatabasePlotter
+
+
+@pytest.fixture
+def db() -> MemoryDatabase:
+    """Create a database of the test graph."""
+    return MemoryDatabase(RECORDS)
+
+
+class TestDatabasePlotter:
+    """Implements tests for plotting whole databases and neighbourhoods of matches."""
+
+    def test_dot(self, db):
+        """Test that all nodes and relations are plotted in dot-format."""
+        lines = list(DatabasePlotter().plot(db))
+        assert lines[0] == DatabasePlotter.PROLOGUE and lines[-1] == DatabasePlotter.EPILOGUE
+        assert '"c1" [label="VirtualAlloc:3", shape="box"];' in lines
+        assert '"s1" [label="payload"];' in lines
+        assert '"c1" -> "c2" [label="2"];' in lines
+        assert len(lines) == len(RECORDS) + 2
+
+    @pytest.mark.parametrize(
+        "hops,nodes",
+        [
+            (0, {"c2"}),
+            (1, {"c1", "c2", "s1"}),
+            (2, {"c1", "c2", "s1", "i1", "i2"}),
+        ],
+    )
+    def test_neighbourhood(self, db, hops, nodes):
+        """Test that only the neighbourhood of the focused calls and the relations within it are plotted."""
+        graph = loads("".join(DatabasePlotter("json").plot(db, {4}, hops)))
+        assert {node["id"] for node in graph["nodes"]} == nodes
+        assert all(edge["source"] in nodes and edge["sink"] in nodes for edge in graph["edges"])
+        assert len(graph["edges"]) == len(nodes) - 1
+
+    def test_save_all(self, db, tmp_path, monkeypatch):
+        """Test that several neighbourhoods are plotted as by save, sharing one pass over the records and one over the relations per hop."""
+        plots = {tmp_path / "alloc.dot": {3}, tmp_path / "write.dot": {4}, tmp_path / "sleep.dot": {5, 6}}
+        for path, focus in plots.items():
+            DatabasePlotter().save(db, path.with_suffix(".single"), focus, 2)
+        passes = []
+        for method in ("get_records", "get_parameters"):
+            monkeypatch.setattr(db, method, lambda method=getattr(db, method), name=method: passes.append(name) or method())
+        DatabasePlotter().save_all(db, plots, 2)
+        assert sorted(passes) == ["get_parameters"] * 2 + ["get_records"] * 2
+        assert all(path.read_text() == path.with_suffix(".single").read_text() for path in plots)
+
+    def test_graphml(self, db, tmp_path):
+        """Test that plots in the GraphML format are well-formed."""
+        DatabasePlotter("graphml").save(db, tmp_path / "plot.graphml")
+        graph = ElementTree.parse(tmp_path / "plot.graphml").getroot()[-1]
+        assert len(graph) == len(RECORDS)
+
+    def test_frontend(self, tmp_path, monkeypatch, memory_frontend_config):
+        """Test that the frontend plots the neighbourhood of the matches of each rule, preprocessing the sample only once."""
+        frontend = SynchronousFrontend(memory_frontend_config({"sleep": ["Sleep(1000)"]}))
+        preprocessed = []
+        preprocess = frontend._preprocess
+        monkeypatch.setattr(
+            frontend, "_preprocess", lambda sample, metrics=None: preprocessed.append(sample) or preprocess(sample, metrics)
+        )
+        assert list(frontend.plot(tmp_path / "sample.jsonl", tmp_path / "plots")) == [tmp_path / "plots" / "sample.jsonl.sleep.dot"]
+        assert (tmp_path / "plots" / "sample.jsonl.sleep.dot").read_text().count("->") == 1
+        assert preprocessed == [tmp_path / "sample.jsonl"]
+
+    def test_format(self):
+        """Test that unknown formats are rejected."""
+        with pytest.raises(ValueError):
+            DatabasePlotter("png")
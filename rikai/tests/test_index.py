@@ -0,0 +1,66 @@
+"""Module implementing tests for selecting rules based on the labels of a sample."""
+from typing import List
+
+import pytest
+from rikai.pattern import RuleIndex, RuleParser
+
+RULES: List[dict] = [
+    {"name": "alloc", "meta": {}, "pattern": ["x = VirtualAlloc()", "WriteProcessMemory(_, x)"]},
+    {"name": "crypt", "meta": {}, "pattern": ["CryptAcquireContextA()", {"or": {"a": ["CryptEncrypt()"], "b": ["CryptDecrypt()"]}}]},
+    {"name": "sleep", "meta": {}, "pattern": [{"or": {"a": ["Sleep()", "GetTickCount()"], "b": ["Sleep()", "NtDelayExecution()"]}}]},
+]
+
+
+@pytest.fixture
+def index() -> RuleIndex:
+    """Create an index over the test rules."""
+    parser = RuleParser()
+    return RuleIndex(parser.parse_rule(rule) for rule in RULES)
+
+
+class TestRuleIndex:
+    """Implements tests for the label based rule preselection."""
+
+    @pytest.mark.parametrize(
+        "labels,names",
+        [
+            (set(), []),
+            ({"VirtualAlloc"}, []),
+            ({"VirtualAlloc", "WriteProcessMemory", "printf"}, ["alloc"]),
+            ({"CryptAcquireContextA"}, []),
+            ({"CryptAcquireContextA", "CryptDecrypt"}, ["crypt"]),
+            ({"Sleep", "GetTickCount", "VirtualAlloc", "WriteProcessMemory"}, ["alloc", "sleep"]),
+            ({"Sleep"}, []),
+        ],
+    )
+    def test_candidates(self, index, labels, names):
+        """Test that only rules with all required labels present are selected."""
+        assert [rule.name for rule in index.candidates(labels)] == names
+
+    def test_required_labels(self, index):
+        """Test that labels shared by all alternatives are required."""
+        assert [rule.pattern.required_labels for rule in index.rules] == [
+            {"VirtualAlloc", "WriteProcessMemory"},
+            {"CryptAcquireContextA"},
+            {"Sleep"},
+        ]
+
+    def test_expand_pruning(self, index):
+        """Test that expanded blocks with missing labels are skipped."""
+        crypt = index.rules[1].pattern
+        assert len(list(crypt.expand())) == 2
+        assert [str(block) for block in crypt.expand({"CryptAcquireContextA", "CryptEncrypt"})] == [
+            "CryptAcquireContextA()\nCryptEncrypt()"
+        ]
+        assert list(crypt.expand({"CryptEncrypt"})) == []
+
+    def test_changes(self, index):
+        """Test that rules are compared by identity, so reparsed rules are reported as changed."""
+        parser = RuleParser()
+        changed = RuleIndex([index.rules[0], parser.parse_rule(RULES[1]), parser.parse_rule(RULES[0] | {"name": "new"})])
+        changes = changed.changes(index)
+        assert [rule.name for rule in changes.added] == ["new"]
+        assert [rule.name for rule in changes.changed] == ["crypt"]
+        assert changes.removed == ("sleep",)
+        assert not index.changes(index)
+        assert index.changes(None).added == index.rules
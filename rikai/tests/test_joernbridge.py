@@ -0,0 +1,135 @@
+"""Module implementing tests for the persistent joern worker pool."""
+import sys
+from pathlib import Path
+
+import pytest
+import rikai.data.joernbridge
+from rikai.data.graph import read_records
+from rikai.data.joernbridge import JoernBridge, JoernError, PersistentJoernBridge
+
+STUB = f"""#!{sys.executable}
+import sys
+from pathlib import Path
+
+assert sys.argv[1:] == ["--worker"]
+print("READY", flush=True)
+for line in sys.stdin:
+    line = line.strip()
+    if line == "PING":
+        print("PONG", flush=True)
+        continue
+    if line.startswith("EXPORT"):
+        _, output, path = line.split("\\t")
+        Path(output).write_text('{{"type": "Call", "id": "1", "label": "main", "line": 1}}\\n')
+        print(f"OK {{output}}", flush=True)
+        continue
+    database_id, path = line.split("\\t")
+    if "crash" in Path(path).name:
+        sys.exit(1)
+    if "hang" in Path(path).name:
+        continue
+    print(f"OK {{database_id}}" if Path(path).stat().st_size else "ERROR empty file", flush=True)
+"""
+
+FAILING = f"""#!{sys.executable}
+import sys
+
+print("joern crashed", file=sys.stderr)
+sys.exit(3)
+"""
+
+
+@pytest.fixture
+def stub(tmp_path: Path) -> Path:
+    """Create an executable speaking the joern worker protocol."""
+    path = tmp_path / "rikai"
+    path.write_text(STUB)
+    path.chmod(0o755)
+    return path
+
+
+def sample(directory: Path, name: str, content: str = "int main() { return 0; }") -> Path:
+    """Create a source file with the given name."""
+    path = directory / name
+    path.write_text(content)
+    return path
+
+
+class TestJoernBridge:
+    """Implements tests for launching joern per sample."""
+
+    def test_failure(self, tmp_path):
+        """Test that a failing joern process raises an error carrying its output instead of exiting."""
+        path = tmp_path / "rikai"
+        path.write_text(FAILING)
+        path.chmod(0o755)
+        with pytest.raises(JoernError, match="joern crashed"):
+            JoernBridge(path).process_source(sample(tmp_path, "a.c"))
+
+    def test_version(self, stub, monkeypatch):
+        """Test that the executable is only hashed once to identify the version of the preprocessing."""
+        bridge = JoernBridge(stub)
+        version = bridge.version
+        monkeypatch.setattr(rikai.data.joernbridge, "file_digest", lambda path: pytest.fail("hashed again"))
+        assert bridge.version == version
+
+
+class TestPersistentJoernBridge:
+    """Implements tests for processing samples with warm joern workers."""
+
+    def test_workers_are_reused(self, stub, tmp_path):
+        """Test that all samples are processed by the same worker process."""
+        bridge = PersistentJoernBridge(stub, workers=1)
+        pid = bridge._workers[0].pid
+        ids = {bridge.process_source(sample(tmp_path, f"{i}.c")) for i in range(5)}
+        assert len(ids) == 5
+        assert [worker.pid for worker in bridge._workers] == [pid]
+        bridge.close()
+
+    def test_error_keeps_worker(self, stub, tmp_path):
+        """Test that a failed sample is reported without restarting the worker."""
+        bridge = PersistentJoernBridge(stub, workers=1)
+        pid = bridge._workers[0].pid
+        with pytest.raises(JoernError):
+            bridge.process_source(sample(tmp_path, "empty.c", ""))
+        assert bridge.process_source(sample(tmp_path, "a.c"))
+        assert bridge._workers[0].pid == pid
+        bridge.close()
+
+    @pytest.mark.parametrize("name", ["crash.c", "hang.c"])
+    def test_restart_on_failure(self, stub, tmp_path, name):
+        """Test that crashed or hanging workers are replaced."""
+        bridge = PersistentJoernBridge(stub, timeout=1, workers=1)
+        pid = bridge._workers[0].pid
+        with pytest.raises(JoernError):
+            bridge.process_source(sample(tmp_path, name))
+        assert bridge.process_source(sample(tmp_path, "a.c"))
+        assert len(bridge._workers) == 1 and bridge._workers[0].pid != pid
+        bridge.close()
+
+    def test_health_check(self, stub):
+        """Test that the health check restarts killed workers only."""
+        bridge = PersistentJoernBridge(stub, workers=2)
+        bridge._workers[0]._process.kill()
+        bridge._workers[0]._process.wait()
+        assert bridge.health_check() == 1
+        assert all(worker.ping() for worker in bridge._workers)
+        bridge.close()
+
+    def test_ping_idle(self, stub, tmp_path, monkeypatch):
+        """Test that workers idle for too long are pinged before their next sample and replaced if they do not answer."""
+        bridge = PersistentJoernBridge(stub, workers=1, ping_after=3600)
+        worker = bridge._workers[0]
+        monkeypatch.setattr(worker, "ping", lambda: False)
+        assert bridge.process_source(sample(tmp_path, "a.c")) and bridge._workers == [worker]
+        bridge._ping_after = 0
+        assert bridge.process_source(sample(tmp_path, "b.c")) and bridge._workers[0] is not worker and not worker.alive
+        bridge.close()
+        assert not bridge._workers
+
+    def test_export(self, stub, tmp_path):
+        """Test that workers write the graph of a sample to the given graph file."""
+        bridge = PersistentJoernBridge(stub, workers=1)
+        output = bridge.export_source(sample(tmp_path, "a.c"), tmp_path / "a.jsonl")
+        assert list(read_records(output)) == [{"type": "Call", "id": "1", "label": "main", "line": 1}]
+        bridge.close()
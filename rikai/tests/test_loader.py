@@ -0,0 +1,103 @@
+"""Module implementing tests for bulk importing graph files."""
+import re
+from threading import Lock
+from typing import List
+
+from rikai.data.loader import GraphLoader
+from rikai.tests.conftest import RECORDS
+from rikai.util.hashing import text_digest
+from rikai.util.metrics import Metrics
+
+
+def iid(statement: str) -> str:
+    """Return the iid assigned to the node inserted with the given statement."""
+    return "0x" + text_digest(statement)[:16]
+
+
+class Concept:
+    """Concept only providing its iid."""
+
+    def __init__(self, iid: str):
+        """Create a concept with the given iid."""
+        self._iid = iid
+
+    def get_iid(self) -> str:
+        """Return the iid of the concept."""
+        return self._iid
+
+
+class Client:
+    """Client recording the queries of committed write transactions, assigning an iid based on its statement to each node inserted."""
+
+    def __init__(self):
+        """Create a client without any databases."""
+        self.queries: List[str] = []
+        self.sessions = 0
+        self._lock = Lock()
+
+    def session(self, name, kind):
+        """Open a new session."""
+        self.sessions += 1
+        return self
+
+    def transaction(self, kind):
+        """Open a new transaction."""
+        return self
+
+    def query(self):
+        """Return the query manager."""
+        return self
+
+    def insert(self, query: str):
+        """Record the given query, answering with the iids of all variables inserted."""
+        with self._lock:
+            self.queries.append(query)
+        concepts = {variable: Concept(iid(statement)) for variable, statement in re.findall(r"^\$(\w+) (isa .*);$", query, re.MULTILINE)}
+        return [type("ConceptMap", (), {"map": lambda _: concepts})()]
+
+    def commit(self):
+        """Commit the transaction."""
+
+    def close(self):
+        """Close the session."""
+
+    def __enter__(self):
+        """Enter the transaction."""
+        return self
+
+    def __exit__(self, *_):
+        """Close the transaction."""
+
+
+class TestGraphLoader:
+    """Implements tests for inserting graph records in batches."""
+
+    def test_load(self):
+        """Test that nodes are inserted before the parameters connecting them, in batches of the given size."""
+        client, metrics, progress = Client(), Metrics(), []
+        loader = GraphLoader(client, batch_size=4, sessions=2, metrics=metrics, progress=progress.append)  # type: ignore
+        assert loader.load("test", RECORDS) == len(RECORDS)
+        nodes = [query for query in client.queries if query.startswith("insert")]
+        parameters = [query for query in client.queries if query.startswith("match")]
+        assert (len(nodes), len(parameters)) == (3, 2) and client.queries == nodes + parameters
+        assert sum(progress) == len(RECORDS) and max(progress) == 4
+        assert client.sessions == 2
+        assert set(metrics.to_dict()["phases"]) == {"import.nodes", "import.parameters"}
+        assert metrics.to_dict()["counters"] == {"imported": len(RECORDS)}
+        source, sink = iid("isa IntegerLiteral, has IntegerValue 0"), iid('isa Call, has Label "VirtualAlloc", has Line 3')
+        assert parameters[0].splitlines()[:3] == ["match", f"$n0 iid {source};", f"$n1 iid {sink};"]
+        assert "(Source: $n0, Sink: $n1) isa Parameter, has Index 1;" in parameters[0]
+
+    def test_escape(self):
+        """Test that string values are quoted and escaped."""
+        query = GraphLoader._insert_nodes(
+            [
+                {"type": "StringLiteral", "id": "1", "value": 'say "hi"\\n'},
+                {"type": "Call", "id": "2", "label": "f", "line": 3, "file": "a.c"},
+            ]
+        )
+        assert query.splitlines() == [
+            "insert",
+            '$n0 isa StringLiteral, has StringValue "say \\"hi\\"\\\\n";',
+            '$n1 isa Call, has Label "f", has Line 3, has File "a.c";',
+        ]
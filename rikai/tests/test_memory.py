@@ -0,0 +1,90 @@
+"""Module implementing tests for matching pattern with the in-memory backend."""
+from pathlib import Path
+
+import pytest
+from rikai.data.graph import write_records
+from rikai.data.memory import MemoryDatabase
+from rikai.frontend import SynchronousFrontend
+from rikai.matcher import PatternMatcher
+from rikai.tests.conftest import RECORDS, behavior
+
+
+class TestMemoryDatabase:
+    """Implements tests for matching blocks on graphs held in memory."""
+
+    @pytest.mark.parametrize(
+        "lines,result",
+        [
+            (("VirtualAlloc()",), ((3,),)),
+            (("Sleep(_)",), ((5,), (6,))),
+            (("Sleep(1000)",), ((5,),)),
+            (("x = 10", "Sleep(x)"), ((6,),)),
+            (("Sleep(42)",), tuple()),
+            (("x = VirtualAlloc(0, 64)", 'WriteProcessMemory(_, x, "payload")', "Sleep(_)"), ((3, 4, 5), (3, 4, 6))),
+            (("x = VirtualAlloc()", "WriteProcessMemory(x)"), tuple()),
+            (("x = Sleep()", "WriteProcessMemory(_, x)"), tuple()),
+            (("CreateRemoteThread()",), tuple()),
+        ],
+    )
+    def test_match(self, lines, result):
+        """Test matching blocks with the semantics of the generated queries."""
+        assert MemoryDatabase(RECORDS).match(behavior(*lines).block) == result
+
+    def test_limit(self):
+        """Test that the number of matches can be bounded."""
+        db = MemoryDatabase(RECORDS)
+        assert db.match(behavior("VirtualAlloc()", "Sleep()").block, limit=1) == ((3, 5),)
+        assert PatternMatcher(db, max_matches=1).match(behavior("Sleep()")) == ((5,),)
+
+    def test_alternatives(self):
+        """Test matching disjunctions, reporting the alternative matched."""
+        db = MemoryDatabase(RECORDS)
+        pattern = behavior("x = VirtualAlloc()", {"or": {"thread": ["CreateRemoteThread()"], "write": ["WriteProcessMemory(_, x)"]}})
+        assert PatternMatcher(db, db.get_labels()).match_alternatives(pattern) == (("write",), ((3, 4),))
+
+    def test_records(self, tmp_path):
+        """Test that graphs survive a round trip through a graph file."""
+        write_records(RECORDS, tmp_path / "sample.jsonl")
+        assert sorted(MemoryDatabase.load(tmp_path / "sample.jsonl").get_records(), key=str) == sorted(RECORDS, key=str)
+
+
+class TestMemoryFrontend:
+    """Implements tests for analyzing graph files end to end."""
+
+    def test_analyze(self, tmp_path: Path, memory_frontend_config):
+        """Test that the frontend matches rules on graph files without a TypeDB server."""
+        frontend = SynchronousFrontend(
+            memory_frontend_config({"inject": ["x = VirtualAlloc()", "WriteProcessMemory(_, x)"], "thread": ["CreateRemoteThread()"]})
+        )
+        assert [(rule.name, matches) for rule, matches in frontend.analyze(tmp_path / "sample.jsonl")] == [("inject", ((3, 4),))]
+
+    def test_project(self, tmp_path: Path, memory_frontend_config):
+        """Test that the graph files of a directory are matched as one project, locating calls by file and line."""
+        config = memory_frontend_config({"inject": ["x = VirtualAlloc()", "WriteProcessMemory(_, x)", "Sleep(10)"]})
+        (tmp_path / "project" / "lib").mkdir(parents=True)
+        write_records(RECORDS[:9], tmp_path / "project" / "main.c.jsonl")
+        write_records(RECORDS[12:], tmp_path / "project" / "lib" / "sleep.c.jsonl")
+        frontend = SynchronousFrontend(config)
+        assert [(rule.name, matches) for rule, matches in frontend.analyze(tmp_path / "project")] == [
+            ("inject", ((("main.c", 3), ("main.c", 4), ("lib/sleep.c", 6)),))
+        ]
+
+    def test_timings(self, tmp_path: Path, memory_frontend_config):
+        """Test that the time spent per phase and rule is reported and accumulated by the frontend."""
+        frontend = SynchronousFrontend(memory_frontend_config({"thread": ["Sleep(1000)"]}))
+        report = frontend.report_dict(tmp_path / "sample.jsonl", timings=True)
+        assert isinstance(report, dict)
+        assert [result["matches"] for result in report["results"]] == [((5,),)]
+        assert {"preprocess", "session", "query"} <= set(report["timings"]["phases"])
+        assert set(report["timings"]["rules"]) == {"thread"}
+        assert report["timings"]["counters"] == {"queries": 1, "rows": 1}
+        assert frontend.metrics.to_dict()["counters"]["samples"] == 1
+
+    def test_report_alternatives(self, tmp_path: Path, memory_frontend_config):
+        """Test that the alternatives matched are reported, including results restored from the result cache."""
+        pattern = ["x = VirtualAlloc()", {"or": {"thread": ["CreateRemoteThread()"], "write": ["WriteProcessMemory(_, x)"]}}]
+        frontend = SynchronousFrontend(memory_frontend_config({"inject": pattern}, cache=True))
+        for _ in range(2):
+            report = frontend.report_dict(tmp_path / "sample.jsonl")
+            assert [(result["name"], result["alternatives"], result["matches"]) for result in report] == [("inject", ["write"], ((3, 4),))]
+        assert frontend.metrics.to_dict()["counters"]["cached"] == 1
@@ -0,0 +1,65 @@
+"""Module implementing tests for collecting and exporting metrics."""
+from json import loads
+
+from rikai.util.metrics import JsonLinesSink, Metrics, PrometheusSink
+
+
+class TestMetrics:
+    """Implements tests for timers and counters."""
+
+    def test_record(self):
+        """Test that timers keep the number, total and maximum of their durations."""
+        metrics = Metrics()
+        metrics.record("query", 1.0)
+        metrics.record("query", 3.0)
+        metrics.increment("rows", 5)
+        assert metrics.to_dict() == {"phases": {"query": {"count": 2, "total": 4.0, "max": 3.0}}, "rules": {}, "counters": {"rows": 5}}
+
+    def test_timer(self):
+        """Test that timed code is recorded even if it raises."""
+        metrics = Metrics()
+        try:
+            with metrics.timer("preprocess"):
+                raise ValueError()
+        except ValueError:
+            pass
+        assert metrics.to_dict()["phases"]["preprocess"]["count"] == 1
+
+    def test_merge(self):
+        """Test that merging accumulates timers and counters."""
+        first, second = Metrics(), Metrics()
+        first.record(Metrics.RULE + "a", 1.0)
+        first.increment("queries")
+        second.record(Metrics.RULE + "a", 2.0)
+        second.record(Metrics.RULE + "b", 0.5)
+        second.increment("queries", 2)
+        first.merge(second)
+        assert first.to_dict()["rules"]["a"] == {"count": 2, "total": 3.0, "max": 2.0}
+        assert first.to_dict()["counters"] == {"queries": 3}
+        assert first.slowest(1) == [("a", 3.0)]
+
+
+class TestSinks:
+    """Implements tests for exporting metrics."""
+
+    def test_prometheus(self, tmp_path):
+        """Test that the accumulated metrics are written in the Prometheus text format."""
+        metrics = Metrics()
+        metrics.record(Metrics.RULE + 'say "hi"', 2.0)
+        metrics.increment("queries", 4)
+        PrometheusSink(tmp_path / "rikai.prom").publish("sample.c", Metrics(), metrics)
+        text = (tmp_path / "rikai.prom").read_text()
+        assert 'rikai_rule_seconds_total{rule="say \\"hi\\""} 2.0' in text
+        assert "rikai_queries_total 4" in text
+        assert not (tmp_path / "rikai.prom.tmp").exists()
+
+    def test_json_lines(self, tmp_path):
+        """Test that the metrics of each sample are appended as a json line."""
+        sink = JsonLinesSink(tmp_path / "metrics.jsonl")
+        for sample in ("a.c", "b.c"):
+            metrics = Metrics()
+            metrics.record("preprocess", 1.0)
+            sink.publish(sample, metrics, metrics)
+        lines = [loads(line) for line in (tmp_path / "metrics.jsonl").read_text().splitlines()]
+        assert [line["sample"] for line in lines] == ["a.c", "b.c"]
+        assert lines[0]["phases"]["preprocess"]["total"] == 1.0
@@ -2,11 +2,13 @@
 import pytest
 from rikai.pattern import (
     Assignment,
+    Block,
     Call,
     CallAssignment,
     IntegerLiteral,
     LiteralAssignment,
     PatternParser,
+    RuleParser,
     StringLiteral,
     UnboundVariable,
     Variable,
@@ -94,3 +96,62 @@ class TestParser:
     def test_parse_assignments(self, input, output):
         """Test the parsing of assignments from text."""
         assert PatternParser({}).parse_statement(input) == output
+
+    @pytest.mark.parametrize(
+        "input,output",
+        [
+            ('foo("a, b", "c:d")', Call("foo", (StringLiteral("a, b"), StringLiteral("c:d")))),
+            ('x = "foo(bar)"', LiteralAssignment(Variable("x"), StringLiteral("foo(bar)"))),
+            ("x = 12", LiteralAssignment(Variable("x"), IntegerLiteral(12))),
+            (" foo( x ,_ ) ", Call("foo", (Variable("x"), UnboundVariable()))),
+        ],
+    )
+    def test_tokenizer(self, input, output):
+        """Test that quoted strings may contain separators and whitespace around tokens is ignored."""
+        assert PatternParser({}).parse_statement(input) == output
+
+    @pytest.mark.parametrize(
+        "input,output",
+        [
+            ("foo(x);", Call("foo", (Variable("x"),))),
+            ("foo(x) // c", Call("foo", (Variable("x"),))),
+            ("x = foo(y);", CallAssignment(Variable("x"), Call("foo", (Variable("y"),)))),
+            ("foo(x,,y)", Call("foo", (Variable("x"), Variable("y")))),
+            ("foo(x, y,)", Call("foo", (Variable("x"), Variable("y")))),
+            ("foo( )", Call("foo", tuple())),
+        ],
+    )
+    def test_lenient(self, input, output):
+        """Test that text following calls is ignored and empty parameters are skipped, as by the parser before the tokenizer."""
+        assert PatternParser({}).parse_statement(input) == output
+
+    @pytest.mark.parametrize("input", ["foo", '"foo"', "foo(x", "x = y", "foo(1:x, y)", "a b = foo()", 'x = "a" b', "foo(1:)"])
+    def test_malformed(self, input):
+        """Test that malformed statements are rejected."""
+        with pytest.raises(ValueError):
+            PatternParser({}).parse_statement(input)
+
+
+class TestRuleParser:
+    """Implements tests for loading rule files."""
+
+    RULE = "name: {name}\nmeta: {{}}\npattern:\n  - x = VirtualAlloc()\n  - WriteProcessMemory(_, x)\n"
+
+    def test_errors(self, tmp_path):
+        """Test that invalid files are reported while all other files are loaded."""
+        for name in ("a", "b"):
+            (tmp_path / f"{name}.yaml").write_text(self.RULE.format(name=name))
+        (tmp_path / "broken.yaml").write_text("name: broken\nmeta: {}\npattern:\n  - foo(\n")
+        (tmp_path / "empty.yaml").write_text("")
+        parser = RuleParser()
+        assert sorted(rule.name for rule in parser.iterate(tmp_path)) == ["a", "b"]
+        assert sorted(error.path.name for error in parser.errors) == ["broken.yaml", "empty.yaml"]
+
+    def test_jobs(self, tmp_path):
+        """Test that parsing with a process pool returns the same rules in the same order."""
+        for i in range(5):
+            (tmp_path / f"{i}.yaml").write_text(self.RULE.format(name=i))
+        (tmp_path / "broken.yaml").write_text("pattern: [foo(]\n")
+        sequential, parallel = RuleParser(), RuleParser(jobs=2)
+        assert list(parallel.iterate(tmp_path)) == list(sequential.iterate(tmp_path))
+        assert [error.path for error in parallel.errors] == [error.path for error in sequential.errors]
@@ -0,0 +1,92 @@
+"""Module implementing tests for generating TypeDB queries."""
+import pytest
+from rikai.data.planner import QueryPlanner, Statistics
+from rikai.data.query import QueryGenerator
+from rikai.tests.conftest import behavior
+
+
+class TestQueryGenerator:
+    """Implements tests for the generation of TypeDB queries from pattern."""
+
+    def test_generate_block(self):
+        """Test that only the lines of calls are retrieved."""
+        query = QueryGenerator.generate(behavior('x = "test"', "y = foo(x)", "bar(y, _)").block)
+        assert query.splitlines()[-1] == "get $l0, $l1;"
+        assert '$call0_0 isa StringLiteral, has StringValue "test";' in query
+        assert '$call1_0 isa Call, has Label "foo";' in query
+
+    def test_generate_limit(self):
+        """Test that limited queries end with a limit clause."""
+        block = behavior("foo()", "bar()").block
+        assert QueryGenerator.generate(block, limit=1).splitlines()[-2:] == ["get $l0, $l1;", "limit 1;"]
+        assert QueryGenerator.generate_behavior(behavior("foo()", {"or": {"a": ["bar()"]}}), limit=5).endswith("get $l0;\nlimit 5;")
+        assert "limit" not in QueryGenerator.generate(block)
+
+    def test_generate_files(self):
+        """Test that the files of all calls are bound for databases of projects."""
+        lines = QueryGenerator.generate(behavior("foo()", "bar()").block, files=True).splitlines()
+        assert lines[1] == '$call0 isa Call, has Label "foo", has Line $l0, has File $f0;'
+        assert lines[-1] == "get $f0, $l0, $f1, $l1;"
+
+    def test_generate_behavior(self):
+        """Test that disjunctions are compiled into or-clauses."""
+        query = QueryGenerator.generate_behavior(
+            behavior("x = foo()", {"or": {"a": ["bar(x)"], "b": ["y = 1", "baz(x, y)"]}}, {"or": {"c": ["qux()"], "d": ["quux()"]}})
+        )
+        assert query.count(" or ") == 2
+        assert '$d0a0call0 isa Call, has Label "bar", has Line $d0a0l0;' in query
+        assert '$d0a1call0_0 isa Call, has Label "foo";' in query
+        assert "$d0a1call0_1 isa IntegerLiteral, has IntegerValue 1;" in query
+        assert '$d1a1call0 isa Call, has Label "quux", has Line $d1a1l0;' in query
+        assert query.splitlines()[-1] == "get $l0;"
+
+    @pytest.mark.parametrize(
+        "lines,result",
+        [
+            (("foo()", {"or": {"a": ["bar()"], "b": ["baz()"]}}), True),
+            (({"or": {"a": ["bar()"], "b": ["baz()"]}},), False),
+            (("foo(x)", {"or": {"a": ["x = bar()"], "b": ["x = baz()"]}}), True),
+            (("foo()", {"or": {"a": ["x = bar()"], "b": ["baz()"]}}, {"or": {"c": ["x = 1", "qux(x)"]}}), False),
+        ],
+    )
+    def test_can_compile(self, lines, result):
+        """Test which behaviors can be expressed as a single query."""
+        assert QueryGenerator.can_compile(behavior(*lines)) == result
+
+    def test_expand_named(self):
+        """Test that expanded blocks report the names of their alternatives."""
+        names = [names for names, _ in behavior("foo()", {"or": {"a": ["bar()"], "b": ["baz()"]}}, {"or": {"c": ["qux()"]}}).expand_named()]
+        assert names == [("a", "c"), ("b", "c")]
+
+
+class TestQueryPlanner:
+    """Implements tests for ordering constraints by their selectivity."""
+
+    STATISTICS = Statistics({"malloc": 500, "memcpy": 200, "CryptAcquireContextA": 1}, {("StringLiteral", "key"): 3})
+
+    def test_order(self):
+        """Test that the rarest calls are emitted first while their line variables keep the rule order."""
+        block = behavior("malloc()", 'memcpy(_, "key")', "CryptAcquireContextA()").block
+        planner = QueryPlanner(self.STATISTICS)
+        assert [i for i, _ in planner.order(block)] == [2, 1, 0]
+        lines = QueryGenerator.generate(block, planner).splitlines()
+        assert lines[1] == '$call2 isa Call, has Label "CryptAcquireContextA", has Line $l2;'
+        assert lines[-1] == "get $l0, $l1, $l2;"
+        assert planner.explain(block).splitlines() == [
+            "2: CryptAcquireContextA() (~1 matches)",
+            '1: memcpy(_, "key") (~3 matches)',
+            "0: malloc() (~500 matches)",
+        ]
+
+    @pytest.mark.parametrize(
+        "lines,result",
+        [
+            (("malloc()", "memcpy()"), True),
+            (("malloc()", "free()"), False),
+            (('x = "key"', "memcpy(x)"), True),
+            (('memcpy("other")',), False),
+        ],
+    )
+    def test_is_satisfiable(self, lines, result):
+        """Test that blocks with calls or literals missing in the sample are detected."""
+        assert QueryPlanner(self.STATISTICS).is_satisfiable(behavior(*lines).block) == result
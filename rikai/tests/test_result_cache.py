@@ -0,0 +1,69 @@
+"""Module implementing tests for caching analysis results."""
+from rikai.data.cache import ResultCache
+from rikai.frontend import SynchronousFrontend
+from rikai.pattern import RuleParser
+
+
+def rule(*pattern):
+    """Create a rule with the given pattern."""
+    return RuleParser().parse_rule({"name": "test", "meta": {}, "pattern": list(pattern)})
+
+
+class TestResultCache:
+    """Implements tests for storing and evicting cached results."""
+
+    def test_keys(self, tmp_path, monkeypatch):
+        """Test that keys only depend on the content of samples and patterns, and the versions of the engine and preprocessing."""
+        cache = ResultCache(tmp_path / "results.sqlite", version="1")
+        (tmp_path / "a.c").write_text("int main() {}")
+        (tmp_path / "b.c").write_text("int main() {}")
+        assert cache.sample_key(tmp_path / "a.c") == cache.sample_key(tmp_path / "b.c")
+        assert cache.sample_key(tmp_path / "a.c") != ResultCache(tmp_path / "other.sqlite", version="2").sample_key(tmp_path / "a.c")
+        key = cache.sample_key(tmp_path / "a.c")
+        monkeypatch.setattr(ResultCache, "VERSION", ResultCache.VERSION + 1)
+        assert cache.sample_key(tmp_path / "a.c") != key
+        (tmp_path / "project").mkdir()
+        (tmp_path / "project" / "a.c").write_text("int main() {}")
+        project = cache.sample_key(tmp_path / "project")
+        (tmp_path / "project" / "b.c").write_text("int main() {}")
+        assert project != cache.sample_key(tmp_path / "project")
+        assert cache.rule_key(rule("foo(1)")) == cache.rule_key(rule("foo(1)"))
+        assert cache.rule_key(rule("foo(1)")) != cache.rule_key(rule("foo(2)"))
+
+    def test_persistence(self, tmp_path):
+        """Test that stored results including empty matches are returned after reopening the cache."""
+        ResultCache(tmp_path / "results.sqlite").put("sample", {"a": ((1, 2), (3, 4)), "b": tuple()})
+        cache = ResultCache(tmp_path / "results.sqlite")
+        assert cache.get("sample") == {"a": ((1, 2), (3, 4)), "b": tuple()}
+        assert cache.get("unknown") == {}
+        cache.put("project", {"a": ((("a.c", 1), ("b.c", 2)),)})
+        assert cache.get("project") == {"a": ((("a.c", 1), ("b.c", 2)),)}
+
+    def test_alternatives(self, tmp_path):
+        """Test that the alternatives matched are stored next to the matches of the rules with disjunctions."""
+        cache = ResultCache(tmp_path / "results.sqlite")
+        cache.put("sample", {"a": ((1, 2),), "b": ((3,),)}, {"a": ("write", "sleep")})
+        alternatives = {}
+        assert cache.get("sample", alternatives) == {"a": ((1, 2),), "b": ((3,),)}
+        assert alternatives == {"a": ("write", "sleep")}
+
+    def test_eviction(self, tmp_path):
+        """Test that the least recently used samples are evicted first."""
+        cache = ResultCache(tmp_path / "results.sqlite", capacity=2)
+        cache.put("a", {"rule": ((1,),)})
+        cache.put("b", {"rule": ((2,),)})
+        cache.get("a")
+        cache.put("c", {"rule": ((3,),)})
+        assert len(cache) == 2
+        assert cache.get("b") == {}
+        assert cache.get("a") and cache.get("c")
+
+    def test_path(self, tmp_path, monkeypatch, memory_frontend_config):
+        """Test that relative paths of the caches are resolved relative to the config file instead of the working directory."""
+        config = memory_frontend_config(cache=True, directory=tmp_path / "config")
+        (tmp_path / "work").mkdir()
+        monkeypatch.chdir(tmp_path / "work")
+        frontend = SynchronousFrontend(config)
+        assert frontend.rules == ()
+        assert (tmp_path / "config" / ".rikai" / "results.sqlite").exists() and (tmp_path / "config" / ".rikai" / "rules.cache").exists()
+        assert not (tmp_path / "work" / ".rikai").exists()
@@ -0,0 +1,109 @@
+"""Module implementing tests for the cost-based ordering of rules and their deadlines."""
+from pathlib import Path
+from threading import Event
+from time import monotonic
+
+import pytest
+from rikai.data.database import Database, QueryTimeout
+from rikai.data.memory import MemoryDatabase
+from rikai.frontend import SynchronousFrontend
+from rikai.matcher import PatternMatcher
+from rikai.pattern import RuleParser
+from rikai.scheduler import RuleScheduler
+from rikai.tests.conftest import RECORDS, behavior
+from rikai.util.metrics import Metrics
+from typedb.client import TypeDBClientException  # type: ignore
+
+RULES = [
+    {"name": "sleep", "meta": {}, "pattern": ["Sleep(_)", "Sleep(_)", "Sleep(_)"]},
+    {"name": "inject", "meta": {}, "pattern": ["x = VirtualAlloc()", "WriteProcessMemory(_, x)"]},
+    {"name": "delay", "meta": {}, "pattern": ["Sleep(1000)"]},
+]
+
+
+class BlockingTransaction:
+    """Stand-in for a TypeDB transaction whose queries only finish once it is closed."""
+
+    def __init__(self):
+        """Create an open transaction."""
+        self.closed = Event()
+
+    def query(self):
+        """Return the query manager, i.e. the transaction itself."""
+        return self
+
+    def match(self, query, options=None):
+        """Block until the transaction is closed, failing like the client does."""
+        self.closed.wait(10)
+        raise TypeDBClientException("The transaction has been closed.")
+        yield
+
+    def is_open(self):
+        """Check whether the transaction is still open."""
+        return not self.closed.is_set()
+
+    def close(self):
+        """Close the transaction."""
+        self.closed.set()
+
+
+class BlockingSession:
+    """Stand-in for a TypeDB session opening blocking transactions."""
+
+    def transaction(self, kind, options=None):
+        """Open a new transaction."""
+        return BlockingTransaction()
+
+    def is_open(self):
+        """Report the session as closed."""
+        return False
+
+
+class TestRuleScheduler:
+    """Implements tests for ordering rules by their estimated cost."""
+
+    def test_order(self):
+        """Test that rules with fewer candidate calls are scheduled first."""
+        db = MemoryDatabase(RECORDS)
+        rules = [RuleParser().parse_rule(rule) for rule in RULES]
+        ordered = RuleScheduler(Metrics()).order(rules, db.statistics, db.get_labels())
+        assert [rule.name for rule in ordered] == ["delay", "inject", "sleep"]
+
+    def test_history(self):
+        """Test that the time measured on previous samples takes precedence over the estimate."""
+        db = MemoryDatabase(RECORDS)
+        rules = [RuleParser().parse_rule(rule) for rule in RULES]
+        history = Metrics()
+        history.record(Metrics.RULE + "delay", 2.0)
+        history.record(Metrics.RULE + "inject", 0.5)
+        ordered = RuleScheduler(history).order(rules, db.statistics, db.get_labels())
+        assert [rule.name for rule in ordered] == ["inject", "delay", "sleep"]
+
+
+class TestDeadlines:
+    """Implements tests for cancelling rules exceeding their time budget."""
+
+    def test_deadline(self):
+        """Test that no query is run once the deadline passed."""
+        metrics = Metrics()
+        matcher = PatternMatcher(MemoryDatabase(RECORDS), metrics=metrics, deadline=monotonic() - 1)
+        with pytest.raises(QueryTimeout):
+            matcher.match(behavior("Sleep(_)"))
+        assert "queries" not in metrics.to_dict()["counters"]
+
+    def test_cancel(self):
+        """Test that a query exceeding its timeout is cancelled by closing its transaction."""
+        db = Database(BlockingSession())
+        start = monotonic()
+        with pytest.raises(QueryTimeout):
+            db.exists("match $x isa Call;", timeout=0.1)
+        assert monotonic() - start < 5
+
+    def test_report(self, tmp_path: Path, memory_frontend_config):
+        """Test that rules exceeding the budget of a sample are reported as timeout and matched again on the next analysis."""
+        frontend = SynchronousFrontend(memory_frontend_config({"delay": ["Sleep(1000)"]}, cache=True))
+        frontend.sample_timeout = 1e-9
+        assert [(x["name"], x["status"]) for x in frontend.report_dict(tmp_path / "sample.jsonl")] == [("delay", "timeout")]
+        assert frontend.metrics.to_dict()["counters"]["timeouts"] == 1
+        frontend.sample_timeout = None
+        assert [(x["name"], x["matches"]) for x in frontend.report_dict(tmp_path / "sample.jsonl")] == [("delay", ((5,),))]
@@ -0,0 +1,89 @@
+"""Module implementing tests for the resident analysis service."""
+import sys
+from json import dumps, loads
+from pathlib import Path
+from queue import Full
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+from rikai.frontend import SynchronousFrontend
+from rikai.service import ServiceClient, ServiceFrontend
+
+
+@pytest.fixture
+def config(memory_frontend_config) -> Path:
+    """Create a config using the memory backend, with a rule and a sample."""
+    return memory_frontend_config({"inject": ["x = VirtualAlloc()", "WriteProcessMemory(_, x)"]})
+
+
+class TestService:
+    """Implements tests for submitting samples to the service over HTTP."""
+
+    def test_report(self, config: Path):
+        """Test that the service returns the same results as a local frontend and exposes its status and metrics."""
+        service = ServiceFrontend(config, workers=2)
+        server = service.create_server(port=0)
+        service.start()
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            client = ServiceClient(url)
+            sample = config.parent / "sample.jsonl"
+            assert client.report_dict(sample) == loads(dumps(SynchronousFrontend(config).report_dict(sample))) != []
+            assert set(client.report_dict(sample, timings=True)) == {"results", "timings"}
+            assert client.status()["jobs"] == {"queued": 0, "running": 0, "done": 2, "failed": 0}
+            with pytest.raises(RuntimeError):
+                client.report_dict(config.parent / "missing.jsonl")
+            with urlopen(f"{url}/metrics") as response:
+                assert b"rikai_samples_total 3" in response.read()
+        finally:
+            server.shutdown()
+            service.stop()
+
+    def test_backpressure(self, config: Path):
+        """Test that submissions are rejected while the queue is full."""
+        service = ServiceFrontend(config, workers=1, capacity=1)
+        server = service.create_server(port=0)
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            service.submit(config.parent / "sample.jsonl")
+            with pytest.raises(Full):
+                service.submit(config.parent / "sample.jsonl")
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"http://127.0.0.1:{server.server_address[1]}/jobs", b'{"sample": "sample.jsonl"}')
+            assert error.value.code == 503
+            service.start()
+            assert service.status()["jobs"]["queued"] <= 1
+        finally:
+            server.shutdown()
+            service.stop()
+        assert service.status()["jobs"]["done"] == 1
+
+    def test_exit(self, config: Path):
+        """Test that a sample exiting the interpreter fails its job without terminating the worker."""
+        service = ServiceFrontend(config, workers=1)
+        service.report_dict = lambda sample, timings=False: sys.exit(3)  # type: ignore
+        service.start()
+        try:
+            job = service.submit(config.parent / "sample.jsonl")
+            assert job.done.wait(5)
+            assert (job.status, job.error) == ("failed", "SystemExit: 3")
+            assert all(thread.is_alive() for thread in service._threads)
+        finally:
+            service.stop()
+
+    def test_bad_wait(self, config: Path):
+        """Test that an invalid time to wait for a job is rejected."""
+        service = ServiceFrontend(config, workers=1)
+        server = service.create_server(port=0)
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            job = service.submit(config.parent / "sample.jsonl")
+            for wait in ("soon", "-1", "nan"):
+                with pytest.raises(HTTPError) as error:
+                    urlopen(f"http://127.0.0.1:{server.server_address[1]}/jobs/{job.id}?wait={wait}")
+                assert error.value.code == 400
+        finally:
+            server.shutdown()
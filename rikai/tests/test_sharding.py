@@ -0,0 +1,143 @@
+"""Module implementing tests for spreading sample databases over several TypeDB servers."""
+from typing import Any, Callable, Dict, List, Set
+
+import pytest
+from rikai.data.database import DatabaseManager
+from rikai.data.sharding import ServerUnavailable, ShardedDatabaseManager
+from typedb.client import TypeDBClientException  # type: ignore
+from typedb.common.exception import UNABLE_TO_CONNECT  # type: ignore
+
+
+class StandInServer:
+    """Stand-in for a TypeDB server, keeping the names of its databases and counting the databases ingested."""
+
+    def __init__(self, name: str, databases: Set[str] = set()):
+        """Create a running server holding the given databases."""
+        self.name = name
+        self.databases = set(databases)
+        self.ingested = 0
+        self.down = False
+
+
+class StandInManager:
+    """Stand-in for the DatabaseManager of a server, failing like the client while the server is down."""
+
+    def __init__(self, server: StandInServer):
+        """Connect to the given server."""
+        self.server = server
+        self._check()
+
+    def databases(self) -> List[str]:
+        """Return the databases of the server, which the manager tracks locally."""
+        return sorted(self.server.databases)
+
+    def provide(self, key: str, ingest: Callable[[str], Any]) -> str:
+        """Ingest the database of the given key unless it exists."""
+        self._check()
+        if (name := f"{DatabaseManager.PREFIX}{key}") not in self.server.databases:
+            ingest(name)
+        return name
+
+    def release(self, name: str):
+        """Unpin the given database."""
+        self._check()
+
+    def load(self, name: str, records, metrics=None, progress=None) -> int:
+        """Create the given database."""
+        self._check()
+        self.server.databases.add(name)
+        self.server.ingested += 1
+        return 0
+
+    def contains(self, name: str) -> bool:
+        """Check whether the server holds the given database."""
+        self._check()
+        return name in self.server.databases
+
+    def delete(self, name: str):
+        """Delete the given database."""
+        self._check()
+        self.server.databases.discard(name)
+
+    def get(self, name: str) -> StandInServer:
+        """Return the server instead of a database, so tests can check the routing."""
+        self._check()
+        return self.server
+
+    def close(self):
+        """Close the connection."""
+
+    def _check(self):
+        """Fail if the server is down."""
+        if self.server.down:
+            raise TypeDBClientException.of(UNABLE_TO_CONNECT)
+
+
+class StandInShardedManager(ShardedDatabaseManager):
+    """Sharded manager connecting to stand-in servers by their hostname."""
+
+    def __init__(self, servers: Dict[str, StandInServer], placement: str = "least-loaded", retry: float = 30):
+        """Create a manager for the given stand-in servers."""
+        self.servers = servers
+        super().__init__([(name, 1729) for name in servers], placement, retry)
+
+    def _create(self, hostname: str, port: int) -> DatabaseManager:
+        """Connect to the stand-in server with the given name."""
+        return StandInManager(self.servers[hostname])  # type: ignore
+
+    def analyze(self, key: str) -> StandInServer:
+        """Provide the database of the given key and return the server queries on it are sent to."""
+        return self.get(self.provide(key, lambda name: self.load(name, [])))  # type: ignore
+
+
+class TestShardedDatabaseManager:
+    """Implements tests for placing, routing and failing over sample databases."""
+
+    @pytest.mark.parametrize("placement", ShardedDatabaseManager.PLACEMENTS)
+    def test_sticky(self, placement):
+        """Test that each sample is ingested once and its queries are always routed to the server holding it."""
+        servers = {name: StandInServer(name) for name in ("a", "b")}
+        manager = StandInShardedManager(servers, placement)
+        placed = {key: manager.analyze(key).name for key in ("1", "2", "3", "4")}
+        assert all(manager.analyze(key).name == name for key, name in placed.items())
+        assert sum(server.ingested for server in servers.values()) == 4
+        if placement != "hash":
+            assert sorted(placed.values()) == ["a", "a", "b", "b"]
+
+    def test_hash(self):
+        """Test that hashing places samples independently of the order they are seen in."""
+        first = StandInShardedManager({name: StandInServer(name) for name in ("a", "b", "c")}, "hash")
+        second = StandInShardedManager({name: StandInServer(name) for name in ("a", "b", "c")}, "hash")
+        keys = [str(i) for i in range(12)]
+        assert [first.analyze(key).name for key in keys] == [second.analyze(key).name for key in reversed(keys)][::-1]
+
+    def test_existing(self):
+        """Test that databases of previous runs are found on their server and new samples are placed on the least loaded server."""
+        servers = {"a": StandInServer("a", {f"{DatabaseManager.PREFIX}old", f"{DatabaseManager.PREFIX}older"}), "b": StandInServer("b")}
+        manager = StandInShardedManager(servers)
+        assert manager.analyze("old").name == "a"
+        assert [manager.analyze(key).name for key in ("1", "2", "3")] == ["b", "b", "a"]
+        assert servers["a"].ingested == 1
+
+    def test_failover(self):
+        """Test that failed servers are skipped, their samples are ingested elsewhere and they are used again after the retry interval."""
+        servers = {name: StandInServer(name) for name in ("a", "b")}
+        manager = StandInShardedManager(servers, "round-robin", retry=3600)
+        placed = {key: manager.analyze(key).name for key in ("1", "2")}
+        failed = placed["1"]
+        servers[failed].down = True
+        assert manager.analyze("1").name != failed
+        assert {manager.analyze(key).name for key in ("3", "4", "5")} == {placed["2"]}
+        assert [server["available"] for server in manager.status()] == [name != failed for name in servers]
+        servers[failed].down = False
+        manager._retry = 0
+        assert failed in {manager.analyze(key).name for key in ("6", "7")}
+
+    def test_unavailable(self):
+        """Test that samples are rejected if all servers failed."""
+        servers = {name: StandInServer(name) for name in ("a", "b")}
+        manager = StandInShardedManager(servers)
+        for server in servers.values():
+            server.down = True
+        with pytest.raises(ServerUnavailable):
+            manager.analyze("1")
@@ -0,0 +1,57 @@
+"""Module implementing tests for watching the rule directory and reloading rules."""
+from os import utime
+from pathlib import Path
+from threading import Event, Thread
+
+from rikai.frontend import SynchronousFrontend
+from rikai.util.watcher import DirectoryWatcher
+
+RULE = "name: {name}\nmeta: {{}}\npattern:\n  - {statement}\n"
+
+
+class TestDirectoryWatcher:
+    """Implements tests for detecting changed files by polling."""
+
+    def test_poll(self, tmp_path: Path):
+        """Test that added, modified and removed files are detected, and other files are ignored."""
+        watcher = DirectoryWatcher(tmp_path)
+        assert not watcher.poll()
+        (tmp_path / "rule.yaml").write_text("a")
+        assert watcher.poll()
+        assert not watcher.poll()
+        (tmp_path / "notes.txt").write_text("a")
+        assert not watcher.poll()
+        utime(tmp_path / "rule.yaml", ns=(0, 0))
+        assert watcher.poll()
+        (tmp_path / "rule.yaml").unlink()
+        assert watcher.poll()
+
+    def test_stop(self, tmp_path: Path):
+        """Test that watching ends once the stop event is set."""
+        stop = Event()
+        thread = Thread(target=lambda: list(DirectoryWatcher(tmp_path, interval=0.01).watch(stop)))
+        thread.start()
+        stop.set()
+        thread.join(1)
+        assert not thread.is_alive()
+
+
+class TestReload:
+    """Implements tests for reloading rules in a running frontend."""
+
+    def test_reload(self, tmp_path: Path, memory_frontend_config):
+        """Test that only changed rule files are reparsed and the changed rules can be matched again."""
+        frontend = SynchronousFrontend(memory_frontend_config({"sleep": ["Sleep(1000)"], "alloc": ["VirtualAlloc()"]}))
+        rules = tmp_path / "rules"
+        previous = frontend.index
+        (rules / "sleep.yaml").write_text(RULE.format(name="sleep", statement="Sleep(10)"))
+        (rules / "thread.yaml").write_text(RULE.format(name="thread", statement="CreateRemoteThread()"))
+        (rules / "alloc.yaml").unlink()
+        changes = frontend.reload_rules()
+        assert [rule.name for rule in changes.added] == ["thread"]
+        assert [rule.name for rule in changes.changed] == ["sleep"]
+        assert changes.removed == ("alloc",)
+        assert "alloc" in {rule.name for rule in previous.rules}
+        results = list(frontend.rematch([tmp_path / "sample.jsonl"], changes.modified))
+        assert [(rule.name, matches) for rule, matches in results[0][1]] == [("sleep", ((6,),))]
+        assert not frontend.reload_rules()
@@ -1,28 +1,193 @@
 """Module dedicated to the export and visualization of typedb databases."""
+from collections import defaultdict
+from json import dumps
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any, Callable, Collection, Dict, Generator, Hashable, Iterable, List, Mapping, Optional, Set, TypeVar
+from xml.sax.saxutils import escape, quoteattr
 
-from rikai.data.database import Database
+from rikai.data.database import DatabaseInterface
+from rikai.data.graph import CALL, PARAMETER, Location, write_records
+
+K = TypeVar("K", bound=Hashable)
 
 
 class DatabasePlotter:
-    """Class dedicated to creating dotviz plots from a given database."""
+    """
+    Class dedicated to creating plots from a given database, in the dot format of graphviz, as json or as GraphML.
+
+    Plots are generated in a single pass over the records of the database and written line by line,
+    so neither the database nor the plot are held in memory. Neighbourhoods additionally take a pass over the nodes and one
+    over the parameter relations per hop, see save_all to plot several neighbourhoods with the same passes.
+    """
 
     PROLOGUE = "strict digraph {\n"
     EPILOGUE = "}"
+    FORMATS = ("dot", "json", "graphml")
+
+    def __init__(self, format: str = "dot"):
+        """
+        Create a new plotter.
+
+        :param format: The output format, one of FORMATS.
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown plot format {format}, expected one of {', '.join(self.FORMATS)}!")
+        self.format = format
+
+    def plot(self, db: DatabaseInterface, focus: Optional[Collection[Location]] = None, hops: int = 1) -> Generator[str, Any, None]:
+        """
+        Generate the lines of a plot of the given database.
+
+        :param db: The database to be plotted.
+        :param focus: If given, only the calls at these locations and their neighbourhood are plotted, e.g. the locations of a match.
+        :param hops: The number of parameter relations the plotted neighbourhood of the focused calls spans.
+        :return: Yield the lines of the plot.
+        """
+        records: Iterable[Dict[str, Any]] = db.get_records()
+        if focus is not None:
+            nodes = self._neighbourhoods(db, {None: set(focus)}, hops)[None]
+            records = (record for record in db.get_records() if self._contains(nodes, record))
+        yield from self._write(records)
+
+    def save(self, db: DatabaseInterface, path: Path, focus: Optional[Collection[Location]] = None, hops: int = 1):
+        """Generate a plot of the given db and save it at the given path, see plot for the parameters."""
+        with path.open("w") as outfile:
+            for line in self.plot(db, focus, hops):
+                outfile.write(line + "\n")
+
+    def save_all(self, db: DatabaseInterface, plots: Mapping[Path, Collection[Location]], hops: int = 1):
+        """
+        Save the neighbourhoods of several focuses of the given db, e.g. of the matches of each rule, sharing the passes over the db.
+
+        The records of all neighbourhoods are collected in a single pass over the database, holding only the plotted subgraphs in memory.
+
+        :param db: The database to be plotted.
+        :param plots: The locations of the focused calls by the path their plot is saved at.
+        :param hops: The number of parameter relations the plotted neighbourhoods of the focused calls span.
+        """
+        owners: Dict[str, Set[Path]] = defaultdict(set)
+        for path, nodes in self._neighbourhoods(db, {path: set(focus) for path, focus in plots.items()}, hops).items():
+            for node in nodes:
+                owners[node].add(path)
+        subgraphs: Dict[Path, List[Dict[str, Any]]] = {path: [] for path in plots}
+        for record in db.get_records():
+            if record["type"] == PARAMETER:
+                paths = owners.get(record["source"], set()) & owners.get(record["sink"], set())
+            else:
+                paths = owners.get(record["id"], set())
+            for path in paths:
+                subgraphs[path].append(record)
+        for path, records in subgraphs.items():
+            with path.open("w") as outfile:
+                for line in self._write(records):
+                    outfile.write(line + "\n")
 
-    def plot(self, db: Database) -> Generator[str, Any, None]:
-        """Generate string lines in dot-format for the given database."""
+    @staticmethod
+    def _neighbourhoods(db: DatabaseInterface, focuses: Dict[K, Set[Location]], hops: int) -> Dict[K, Set[str]]:
+        """
+        Return the ids of the calls at the locations of each focus and of the nodes reachable within the given number of relations.
+
+        The focused calls are looked up in a pass over the nodes, then each hop takes a pass over the parameter relations only,
+        shared by all focuses. Only the nodes of the neighbourhoods are kept in memory.
+        """
+        located: Dict[Location, List[K]] = defaultdict(list)
+        for key, focus in focuses.items():
+            for location in focus:
+                located[location].append(key)
+        nodes: Dict[K, Set[str]] = {key: set() for key in focuses}
+        frontier: Dict[str, Set[K]] = defaultdict(set)
+        for record in db.get_records():
+            if record["type"] == PARAMETER:
+                break
+            if record["type"] == CALL:
+                for key in located.get((record["file"], record["line"]) if "file" in record else record["line"], ()):
+                    nodes[key].add(record["id"])
+                    frontier[record["id"]].add(key)
+        for _ in range(hops):
+            if not frontier:
+                break
+            reached: Dict[str, Set[K]] = defaultdict(set)
+            for source, sink, _ in db.get_parameters():
+                for node, neighbour in ((source, sink), (sink, source)):
+                    for key in frontier.get(node, ()):
+                        if neighbour not in nodes[key]:
+                            reached[neighbour].add(key)
+            for node, keys in reached.items():
+                for key in keys:
+                    nodes[key].add(node)
+            frontier = reached
+        return nodes
+
+    @staticmethod
+    def _contains(nodes: Set[str], record: Dict[str, Any]) -> bool:
+        """Check whether the given node or relation is part of the subgraph spanned by the given nodes."""
+        if record["type"] == PARAMETER:
+            return record["source"] in nodes and record["sink"] in nodes
+        return record["id"] in nodes
+
+    @staticmethod
+    def _label(record: Dict[str, Any]) -> str:
+        """Return the label of the given node, the label and line of calls or the value of literals."""
+        if record["type"] == CALL:
+            return f"{record['label']}:{record['line']}"
+        return str(record["value"])
+
+    def _write(self, records: Iterable[Dict[str, Any]]) -> Generator[str, Any, None]:
+        """Generate the lines of a plot of the given records in the format of the plotter."""
+        writers: Dict[str, Callable[[Iterable[Dict[str, Any]]], Generator[str, Any, None]]] = {
+            "dot": self._dot,
+            "json": self._json,
+            "graphml": self._graphml,
+        }
+        yield from writers[self.format](records)
+
+    def _dot(self, records: Iterable[Dict[str, Any]]) -> Generator[str, Any, None]:
+        """Generate the lines of a plot in dot-format."""
         yield self.PROLOGUE
-        for iid, label in db.get_calls():
-            yield f'"{iid}" [label="{label}", shape="box"];'
-        for iid, value in db.get_literals():
-            yield f'"{iid}" [label="{value}"];'
-        for param_id, call_id, index in db.get_parameters():
-            yield f'"{param_id}" -> "{call_id}" [label="{index}"];'
+        for record in records:
+            if record["type"] == PARAMETER:
+                yield f'"{record["source"]}" -> "{record["sink"]}" [label="{record["index"]}"];'
+            else:
+                label = self._label(record).replace("\\", "\\\\").replace('"', '\\"')
+                shape = ', shape="box"' if record["type"] == CALL else ""
+                yield f'"{record["id"]}" [label="{label}"{shape}];'
         yield self.EPILOGUE
 
-    def save(self, db: Database, path: Path):
-        """Generate a plot of the given db and save it at the given path."""
-        with path.open("w") as outfile:
-            outfile.write("\n".join(self.plot(db)))
+    @staticmethod
+    def _json(records: Iterable[Dict[str, Any]]) -> Generator[str, Any, None]:
+        """Generate the lines of a json object with the lists of 'nodes' and 'edges', relying on all nodes preceding the relations."""
+        yield '{"nodes": ['
+        separator, section = "", "nodes"
+        for record in records:
+            if record["type"] == PARAMETER and section == "nodes":
+                yield '], "edges": ['
+                separator, section = "", "edges"
+            yield separator + dumps(record)
+            separator = ","
+        yield "]}" if section == "edges" else '], "edges": []}'
+
+    def _graphml(self, records: Iterable[Dict[str, Any]]) -> Generator[str, Any, None]:
+        """Generate the lines of a plot in the GraphML format."""
+        yield '<?xml version="1.0" encoding="UTF-8"?>'
+        yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">'
+        for key, domain in (("type", "node"), ("label", "node"), ("file", "node"), ("index", "edge")):
+            yield f'<key id="{key}" for="{domain}" attr.name="{key}" attr.type="string"/>'
+        yield '<graph edgedefault="directed">'
+        for record in records:
+            if record["type"] == PARAMETER:
+                source, sink = quoteattr(str(record["source"])), quoteattr(str(record["sink"]))
+                yield f'<edge source={source} target={sink}><data key="index">{record["index"]}</data></edge>'
+                continue
+            data = {"type": record["type"], "label": self._label(record)} | ({"file": record["file"]} if "file" in record else {})
+            attributes = "".join(f'<data key="{key}">{escape(str(value))}</data>' for key, value in data.items())
+            yield f"<node id={quoteattr(str(record['id']))}>{attributes}</node>"
+        yield "</graph>"
+        yield "</graphml>"
+
+
+class GraphExporter:
+    """Class dedicated to exporting a database as graph file, e.g. to match it with the in-memory backend."""
+
+    def save(self, db: DatabaseInterface, path: Path):
+        """Export all nodes and relations of the given db to a graph file at the given path."""
+        write_records(db.get_records(), path)
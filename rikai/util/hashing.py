@@ -0,0 +1,29 @@
+"""Module implementing content hashes of files and rules."""
+from hashlib import sha256
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 16
+
+
+def file_digest(path: Path) -> str:
+    """Return the sha256 hex digest of the content of the given file."""
+    digest = sha256()
+    with path.open("rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_digest(path: Path) -> str:
+    """Return the digest of the given file or, for directories, of the relative paths and contents of all files contained."""
+    if not path.is_dir():
+        return file_digest(path)
+    digest = sha256()
+    for sub_path in sorted(sub_path for sub_path in path.rglob("*") if sub_path.is_file()):
+        digest.update(f"{sub_path.relative_to(path).as_posix()}\0{file_digest(sub_path)}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def text_digest(text: str) -> str:
+    """Return the sha256 hex digest of the given string."""
+    return sha256(text.encode("utf-8")).hexdigest()
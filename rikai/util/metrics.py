@@ -0,0 +1,160 @@
+"""Module implementing timers and counters of analyses and their export for monitoring."""
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from json import dumps
+from os import replace
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, time
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+
+class Metrics:
+    """
+    Thread-safe collection of timers and counters.
+
+    Timers keep the number, total and maximum of their durations, so metrics can be accumulated over long-running usage.
+    The time spent on each rule is recorded with the RULE prefix, e.g. 'rule:foo'.
+    """
+
+    RULE = "rule:"
+
+    def __init__(self):
+        """Create an empty collection."""
+        self._lock = Lock()
+        self._timers: Dict[str, List[float]] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def timer(self, name: str) -> Generator[None, Any, None]:
+        """Time the enclosed code, recording its duration under the given name."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - start)
+
+    def record(self, name: str, seconds: float, count: int = 1):
+        """Record the given duration under the given name."""
+        with self._lock:
+            timer = self._timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += count
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    def increment(self, name: str, value: int = 1):
+        """Increase the counter with the given name."""
+        with self._lock:
+            self._counters[name] += value
+
+    def merge(self, other: "Metrics"):
+        """Add all timers and counters of the given collection to this collection."""
+        with other._lock:
+            timers = {name: list(timer) for name, timer in other._timers.items()}
+            counters = dict(other._counters)
+        with self._lock:
+            for name, (count, total, maximum) in timers.items():
+                timer = self._timers.setdefault(name, [0, 0.0, 0.0])
+                timer[0] += count
+                timer[1] += total
+                timer[2] = max(timer[2], maximum)
+            for name, value in counters.items():
+                self._counters[name] += value
+
+    def average(self, name: str) -> Optional[float]:
+        """Return the average duration recorded under the given name, None if nothing was recorded."""
+        with self._lock:
+            timer = self._timers.get(name, None)
+        return timer[1] / timer[0] if timer and timer[0] else None
+
+    def slowest(self, count: int = 10) -> List[Tuple[str, float]]:
+        """Return the names of the rules which took the most time in total, with their total time."""
+        with self._lock:
+            rules = [(name.removeprefix(self.RULE), timer[1]) for name, timer in self._timers.items() if name.startswith(self.RULE)]
+        return sorted(rules, key=lambda x: x[1], reverse=True)[:count]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return all timers and counters as a dict for json exports, separating the timers of rules from all others."""
+        with self._lock:
+            timers = {name: {"count": count, "total": total, "max": maximum} for name, (count, total, maximum) in self._timers.items()}
+            counters = dict(self._counters)
+        return {
+            "phases": {name: timer for name, timer in timers.items() if not name.startswith(self.RULE)},
+            "rules": {name.removeprefix(self.RULE): timer for name, timer in timers.items() if name.startswith(self.RULE)},
+            "counters": counters,
+        }
+
+
+class MetricsSink(ABC):
+    """Basic interface for exporting metrics after each analysis."""
+
+    @abstractmethod
+    def publish(self, sample: str, metrics: Metrics, totals: Metrics):
+        """
+        Export the metrics of an analyzed sample.
+
+        :param sample: The name of the sample analyzed.
+        :param metrics: The metrics of the analysis of the sample.
+        :param totals: The metrics accumulated over all analyses, including the given one.
+        """
+
+
+class PrometheusSink(MetricsSink):
+    """Sink writing the accumulated metrics to a file in the Prometheus text format, e.g. for the textfile collector of node_exporter."""
+
+    def __init__(self, path: Path):
+        """Create a sink replacing the file at the given path."""
+        self._path = path
+        self._lock = Lock()
+
+    def publish(self, sample: str, metrics: Metrics, totals: Metrics):
+        """Replace the file with the accumulated metrics, atomically so the collector never reads a partial file."""
+        text = self.format(totals)
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self._path.with_suffix(self._path.suffix + ".tmp")
+            temporary.write_text(text)
+            replace(temporary, self._path)
+
+    @classmethod
+    def format(cls, metrics: Metrics) -> str:
+        """Return the given metrics in the Prometheus text format."""
+        data = metrics.to_dict()
+        lines = []
+        for kind, label in (("phases", "phase"), ("rules", "rule")):
+            for field, description in (
+                ("count", "Number of executions"),
+                ("total", "Total seconds"),
+                ("max", "Maximum seconds of an execution"),
+            ):
+                metric = f"rikai_{label}_seconds_{field}" if field != "count" else f"rikai_{label}_count"
+                lines.append(f"# HELP {metric} {description} per {label}.")
+                lines.append(f"# TYPE {metric} {'gauge' if field == 'max' else 'counter'}")
+                lines.extend(f'{metric}{{{label}="{cls._escape(name)}"}} {timer[field]}' for name, timer in data[kind].items())
+        for name, value in data["counters"].items():
+            lines.append(f"# TYPE rikai_{name}_total counter")
+            lines.append(f"rikai_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        """Escape the given label value."""
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class JsonLinesSink(MetricsSink):
+    """Sink appending the metrics of each analyzed sample as a json line."""
+
+    def __init__(self, path: Path):
+        """Create a sink appending to the file at the given path."""
+        self._path = path
+        self._lock = Lock()
+
+    def publish(self, sample: str, metrics: Metrics, totals: Metrics):
+        """Append a line with the time, the sample and its metrics."""
+        line = dumps({"time": time(), "sample": sample} | metrics.to_dict())
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("a") as output:
+                output.write(line + "\n")
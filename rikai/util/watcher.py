@@ -0,0 +1,63 @@
+"""Module implementing the detection of changed files for long-running usage."""
+from pathlib import Path
+from threading import Event
+from typing import Any, Dict, Generator, Optional, Tuple
+
+
+class DirectoryWatcher:
+    """
+    Class polling a directory for added, modified or removed files.
+
+    Polling only relies on the modification time and size of the files, so it works on any platform and file system,
+    including network and container mounts where inotify events are not delivered.
+    """
+
+    def __init__(self, path: Path, pattern: str = "*.yaml", interval: float = 1.0):
+        """
+        Create a new watcher, taking the current state of the directory as reference.
+
+        :param path: The directory to be watched recursively.
+        :param pattern: The glob pattern selecting the files watched.
+        :param interval: The number of seconds between two polls.
+        """
+        self._path = path
+        self._pattern = pattern
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def poll(self) -> bool:
+        """Check whether any file was added, modified or removed since the last poll."""
+        snapshot = self._scan()
+        changed = snapshot != self._snapshot
+        self._snapshot = snapshot
+        return changed
+
+    def watch(self, stop: Optional[Event] = None) -> Generator[None, Any, None]:
+        """
+        Wait for changes of the directory until the given event is set.
+
+        Once a change is detected, the directory is polled until it remains unchanged for an interval,
+        so that editors saving a file in several steps or checkouts of many files trigger a single change.
+
+        :param stop: The event stopping the watcher, the watcher runs forever if None.
+        :return: Yield once after each change of the directory has settled.
+        """
+        stop = stop if stop is not None else Event()
+        while not stop.wait(self._interval):
+            if not self.poll():
+                continue
+            while not stop.wait(self._interval) and self.poll():
+                pass
+            if not stop.is_set():
+                yield
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        """Return the modification time and size of all watched files."""
+        snapshot = {}
+        for path in self._path.rglob(self._pattern):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot